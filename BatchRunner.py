@@ -0,0 +1,327 @@
+###############################################################################################
+######################################## Batch Runner #########################################
+###############################################################################################
+
+#Runs many Rain on Grid scenarios from a CSV or YAML manifest instead of one GUI submission at a
+#time. Every row of the manifest has the same fields as the input form; all rows are checked up
+#front, the runs are shared out over a pool of HEC-RAS workers and a run summary is written when
+#the batch finishes. A local stand-in backend runs the same scheduling without HEC-RAS.
+
+#Usage: python BatchRunner.py manifest.csv --workers 4 --command "psexec \\{worker} -i python ...
+#       RainOnGrid2DModelAutomation.py {spec}"
+
+#*********************************************************************************************
+import argparse
+import csv
+import datetime
+import json
+import os
+import queue
+import shlex
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import yaml
+import RasTextFiles
+
+###############################################################################################
+########################################## 1. Fields ##########################################
+###############################################################################################
+#Fields of a scenario, as collected from the input form by proceed()
+SCENARIO_FIELDS = [
+    "area_name", "input_folder_path", "output_folder_path", "projection_file", "path_to_geometry",
+    "path_to_2d_flow_area", "path_to_breaklines", "path_to_land_use_layer", "path_to_soil_layer",
+    "point_spacing_dx", "point_spacing_dy", "default_mannings_n", "near_spacing_m", "repeats", "far_spacing_m",
+    "user_input_precipitation_data", "path_to_rainfall_data", "precipitation_data_time_interval",
+    "starting_time", "ending_time", "computation_interval", "hydrograph_output_interval",
+    "mapping_output_interval", "detailed_output_interval", "friction_slope"
+]
+
+REQUIRED_FIELDS = [
+    "area_name", "input_folder_path", "output_folder_path",
+    "projection_file", "path_to_geometry", "path_to_2d_flow_area", "path_to_breaklines",
+    "path_to_land_use_layer", "path_to_soil_layer", "point_spacing_dx", "point_spacing_dy",
+    "default_mannings_n", "near_spacing_m", "repeats", "far_spacing_m", "starting_time",
+    "ending_time"
+]
+
+#Defaults of the input form, used for fields left out of a manifest
+DEFAULTS = {
+    "default_mannings_n": "0.06", "point_spacing_dx": "10", "point_spacing_dy": "10", "near_spacing_m": "5",
+    "repeats": "2", "far_spacing_m": "7.5", "user_input_precipitation_data": 0, "path_to_rainfall_data": "",
+    "precipitation_data_time_interval": "", "starting_time": "0100", "ending_time": "1100",
+    "computation_interval": "1 Minute", "hydrograph_output_interval": "1 Hour",
+    "mapping_output_interval": "1 Hour", "detailed_output_interval": "1 Hour", "friction_slope": ""
+}
+
+FILE_FIELDS = ["projection_file", "path_to_geometry", "path_to_2d_flow_area", "path_to_breaklines",
+               "path_to_land_use_layer", "path_to_soil_layer"]
+POSITIVE_NUMBER_FIELDS = ["point_spacing_dx", "point_spacing_dy", "default_mannings_n", "near_spacing_m", "far_spacing_m"]
+INTERVAL_FIELDS = {
+    "computation_interval": RasTextFiles.COMPUTATION_INTERVALS,
+    "hydrograph_output_interval": RasTextFiles.HYDROGRAPH_OUTPUT_INTERVALS,
+    "mapping_output_interval": RasTextFiles.MAPPING_OUTPUT_INTERVALS,
+    "detailed_output_interval": RasTextFiles.DETAILED_OUTPUT_INTERVALS
+}
+
+def missing_inputs(values):
+    #Required fields without a value; rainfall data is required when user precipitation is selected
+    required_fields = list(REQUIRED_FIELDS)
+    if values["user_input_precipitation_data"]:
+        required_fields.append("path_to_rainfall_data")
+    return [field for field in required_fields if not values.get(field)]
+
+###############################################################################################
+######################################### 2. Manifest #########################################
+###############################################################################################
+def _flag(value):
+    #Manifest flags such as 1, 'yes' or 'True' as the 0/1 of the input form check box
+    return int(str(value).strip().lower() in ("1", "true", "yes", "y"))
+
+def read_manifest(path):
+    #Scenarios of a CSV manifest (one row per run) or a YAML manifest (a list of runs, or a mapping
+    #with 'defaults' shared by all runs and 'runs'), with the form defaults filled in. Quote HHMM
+    #times in YAML manifests, YAML reads an unquoted 0100 as the number 64.
+    if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+        with open(path, "r") as file:
+            manifest = yaml.safe_load(file) or []
+        shared = manifest.get("defaults", {}) if isinstance(manifest, dict) else {}
+        rows = manifest.get("runs", []) if isinstance(manifest, dict) else manifest
+        rows = [{**shared, **row} for row in rows]
+    else:
+        with open(path, "r", newline="") as file:
+            rows = list(csv.DictReader(file))
+
+    return [_scenario(row) for row in rows]
+
+def _scenario(row):
+    #Scenario values with the form defaults filled in, as strings like the values of the form (YAML
+    #and JSON read numbers such as a spacing of 10 as numbers, which are typed and checked as text)
+    values = dict(DEFAULTS)
+    values.update({key: value for key, value in row.items() if value not in (None, "")})
+    values = {key: str(value).strip() for key, value in values.items()}
+    values["user_input_precipitation_data"] = _flag(values["user_input_precipitation_data"])
+    return values
+
+def read_scenario(path):
+    #Scenario of a JSON or YAML spec of one run
+    with open(path, "r") as file:
+        if os.path.splitext(path)[1].lower() == ".json":
+            return _scenario(json.load(file))
+        return _scenario(yaml.safe_load(file))
+
+def read_scenarios(path):
+    #Scenarios of a spec of one run or of a batch manifest (a CSV file, or YAML with a list of runs)
+    if os.path.splitext(path)[1].lower() != ".csv":
+        with open(path, "r") as file:
+            spec = yaml.safe_load(file)
+        if isinstance(spec, dict) and "runs" not in spec:
+            return [read_scenario(path)]
+    return read_manifest(path)
+
+def validate_scenario(values):
+    #Problems with one scenario that would stop or spoil its run
+    errors = [f"missing {field}" for field in missing_inputs(values)]
+    unknown = sorted(set(values) - set(SCENARIO_FIELDS))
+    if unknown:
+        errors.append(f"unknown field(s) {', '.join(unknown)}")
+
+    file_fields = FILE_FIELDS + (["path_to_rainfall_data"] if values["user_input_precipitation_data"] else [])
+    for field in file_fields:
+        if values.get(field) and not os.path.isfile(values[field]):
+            errors.append(f"{field} not found: {values[field]}")
+    if values.get("input_folder_path") and not os.path.isdir(values["input_folder_path"]):
+        errors.append(f"input_folder_path not found: {values['input_folder_path']}")
+
+    for field in POSITIVE_NUMBER_FIELDS:
+        try:
+            if float(values[field]) <= 0:
+                errors.append(f"{field} must be larger than 0")
+        except (KeyError, ValueError):
+            errors.append(f"{field} is not a number: {values.get(field)}")
+    if not str(values.get("repeats", "")).isdigit():
+        errors.append(f"repeats is not a whole number: {values.get('repeats')}")
+
+    times = [values.get("starting_time", ""), values.get("ending_time", "")]
+    if all(len(t) == 4 and t.isdigit() and int(t[:2]) <= 24 and int(t[2:]) < 60 for t in times):
+        if int(times[1]) <= int(times[0]):
+            errors.append("ending_time must be after starting_time")
+    else:
+        errors.append(f"starting_time and ending_time must be HHMM times: {times[0]}, {times[1]}")
+
+    for field, intervals in INTERVAL_FIELDS.items():
+        if values.get(field) not in intervals:
+            errors.append(f"{field} is not a HEC-RAS interval: {values.get(field)}")
+    interval = values.get("precipitation_data_time_interval")
+    if interval and interval not in RasTextFiles.PRECIPITATION_INTERVALS:
+        errors.append(f"precipitation_data_time_interval is not a HEC-RAS interval: {interval}")
+    return errors
+
+def validate_manifest(scenarios):
+    #Check every scenario before any run starts and raise one ValueError listing all problems
+    problems = []
+    seen = {}
+    for row, values in enumerate(scenarios, start=1):
+        errors = validate_scenario(values)
+        #Runs of the same area in the same output folder would share a time stamped folder
+        key = (values.get("area_name"), os.path.normcase(os.path.abspath(values.get("output_folder_path") or ".")))
+        if key in seen:
+            errors.append(f"same area_name and output_folder_path as run {seen[key]}")
+        seen.setdefault(key, row)
+        problems += [f"Run {row} ({values.get('area_name') or 'no area name'}): {error}" for error in errors]
+    if problems:
+        raise ValueError(f"The manifest has {len(problems)} problem(s):\n" + "\n".join(problems))
+
+###############################################################################################
+######################################### 3. Backends #########################################
+###############################################################################################
+#A backend runs one scenario on one worker and returns a short description of its output; it
+#raises an exception when the run fails
+def write_scenario_spec(values, folder, run):
+    #JSON file of a scenario that a worker reads to start its run
+    os.makedirs(folder, exist_ok=True)
+    spec_path = os.path.join(folder, f"Run {run:03d} {values['area_name']}.json")
+    with open(spec_path, "w") as file:
+        json.dump(values, file, indent=2)
+    return spec_path
+
+def local_backend(values, worker, spec_path, duration=0.0):
+    #Stand-in for HEC-RAS: checks the spec can be read back and waits 'duration' seconds
+    with open(spec_path, "r") as file:
+        spec = json.load(file)
+    if spec != values:
+        raise ValueError(f"The scenario spec {spec_path} does not match the manifest.")
+    time.sleep(duration)
+    return f"stand-in run of {values['area_name']} on {worker}"
+
+#Runs the automation on the desktop of this machine. The output of the run is captured, so it
+#continues past the stage messages on its own instead of waiting for input nobody can see.
+DEFAULT_COMMAND = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                "RainOnGrid2DModelAutomation.py"), "{spec}", "--yes"]
+
+def command_backend(command=DEFAULT_COMMAND):
+    #Backend that starts every run with a command, for example one that launches the automation in
+    #the desktop session of a worker machine; '{spec}' and '{worker}' in the command are replaced
+    def backend(values, worker, spec_path):
+        arguments = [part.format(spec=spec_path, worker=worker) for part in command]
+        #The runs never read the input of the batch (parallel runs would share it)
+        result = subprocess.run(arguments, capture_output=True, text=True, stdin=subprocess.DEVNULL)
+        if result.returncode != 0:
+            raise RuntimeError(f"exit code {result.returncode}: {(result.stderr or result.stdout).strip()[-500:]}")
+        return f"{values['output_folder_path']}"
+    return backend
+
+###############################################################################################
+###################################### 4. Run the Batch #######################################
+###############################################################################################
+SUMMARY_FIELDS = ["run", "area_name", "worker", "status", "started", "finished", "duration_s", "output", "error",
+                  "estimated_cells", "estimated_compute_h", "estimated_output_gb"]
+
+def preflight_scenarios(scenarios):
+    #Pre-flight check of the inputs of every run against each other (see PreFlight.py). Returns
+    #the errors and warnings of all runs as lines of text and whether any run has errors.
+    import PreFlight
+    lines, failed = [], False
+    for run, values in enumerate(scenarios, start=1):
+        report = PreFlight.preflight(values)
+        lines += [f"Run {run} ({values.get('area_name')}): {problem}" for problem in PreFlight.problems(report)]
+        failed = failed or not report["valid"]
+    return lines, failed
+
+def estimate_scenarios(scenarios):
+    #Estimated cells, compute hours and plan HDF size of every run (see RunEstimator.py), calibrated
+    #from the past runs in their output folders; empty when the runs cannot be estimated
+    try:
+        import RunEstimator
+        calibration = RunEstimator.calibrate(sorted({values["output_folder_path"] for values in scenarios}))
+        estimates = [RunEstimator.estimate_scenario(values, calibration) for values in scenarios]
+    except Exception as error:
+        print(f"Runs not estimated: {error}")
+        return [{} for _ in scenarios]
+    for run, (values, estimate) in enumerate(zip(scenarios, estimates), start=1):
+        print(f"Run {run} {values['area_name']}: {RunEstimator.format_estimate(estimate)}")
+    print(f"Estimated compute of the batch: {sum(estimate['compute_hours'] for estimate in estimates):.1f} h")
+    return [{"estimated_cells": estimate["cells"], "estimated_compute_h": estimate["compute_hours"],
+             "estimated_output_gb": estimate["output_gb"]} for estimate in estimates]
+
+def run_batch(scenarios, backend, workers, spec_folder):
+    #Run the scenarios on the workers (a list of worker names, one run per worker at a time) and
+    #return one summary row per run in manifest order. A failed run does not stop the others.
+    free_workers = queue.Queue()
+    for worker in workers:
+        free_workers.put(worker)
+
+    def run(run_number, values):
+        worker = free_workers.get()
+        started = datetime.datetime.now()
+        summary = {"run": run_number, "area_name": values["area_name"], "worker": worker,
+                   "started": started.isoformat(timespec="seconds")}
+        try:
+            spec_path = write_scenario_spec(values, spec_folder, run_number)
+            summary.update(status="ok", output=backend(values, worker, spec_path), error="")
+        except Exception as error:
+            summary.update(status="failed", output="", error=str(error))
+        finally:
+            free_workers.put(worker)
+        finished = datetime.datetime.now()
+        summary.update(finished=finished.isoformat(timespec="seconds"),
+                       duration_s=round((finished - started).total_seconds(), 1))
+        print(f"Run {run_number} {values['area_name']} {summary['status']} on {worker} after {summary['duration_s']} s")
+        return summary
+
+    with ThreadPoolExecutor(max_workers=len(workers)) as executor:
+        return list(executor.map(run, range(1, len(scenarios) + 1), scenarios))
+
+def write_summary(summaries, summary_path):
+    #CSV summary of the batch with one row per run
+    with open(summary_path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(summaries)
+    failed = sum(summary["status"] != "ok" for summary in summaries)
+    print(f"{len(summaries) - failed} of {len(summaries)} runs completed, summary saved to {summary_path}")
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Run Rain on Grid scenarios from a CSV or YAML manifest.")
+    parser.add_argument("manifest", help="CSV or YAML file with one run per row")
+    parser.add_argument("--workers", type=int, default=1, help="number of HEC-RAS workers")
+    parser.add_argument("--worker-names", nargs="+", help="names of the workers, replaces {worker} in the command")
+    parser.add_argument("--backend", choices=["hec-ras", "local"], default="hec-ras")
+    parser.add_argument("--command", help="command that runs one scenario, with {spec} and {worker} placeholders")
+    parser.add_argument("--stand-in-seconds", type=float, default=0.0, help="duration of each local stand-in run")
+    parser.add_argument("--summary", help="CSV run summary (default: next to the manifest)")
+    parser.add_argument("--validate-only", action="store_true", help="check the manifest and stop")
+    options = parser.parse_args(arguments)
+
+    scenarios = read_manifest(options.manifest)
+    validate_manifest(scenarios)
+    print(f"Manifest OK: {len(scenarios)} run(s)")
+    problems, failed = preflight_scenarios(scenarios)
+    print("\n".join(problems) or "Pre-flight checks OK")
+    #The local stand-in does not use the input files, so they are only reported
+    if failed and options.backend != "local":
+        raise ValueError("The pre-flight checks of the manifest found errors, see above.")
+    estimates = estimate_scenarios(scenarios)
+    if options.validate_only:
+        return []
+
+    if options.backend == "local":
+        backend = lambda values, worker, spec_path: local_backend(values, worker, spec_path, options.stand_in_seconds)
+    else:
+        backend = command_backend(shlex.split(options.command, posix=os.name != "nt") if options.command else DEFAULT_COMMAND)
+    workers = options.worker_names or [f"worker {number}" for number in range(1, options.workers + 1)]
+    if options.backend != "local" and not options.command and len(workers) > 1:
+        #Every run of the default command drives the mouse and keyboard of this one desktop
+        raise ValueError("The default command runs HEC-RAS on this desktop, one run at a time; "
+                         "give a --command that starts each run on its own worker to use more than one worker.")
+
+    batch_name = os.path.splitext(options.manifest)[0] + datetime.datetime.now().strftime(" %Y-%m-%d %H%M")
+    summaries = run_batch(scenarios, backend, workers, batch_name + " Specs")
+    for summary, estimate in zip(summaries, estimates):
+        summary.update(estimate)
+    write_summary(summaries, options.summary or batch_name + " Summary.csv")
+    return summaries
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+###############################################################################################
+##################################### Courant Diagnostics #####################################
+###############################################################################################
+
+#Checks the computation interval of a run against the flow it computed. The Courant number of
+#every cell at every output time is its largest face velocity times the computation interval over
+#the size of the cell (the square root of its area). The face velocities are streamed from the
+#plan HDF file in blocks of output times and every block is handled as one (times x cells) array,
+#so the distribution of the Courant numbers, the largest one of every cell (the hotspots) and of
+#every output time are gathered in one pass. From these the largest stable fixed computation
+#interval and the variable time step settings for the next run are recommended.
+
+#Usage: python CourantDiagnostics.py Area.p01.hdf "1 Minute" [--max-courant 1] [--hotspots hotspots.csv]
+
+#*********************************************************************************************
+import argparse
+import csv
+import json
+import numpy as np
+import RasResults
+import RasTextFiles
+
+#Largest Courant number for a stable run: 2 for the Diffusion Wave equations (the HEC-RAS default,
+#and what the plans of this automation use), 1 for the Shallow Water equations
+MAX_COURANT = 2.0
+#The fixed interval is chosen so this percentile of the largest Courant number of every wet cell
+#is within MAX_COURANT; the few cells above it are the hotspots to fix in the mesh instead
+STABLE_PERCENTILE = 99.9
+#Variable time steps: the interval is halved above MAX_COURANT and doubled after
+#STEPS_BELOW_MINIMUM steps below MIN_COURANT_FACTOR of it
+MIN_COURANT_FACTOR = 0.45
+STEPS_BELOW_MINIMUM = 4
+#Cells faster than this (m/s) are wet; the rest are left out of the statistics
+WET_VELOCITY = 0.001
+#Histogram of the Courant numbers, in logarithmic bins from 0.001 to 1000
+BINS = np.logspace(-3, 3, 121)
+HOTSPOTS = 20
+
+###############################################################################################
+##################################### 1. Courant Numbers ######################################
+###############################################################################################
+def cell_sizes(hdf, area):
+    #Size of every cell: the side of a square with its area
+    return np.sqrt(np.maximum(RasResults.cell_areas(hdf, area), 1e-6))
+
+def iter_courant(hdf, area, interval_seconds, max_bytes=RasResults.MAX_BLOCK_BYTES):
+    #Courant number of every cell at every output time and whether the cell is wet, in blocks of
+    #output times (first time index, times x cells, times x cells)
+    sizes = cell_sizes(hdf, area)
+    for start, speeds in RasResults.iter_cell_velocity(hdf, area, max_bytes):
+        yield start, speeds * (interval_seconds / sizes)[None, :], speeds > WET_VELOCITY
+
+###############################################################################################
+######################################## 2. Statistics ########################################
+###############################################################################################
+def courant_statistics(hdf, area, interval_seconds, max_bytes=RasResults.MAX_BLOCK_BYTES):
+    #One pass over the output times: the histogram of the wet Courant numbers, the largest Courant
+    #number of every cell (and the output time it occurred at) and of every output time
+    counts = np.zeros(len(BINS) + 1, dtype="int64")
+    cell_max, cell_time, time_max = None, None, []
+    for start, courant, wet in iter_courant(hdf, area, interval_seconds, max_bytes):
+        counts += np.bincount(np.searchsorted(BINS, courant[wet]), minlength=len(BINS) + 1)
+        courant = np.where(wet, courant, 0.0)
+        block_max, block_time = courant.max(axis=0), courant.argmax(axis=0) + start
+        if cell_max is None:
+            cell_max, cell_time = block_max, block_time
+        else:
+            cell_time = np.where(block_max > cell_max, block_time, cell_time)
+            cell_max = np.maximum(cell_max, block_max)
+        time_max.append(courant.max(axis=1))
+    if cell_max is None:
+        raise ValueError(f"The plan has no face velocities of '{area}'.")
+    return {"histogram": counts, "cell_max": cell_max, "cell_time": cell_time, "time_max": np.concatenate(time_max)}
+
+def histogram_percentile(counts, percentile, maximum=None):
+    #Percentile of the Courant numbers from their histogram, interpolated within its bin on the
+    #logarithmic scale of the bins and never more than the largest Courant number 'maximum'
+    if counts.sum() == 0:
+        return 0.0
+    cumulative = np.cumsum(counts)
+    target = counts.sum() * percentile / 100
+    index = min(int(np.searchsorted(cumulative, target)), len(BINS))
+    #Bin 'index' holds the numbers above BINS[index - 1] up to BINS[index]; the numbers below the
+    #first bin are taken as BINS[0] and the bin of the maximum ends at it
+    edges = np.append(BINS, BINS[-1] if maximum is None else max(maximum, BINS[-1]))
+    upper = edges[index] if maximum is None else max(min(edges[index], maximum), BINS[0])
+    lower = min(edges[index - 1], upper) if index > 0 else upper
+    fraction = (target - (cumulative[index - 1] if index > 0 else 0)) / counts[index]
+    value = float(lower * (upper / lower) ** fraction)
+    return value if maximum is None else min(value, maximum)
+
+###############################################################################################
+###################################### 3. Recommendation ######################################
+###############################################################################################
+def largest_interval(seconds):
+    #Largest HEC-RAS computation interval not longer than 'seconds' (the shortest when none is)
+    intervals = sorted(RasTextFiles.COMPUTATION_INTERVALS, key=RasTextFiles.interval_seconds)
+    fitting = [interval for interval in intervals if RasTextFiles.interval_seconds(interval) <= seconds]
+    return fitting[-1] if fitting else intervals[0]
+
+def recommend(statistics, interval_seconds, max_courant=MAX_COURANT):
+    #Largest stable fixed computation interval, and variable time step settings that start from it,
+    #halve it at the peak and double it while the flow is quiet
+    wet = statistics["cell_max"][statistics["cell_max"] > 0]
+    stable = float(np.percentile(wet, STABLE_PERCENTILE)) if len(wet) else 0.0
+    #Courant numbers grow in proportion to the interval
+    fixed_seconds = interval_seconds * max_courant / stable if stable > 0 else float("inf")
+    fixed = largest_interval(fixed_seconds)
+    scale = RasTextFiles.interval_seconds(fixed) / interval_seconds
+    peak = float(statistics["cell_max"].max()) * scale
+    quiet = float(np.median(statistics["time_max"])) * scale
+    halvings = int(np.ceil(np.log2(peak / max_courant))) if peak > max_courant else 0
+    doublings = int(np.floor(np.log2(max_courant / quiet))) if 0 < quiet < max_courant else 0
+    return {"fixed_interval": fixed, "stable_courant": round(stable, 3),
+            "variable": {"Initial Time Step": fixed, "Maximum Courant": max_courant,
+                         "Minimum Courant": round(max_courant * MIN_COURANT_FACTOR, 2),
+                         "Number of steps below Minimum before doubling": STEPS_BELOW_MINIMUM,
+                         "Maximum number of doubling base time step": min(doublings, 8),
+                         "Maximum number of halving base time step": min(halvings, 8)}}
+
+###############################################################################################
+####################################### 4. Diagnostics ########################################
+###############################################################################################
+def courant_diagnostics(hdf_path, area, computation_interval, max_courant=MAX_COURANT, max_bytes=RasResults.MAX_BLOCK_BYTES):
+    #Courant numbers of a 2D Flow Area of a computed plan run at 'computation_interval' (such as
+    #'1 Minute'), their distribution, the hotspot cells and the recommended time step settings
+    interval_seconds = RasTextFiles.interval_seconds(computation_interval)
+    with RasResults.open_plan_results(hdf_path) as hdf:
+        statistics = courant_statistics(hdf, area, interval_seconds, max_bytes)
+        centres = RasResults.cell_centers(hdf, area)
+        times = RasResults.output_times(hdf)
+    counts = statistics["histogram"]
+    cell_max = statistics["cell_max"]
+    hottest = np.argsort(cell_max)[::-1][:HOTSPOTS]
+    return {"area": area, "computation_interval": computation_interval, "max_courant": max_courant,
+            "percentiles": {f"p{percentile:g}": histogram_percentile(counts, percentile, float(cell_max.max())) for percentile in (50, 90, 99, 99.9)},
+            "maximum": round(float(cell_max.max()), 3),
+            "cells_above": int((cell_max > max_courant).sum()), "cells": len(cell_max),
+            "hotspots": [{"cell": int(cell), "x": round(float(centres[cell, 0]), 2), "y": round(float(centres[cell, 1]), 2),
+                          "courant": round(float(cell_max[cell]), 3), "time": str(times[statistics["cell_time"][cell]])[:19]}
+                         for cell in hottest if cell_max[cell] > 0],
+            "recommendation": recommend(statistics, interval_seconds, max_courant)}
+
+def format_report(report):
+    recommendation = report["recommendation"]
+    percentiles = ", ".join(f"{name} {value:.3g}" for name, value in report["percentiles"].items())
+    lines = [f"Courant numbers of {report['area']} at {report['computation_interval']}: {percentiles}, maximum {report['maximum']}",
+             f"{report['cells_above']} of {report['cells']} cells go above {report['max_courant']:g}"]
+    if report["hotspots"]:
+        hotspot = report["hotspots"][0]
+        lines.append(f"Largest at cell {hotspot['cell']} ({hotspot['x']}, {hotspot['y']}) at {hotspot['time']}: {hotspot['courant']}")
+    lines.append(f"Recommended fixed computation interval: {recommendation['fixed_interval']}")
+    lines.append("Or variable time steps: " + ", ".join(f"{name} {value}" for name, value in recommendation["variable"].items()))
+    return "\n".join(lines)
+
+def write_report(report, path):
+    #Report with the recommendation, to set up the next run from
+    with open(path, "w") as file:
+        json.dump(report, file, indent=1)
+    return path
+
+def write_hotspots(report, path):
+    #Hotspot cells, to find them in RAS Mapper
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=["cell", "x", "y", "courant", "time"])
+        writer.writeheader()
+        writer.writerows(report["hotspots"])
+    return path
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Courant numbers of a computed plan and the time step to use next.")
+    parser.add_argument("plan", help="plan HDF file (Area.p01.hdf)")
+    parser.add_argument("computation_interval", help="computation interval of the run, such as '1 Minute'")
+    parser.add_argument("--area", help="2D Flow Area (the first one by default)")
+    parser.add_argument("--max-courant", type=float, default=MAX_COURANT, help="largest Courant number for a stable run")
+    parser.add_argument("--hotspots", help="CSV file of the hotspot cells")
+    options = parser.parse_args(arguments)
+    area = options.area
+    if area is None:
+        with RasResults.open_plan_results(options.plan) as hdf:
+            area = RasResults.flow_area_names(hdf)[0]
+    report = courant_diagnostics(options.plan, area, options.computation_interval, options.max_courant)
+    print(format_report(report))
+    if options.hotspots:
+        write_hotspots(report, options.hotspots)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+###############################################################################################
+####################################### Delay Profiles ########################################
+###############################################################################################
+
+#Replaces the fixed sleeps between UI actions with delays measured on this machine. Each sleep
+#is a step named by its stage and its line in the automation (for example '2.1.2
+#run_script:140'). A calibration run sleeps at least the fixed delay of every step while it
+#watches the screen, and records when the screen stopped changing as the time-to-ready of the
+#step. After a few calibration runs the profile holds, for every step, a percentile of these
+#times plus a margin, and later runs sleep for that instead, never more than a few times the
+#fixed delay. Steps that are not calibrated yet, or whose fixed delay changed, keep their
+#fixed delay. The profile keeps the hash of the automation script the lines belong to; once the
+#script changes, its lines no longer name the same steps, so the profile is dropped and the fixed
+#delays are used until it is calibrated again. The time saved in each stage is reported at the
+#end of the run.
+
+#*********************************************************************************************
+import hashlib
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+import RunManifest
+import StageTrace
+
+PROFILE_FOLDER = RunManifest.data_folder("Delay Profiles")
+
+#Delay of a calibrated step: the PERCENTILE of its times-to-ready plus MARGIN of it (at least
+#MIN_MARGIN seconds), between MIN_DELAY and MAX_FACTOR times the fixed delay
+PERCENTILE = 90
+MARGIN = 0.25
+MIN_MARGIN = 0.2
+MIN_DELAY = 0.1
+MAX_FACTOR = 3.0
+#Times-to-ready a step needs before its profile delay is used (a step in a loop gets one each pass)
+MIN_SAMPLES = 3
+#Samples kept for each step, the oldest are dropped first
+MAX_SAMPLES = 20
+
+#Calibration: the screen is ready once it has not changed for SETTLE_TIME seconds. It is
+#compared every POLL_INTERVAL seconds and a change is a mean difference above CHANGE_THRESHOLD
+#grey levels, so a blinking cursor does not count as a change.
+SETTLE_TIME = 0.5
+POLL_INTERVAL = 0.1
+CHANGE_THRESHOLD = 0.5
+
+###############################################################################################
+######################################### 1. Profiles #########################################
+###############################################################################################
+def default_profile_path():
+    #Profile of this machine
+    return os.path.join(PROFILE_FOLDER, f"{platform.node() or 'machine'}.json")
+
+def read_profile(path):
+    #Profile saved by save_profile, or an empty profile when the file does not exist
+    if not os.path.exists(path):
+        return {"machine": platform.node(), "runs": 0, "scripts": {}, "steps": {}}
+    with open(path, "r") as file:
+        return json.load(file)
+
+def step_delay(samples, nominal):
+    #Delay of a step from its times-to-ready, or its fixed delay when it has too few samples
+    if len(samples) < MIN_SAMPLES:
+        return nominal
+    ready = float(np.percentile(samples, PERCENTILE))
+    delay = ready + max(ready * MARGIN, MIN_MARGIN)
+    return round(min(max(delay, MIN_DELAY), nominal * MAX_FACTOR), 2)
+
+def save_profile(profile, path):
+    for step in profile["steps"].values():
+        step["delay"] = step_delay(step["samples"], step["nominal"])
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(profile, file, indent=1)
+
+###############################################################################################
+##################################### 2. Profiled Driver ######################################
+###############################################################################################
+class ProfiledDriver:
+    #Wraps a UI driver and replaces its sleeps with the delays of a profile, or measures the
+    #time-to-ready of every sleep when 'calibrate' is set. The other actions go to the driver.
+    def __init__(self, driver, path=None, calibrate=False):
+        if calibrate and not hasattr(driver, "screen_signature"):
+            raise ValueError("Calibration needs the desktop driver, it cannot run on a replay.")
+        self.driver = driver
+        self.path = path or default_profile_path()
+        self.profile = read_profile(self.path)
+        self.calibrate = calibrate
+        self.samples = {}
+        #Scripts whose lines name steps, checked against the profile on their first sleep
+        self.scripts = set()
+        #Fixed and used seconds of sleep in each stage
+        self.stages = {}
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+    def _step(self):
+        #Stage and line of the automation that asked for the sleep
+        frame = sys._getframe(2)
+        while frame.f_globals.get("__name__") in ("UiDriver", __name__):
+            frame = frame.f_back
+        if frame.f_code.co_filename not in self.scripts:
+            self._check_script(frame.f_code.co_filename)
+        return f"{StageTrace.current_stage()} {frame.f_code.co_name}:{frame.f_lineno}"
+
+    def _check_script(self, path):
+        #Drop the steps of the profile when the script naming them changed since the calibration
+        #(or the profile does not say which script it was calibrated with)
+        self.scripts.add(path)
+        with open(path, "rb") as file:
+            digest = hashlib.sha256(file.read()).hexdigest()
+        name = os.path.basename(path)
+        scripts = self.profile.setdefault("scripts", {})
+        if scripts.get(name) != digest:
+            if self.profile["steps"]:
+                print(f"{name} changed since the delay profile {self.path} was calibrated, "
+                      f"the fixed delays are used until it is calibrated again (--calibrate)")
+            self.profile.update({"runs": 0, "steps": {}})
+            scripts[name] = digest
+
+    def sleep(self, seconds):
+        key = self._step()
+        if self.calibrate:
+            used = self._measure(key, seconds)
+        else:
+            step = self.profile["steps"].get(key)
+            used = step["delay"] if step and step["nominal"] == seconds else seconds
+            self.driver.sleep(used)
+        stage = self.stages.setdefault(StageTrace.current_stage(), [0.0, 0.0])
+        stage[0] += seconds
+        stage[1] += used
+
+    def _measure(self, key, seconds):
+        #Sleep at least 'seconds' and until the screen has settled, and record when it last changed
+        start = time.monotonic()
+        last = self._screen()
+        changed = 0.0
+        while True:
+            self.driver.sleep(POLL_INTERVAL)
+            now = time.monotonic() - start
+            screen = self._screen()
+            if np.abs(screen - last).mean() > CHANGE_THRESHOLD:
+                changed = now
+            last = screen
+            if (now >= seconds and now - changed >= SETTLE_TIME) or now >= seconds * MAX_FACTOR:
+                break
+        self.samples.setdefault(key, (seconds, []))[1].append(round(changed, 2))
+        return now
+
+    def _screen(self):
+        return np.frombuffer(self.driver.screen_signature(), dtype=np.uint8).astype(np.int16)
+
+    def savings(self):
+        #Fixed and used seconds of sleep in each stage, and the seconds saved
+        return {stage: {"fixed": round(fixed, 1), "used": round(used, 1), "saved": round(fixed - used, 1)}
+                for stage, (fixed, used) in self.stages.items()}
+
+    def close(self):
+        #Save the calibration samples and report the time saved in each stage
+        if self.calibrate:
+            self.profile["runs"] = self.profile.get("runs", 0) + 1
+            for key, (nominal, samples) in self.samples.items():
+                step = self.profile["steps"].get(key)
+                if step is None or step["nominal"] != nominal:
+                    step = self.profile["steps"][key] = {"nominal": nominal, "samples": []}
+                step["samples"] = (step["samples"] + samples)[-MAX_SAMPLES:]
+            save_profile(self.profile, self.path)
+            ready = sum(1 for step in self.profile["steps"].values() if len(step["samples"]) >= MIN_SAMPLES)
+            print(f"Delay profile {self.path}: {self.profile['runs']} calibration run(s), "
+                  f"{ready} of {len(self.profile['steps'])} steps calibrated")
+        elif not self.profile["steps"]:
+            print(f"No delay profile of this script at {self.path}, the fixed delays were used (calibrate with --calibrate)")
+        else:
+            print(f"{'Stage':<8}{'Fixed s':>10}{'Used s':>10}{'Saved s':>10}")
+            for stage, times in self.savings().items():
+                print(f"{stage:<8}{times['fixed']:>10}{times['used']:>10}{times['saved']:>10}")
+            fixed = sum(times[0] for times in self.stages.values())
+            used = sum(times[1] for times in self.stages.values())
+            print(f"Delay profile saved {fixed - used:.1f} s of {fixed:.1f} s of fixed delays")
+        self.driver.close()
@@ -0,0 +1,149 @@
+###############################################################################################
+#################################### Design Storm Library #####################################
+###############################################################################################
+
+#Design storm hyetographs for the Rain on Grid 2D Model Automation. Storms are built from
+#dimensionless mass curves (SCS Type I/IA/II/III and Huff quartiles) or from an IDF relationship
+#(alternating block method) for any depth, duration and time step. Whole matrices of storms
+#(return periods x durations) are generated in one batched NumPy call.
+
+#*********************************************************************************************
+import datetime
+import numpy as np
+import pandas as pd
+
+###############################################################################################
+################################ 1. Dimensionless Mass Curves #################################
+###############################################################################################
+#NRCS (TR-55) 24-hour cumulative rainfall distributions as (hour, fraction of 24-hour depth)
+SCS_DISTRIBUTIONS = {
+    "I": np.array([[0.0, 0.000], [2.0, 0.035], [4.0, 0.076], [6.0, 0.125], [7.0, 0.156], [8.0, 0.194],
+                   [8.5, 0.219], [9.0, 0.254], [9.5, 0.303], [9.75, 0.362], [10.0, 0.515], [10.5, 0.583],
+                   [11.0, 0.624], [11.5, 0.654], [12.0, 0.682], [12.5, 0.706], [13.0, 0.727], [13.5, 0.748],
+                   [14.0, 0.767], [16.0, 0.830], [20.0, 0.926], [24.0, 1.000]]),
+    "IA": np.array([[0.0, 0.000], [2.0, 0.050], [4.0, 0.116], [6.0, 0.206], [7.0, 0.268], [7.5, 0.310],
+                    [7.75, 0.425], [8.0, 0.480], [8.5, 0.520], [9.0, 0.550], [9.5, 0.577], [9.75, 0.601],
+                    [10.0, 0.624], [10.5, 0.645], [11.0, 0.664], [11.5, 0.683], [12.0, 0.701], [12.5, 0.719],
+                    [13.0, 0.736], [13.5, 0.753], [14.0, 0.768], [16.0, 0.830], [20.0, 0.926], [24.0, 1.000]]),
+    "II": np.array([[0.0, 0.000], [2.0, 0.022], [4.0, 0.048], [6.0, 0.080], [7.0, 0.098], [8.0, 0.120],
+                    [8.5, 0.133], [9.0, 0.147], [9.5, 0.163], [9.75, 0.172], [10.0, 0.181], [10.5, 0.204],
+                    [11.0, 0.235], [11.5, 0.283], [11.75, 0.357], [12.0, 0.663], [12.5, 0.735], [13.0, 0.772],
+                    [13.5, 0.799], [14.0, 0.820], [16.0, 0.880], [20.0, 0.952], [24.0, 1.000]]),
+    "III": np.array([[0.0, 0.000], [2.0, 0.020], [4.0, 0.043], [6.0, 0.072], [7.0, 0.089], [8.0, 0.115],
+                     [8.5, 0.130], [9.0, 0.148], [9.5, 0.167], [9.75, 0.178], [10.0, 0.189], [10.5, 0.216],
+                     [11.0, 0.250], [11.5, 0.298], [11.75, 0.339], [12.0, 0.500], [12.5, 0.702], [13.0, 0.751],
+                     [13.5, 0.785], [14.0, 0.811], [16.0, 0.886], [20.0, 0.957], [24.0, 1.000]]),
+}
+
+#Huff (1967) median (50 %) cumulative curves at 10 % steps of the storm duration
+HUFF_QUARTILES = {
+    1: np.array([0.00, 0.16, 0.40, 0.63, 0.74, 0.81, 0.86, 0.90, 0.93, 0.97, 1.00]),
+    2: np.array([0.00, 0.03, 0.08, 0.15, 0.37, 0.63, 0.79, 0.88, 0.94, 0.98, 1.00]),
+    3: np.array([0.00, 0.03, 0.06, 0.10, 0.14, 0.20, 0.36, 0.66, 0.86, 0.95, 1.00]),
+    4: np.array([0.00, 0.02, 0.05, 0.08, 0.12, 0.16, 0.22, 0.29, 0.39, 0.62, 1.00]),
+}
+
+def mass_curve(storm_type):
+    #Dimensionless mass curve (fraction of duration, fraction of depth) of a storm type such as
+    #'SCS III' or 'Huff 2'
+    family, _, name = storm_type.partition(" ")
+    if family == "SCS" and name in SCS_DISTRIBUTIONS:
+        table = SCS_DISTRIBUTIONS[name]
+        return table[:, 0] / 24.0, table[:, 1]
+    if family == "Huff" and name in ("1", "2", "3", "4"):
+        fractions = HUFF_QUARTILES[int(name)]
+        return np.linspace(0.0, 1.0, len(fractions)), fractions
+    raise ValueError(f"Unknown storm type '{storm_type}'. Use 'SCS I', 'SCS IA', 'SCS II', 'SCS III' or 'Huff 1' to 'Huff 4'.")
+
+def _number_of_steps(durations_h, time_step_min):
+    return np.ceil(np.round(np.asarray(durations_h, dtype=float) * 60.0 / time_step_min, 6)).astype(int)
+
+def design_storm_matrix(depths_mm, durations_h, time_step_min, storm_type="SCS III"):
+    #Hyetographs of every depth in a (return periods x durations) matrix for the given storm type.
+    #The mass curve is stretched over each duration, so 24-hour SCS curves keep their shape for
+    #shorter or longer storms. Returns an array of shape (return periods, durations, steps) with
+    #the rainfall depth in mm of each time step; shorter storms are padded with zeros.
+    depths_mm = np.atleast_2d(np.asarray(depths_mm, dtype=float))
+    durations_h = np.atleast_1d(np.asarray(durations_h, dtype=float))
+    curve_time, curve_depth = mass_curve(storm_type)
+
+    steps = _number_of_steps(durations_h, time_step_min)
+    #Time at the end of every step as a fraction of each duration (durations x steps + 1)
+    elapsed_h = np.arange(steps.max() + 1) * time_step_min / 60.0
+    fractions = np.minimum(elapsed_h[None, :] / durations_h[:, None], 1.0)
+    cumulative = np.interp(fractions, curve_time, curve_depth)
+    increments = np.diff(cumulative, axis=1)
+
+    return depths_mm[:, :, None] * increments[None, :, :]
+
+def design_storm(depth_mm, duration_h, time_step_min, storm_type="SCS III"):
+    #Hyetograph (rainfall depth in mm of each time step) of a single design storm
+    steps = _number_of_steps([duration_h], time_step_min)[0]
+    return design_storm_matrix([[depth_mm]], [duration_h], time_step_min, storm_type)[0, 0, :steps]
+
+###############################################################################################
+################################# 2. Alternating Block Method #################################
+###############################################################################################
+def idf_depth(a, b, c, duration_min):
+    #Rainfall depth in mm of an IDF relationship i = a / (t + b)^c with i in mm/h and t in minutes
+    duration_min = np.asarray(duration_min, dtype=float)
+    return a / (duration_min + b) ** c * duration_min / 60.0
+
+def alternating_block_matrix(a, b, c, durations_h, time_step_min, peak_position=0.5):
+    #Alternating block hyetographs from the IDF parameters of each return period (a, b and c may
+    #be scalars or one value per return period) for every duration. The block depths of all return
+    #periods are computed together; the largest block is placed at 'peak_position' of each storm
+    #and the next blocks alternate to its right and left. Returns (return periods, durations, steps).
+    a, b, c = (np.atleast_1d(np.asarray(value, dtype=float)) for value in (a, b, c))
+    a, b, c = np.broadcast_arrays(a, b, c)
+    durations_h = np.atleast_1d(np.asarray(durations_h, dtype=float))
+    steps = _number_of_steps(durations_h, time_step_min)
+
+    elapsed_min = np.arange(1, steps.max() + 1) * time_step_min
+    cumulative = idf_depth(a[:, None], b[:, None], c[:, None], elapsed_min[None, :])
+    increments = np.diff(cumulative, axis=1, prepend=0.0)
+
+    storms = np.zeros((len(a), len(durations_h), steps.max()))
+    for j, n in enumerate(steps):
+        blocks = -np.sort(-increments[:, :n], axis=1)
+        storms[:, j, _alternating_positions(n, peak_position)] = blocks
+    return storms
+
+def _alternating_positions(n, peak_position):
+    #Position of the 1st, 2nd, 3rd ... largest block in a storm of n blocks
+    peak = min(int(peak_position * n), n - 1)
+    positions = [peak]
+    left, right = peak - 1, peak + 1
+    while len(positions) < n:
+        if right < n:
+            positions.append(right)
+            right += 1
+        if left >= 0 and len(positions) < n:
+            positions.append(left)
+            left -= 1
+    return np.array(positions)
+
+###############################################################################################
+################################### 3. Precipitation Files ####################################
+###############################################################################################
+def storm_dataframe(precipitation_mm, time_step_min, start=None):
+    #Date/Time/Precipitation table of a hyetograph, as written to the rainfall .dat files.
+    #Storms start at midnight of the current day unless a start time is given.
+    if start is None:
+        start = datetime.datetime.combine(datetime.date.today(), datetime.time())
+    precipitation_mm = np.asarray(precipitation_mm, dtype=float)
+    times = pd.Timestamp(start) + pd.to_timedelta(np.arange(len(precipitation_mm)) * time_step_min, unit='m')
+    return pd.DataFrame({
+        'Date': times.strftime('%d%b%Y').str.upper(),
+        'Time': times.strftime('%H%M'),
+        'Precipitation (mm)': precipitation_mm
+    })
+
+#Short labels of the storm types used in the rainfall file names
+STORM_LABELS = {"SCS I": "SCS T1", "SCS IA": "SCS T1A", "SCS II": "SCS T2", "SCS III": "SCS T3",
+                "Huff 1": "Huff Q1", "Huff 2": "Huff Q2", "Huff 3": "Huff Q3", "Huff 4": "Huff Q4",
+                "Alternating Block": "Alternating Block"}
+
+def storm_file_name(area_name, storm_type, depth_mm):
+    #For example 'Area SA SCS T3 (120mm).dat'
+    return f"{area_name} SA {STORM_LABELS[storm_type]} ({float(depth_mm):g}mm).dat"
@@ -0,0 +1,178 @@
+###############################################################################################
+####################################### Friction Slope ########################################
+###############################################################################################
+
+#Computes the friction slope of the Normal Depth boundary condition from the terrain, so the
+#run does not have to stop for an engineer to work it out. The outflow is the BC Line of the 2D
+#Flow Area drawn in RAS Mapper (or, without one, the lowest stretch of the perimeter). Transects
+#are laid from the outflow into the 2D Flow Area, the DEM is sampled along them and the slope of
+#every transect is fitted at once with NumPy; the median is the representative slope. The DEM is
+#read in windows around the sample points only, one tile at a time, so a DEM of several GB is
+#never loaded whole.
+
+#Usage: python FrictionSlope.py terrain.tif Area.g01.hdf "AREA Perimeter" [--bc-line Outflow]
+
+#*********************************************************************************************
+import argparse
+import numpy as np
+import matplotlib.path
+import rasterio
+import rasterio.windows
+import RasResults
+
+#Length of the transects upstream of the outflow, and the largest number of transects and of
+#samples along each transect (the spacing grows on long BC Lines and coarse DEMs)
+TRANSECT_LENGTH = 500.0
+MAX_TRANSECTS = 200
+MAX_SAMPLES = 100
+#Length of the perimeter around its lowest point used as the outflow when there is no BC Line
+OUTLET_LENGTH = 200.0
+#Slopes are kept within these limits, HEC-RAS does not accept a zero or negative friction slope
+MIN_SLOPE = 0.0001
+MAX_SLOPE = 0.1
+#Side of the DEM tiles read at a time
+TILE_SIZE = 1024
+
+###############################################################################################
+####################################### 1. DEM Samples ########################################
+###############################################################################################
+def sample_dem(terrain_path, points, tile_size=TILE_SIZE):
+    #Elevation at every point (points x 2), NaN outside the DEM or where it has no data. Only the
+    #window around the points inside each tile of the DEM is read.
+    points = np.asarray(points, dtype="float64").reshape(-1, 2)
+    elevation = np.full(len(points), np.nan)
+    with rasterio.open(terrain_path) as terrain:
+        columns, rows = ~terrain.transform * (points[:, 0], points[:, 1])
+        rows, columns = np.floor(rows).astype("int64"), np.floor(columns).astype("int64")
+        inside = (rows >= 0) & (rows < terrain.height) & (columns >= 0) & (columns < terrain.width)
+        tiles = (rows // tile_size) * (terrain.width // tile_size + 1) + columns // tile_size
+        for tile in np.unique(tiles[inside]):
+            selected = np.flatnonzero(inside & (tiles == tile))
+            top, left = rows[selected].min(), columns[selected].min()
+            window = rasterio.windows.Window(left, top, columns[selected].max() - left + 1, rows[selected].max() - top + 1)
+            block = terrain.read(1, window=window, masked=True).astype("float64").filled(np.nan)
+            elevation[selected] = block[rows[selected] - top, columns[selected] - left]
+    return elevation
+
+def cell_size(terrain_path):
+    with rasterio.open(terrain_path) as terrain:
+        return max(abs(terrain.transform.a), abs(terrain.transform.e))
+
+def densify(line, spacing):
+    #Points every 'spacing' along a polyline (points x 2) and their distances along it
+    line = np.asarray(line, dtype="float64")
+    distance = np.concatenate([[0.0], np.cumsum(np.hypot(*np.diff(line, axis=0).T))])
+    stations = np.append(np.arange(0.0, distance[-1], spacing), distance[-1])
+    return np.column_stack([np.interp(stations, distance, line[:, 0]), np.interp(stations, distance, line[:, 1])]), stations
+
+###############################################################################################
+######################################### 2. Outflow ##########################################
+###############################################################################################
+def outflow_line(hdf_path, area, bc_line_name=None, terrain_path=None):
+    #Outflow of the 2D Flow Area: its BC Line (all of its BC Lines when no name is given) or the
+    #lowest stretch of its perimeter. Returns the lines, their description and the perimeter.
+    with RasResults.open_plan_results(hdf_path) as hdf:
+        perimeter = RasResults.flow_area_perimeter(hdf, area)
+        lines = RasResults.bc_lines(hdf, area)
+    if bc_line_name:
+        if bc_line_name not in lines:
+            raise ValueError(f"The 2D Flow Area '{area}' has no BC Line '{bc_line_name}'.")
+        lines = {bc_line_name: lines[bc_line_name]}
+    if lines:
+        return list(lines.values()), f"BC Line {', '.join(lines)}", perimeter
+    if terrain_path is None:
+        raise ValueError(f"The 2D Flow Area '{area}' has no BC Lines.")
+
+    #No BC Line: the water leaves where the perimeter is lowest
+    ring = np.vstack([perimeter, perimeter[:1]])
+    points, stations = densify(ring, cell_size(terrain_path))
+    elevation = sample_dem(terrain_path, points)
+    if np.all(np.isnan(elevation)):
+        raise ValueError(f"The perimeter of '{area}' is outside the terrain.")
+    #Stations measured around the closed perimeter from half way round to the lowest point, so
+    #the stretch around it stays in one piece
+    total = stations[-1]
+    shifted = (stations[:-1] - stations[np.nanargmin(elevation)] + total / 2) % total
+    order = np.argsort(shifted)
+    outlet = points[:-1][order][np.abs(shifted[order] - total / 2) <= OUTLET_LENGTH / 2]
+    return [outlet], f"lowest {OUTLET_LENGTH:.0f} m of the perimeter", perimeter
+
+###############################################################################################
+###################################### 3. Friction Slope ######################################
+###############################################################################################
+def transect_slopes(terrain_path, line, perimeter, length=TRANSECT_LENGTH):
+    #Terrain slope of every transect laid from the outflow line into the 2D Flow Area, fitted by
+    #least squares to the DEM samples along it (NaN where a transect has too few samples)
+    step = cell_size(terrain_path)
+    line_length = np.hypot(*np.diff(line, axis=0).T).sum()
+    points, _ = densify(line, max(step, line_length / MAX_TRANSECTS))
+    distances = np.linspace(0.0, length, int(min(MAX_SAMPLES, max(length / step, 2))) + 1)
+
+    #Normal of the line at every point, turned to point into the 2D Flow Area
+    tangent = np.gradient(points, axis=0)
+    normal = np.column_stack([-tangent[:, 1], tangent[:, 0]])
+    normal /= np.maximum(np.hypot(normal[:, 0], normal[:, 1]), 1e-12)[:, None]
+    area = matplotlib.path.Path(perimeter)
+    if area.contains_points(points + normal * distances[1]).mean() < area.contains_points(points - normal * distances[1]).mean():
+        normal = -normal
+
+    samples = points[:, None, :] + normal[:, None, :] * distances[None, :, None]
+    elevation = sample_dem(terrain_path, samples.reshape(-1, 2)).reshape(len(points), len(distances))
+    #Samples that leave the 2D Flow Area are dropped; the first one lies on the outflow itself
+    inside = area.contains_points(samples.reshape(-1, 2)).reshape(elevation.shape)
+    inside[:, 0] = True
+    elevation[~inside] = np.nan
+
+    #Least squares slope of elevation against the distance upstream, ignoring missing samples
+    valid = ~np.isnan(elevation)
+    count = valid.sum(axis=1)
+    distance = np.where(valid, distances[None, :], 0.0)
+    mean_distance = distance.sum(axis=1) / np.maximum(count, 1)
+    mean_elevation = np.where(valid, elevation, 0.0).sum(axis=1) / np.maximum(count, 1)
+    offset = np.where(valid, distances[None, :] - mean_distance[:, None], 0.0)
+    covariance = (offset * np.where(valid, elevation - mean_elevation[:, None], 0.0)).sum(axis=1)
+    variance = (offset ** 2).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where((count >= 3) & (variance > 0), covariance / variance, np.nan)
+
+def friction_slope(terrain_path, hdf_path, area, bc_line_name=None, length=TRANSECT_LENGTH):
+    #Representative friction slope at the outflow of a 2D Flow Area. Returns the slope and a
+    #report of the transects it was computed from.
+    lines, outflow, perimeter = outflow_line(hdf_path, area, bc_line_name, terrain_path)
+    slopes = np.concatenate([transect_slopes(terrain_path, line, perimeter, length) for line in lines])
+    slopes = slopes[~np.isnan(slopes)]
+    if len(slopes) == 0:
+        raise ValueError(f"The terrain has no data upstream of the {outflow} of '{area}'.")
+    median = float(np.median(slopes))
+    slope = min(max(median, MIN_SLOPE), MAX_SLOPE)
+    report = {"outflow": outflow, "transects": len(slopes), "median": round(median, 6),
+              "p25": round(float(np.percentile(slopes, 25)), 6), "p75": round(float(np.percentile(slopes, 75)), 6),
+              "adverse": round(float(np.mean(slopes <= 0)), 3), "slope": slope, "limited": slope != median}
+    return slope, report
+
+def format_slope(slope):
+    #Friction slope as typed into the Normal Depth box, for example '0.0023'
+    return f"{slope:.2g}" if slope < 0.001 else f"{slope:.4f}".rstrip("0")
+
+def format_report(report):
+    text = (f"Friction slope {format_slope(report['slope'])} from {report['transects']} transects upstream of the "
+            f"{report['outflow']} (median {report['median']}, 25% {report['p25']}, 75% {report['p75']})")
+    if report["adverse"] > 0.25:
+        text += f"\n{report['adverse']:.0%} of the transects slope away from the outflow, check the BC Line"
+    if report["limited"]:
+        text += f"\nThe median slope is outside {MIN_SLOPE} to {MAX_SLOPE} and was limited"
+    return text
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Compute the friction slope at the outflow of a 2D Flow Area from the terrain.")
+    parser.add_argument("terrain", help="terrain GeoTIFF")
+    parser.add_argument("geometry", help="geometry HDF (Area.g01.hdf) or plan HDF file")
+    parser.add_argument("area", help="name of the 2D Flow Area")
+    parser.add_argument("--bc-line", help="BC Line of the outflow (all BC Lines of the area by default)")
+    parser.add_argument("--length", type=float, default=TRANSECT_LENGTH, help="length of the transects in map units")
+    options = parser.parse_args(arguments)
+    _, report = friction_slope(options.terrain, options.geometry, options.area, options.bc_line, options.length)
+    print(format_report(report))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+###############################################################################################
+###################################### Hydraulic Rasters ######################################
+###############################################################################################
+
+#Rasterizes the land use and soil layers onto the terrain grid without RAS Mapper, so the
+#Manning's n and infiltration grids HEC-RAS will use can be inspected, cached and checked. The
+#class of every polygon is looked up in a classification table (built in, or a CSV file with a
+#class column followed by one column per parameter) and every parameter becomes a GeoTIFF.
+#The grid is processed in tiles: only the polygons whose bounding boxes touch a tile are burnt
+#into it, as class numbers, which are then turned into parameter values with one array lookup,
+#so large catchments need little memory and the tiles run in parallel. The rasters are cached by
+#the hashes of the inputs, under names without the area (runs of other areas on the same inputs
+#share them), and a report of the area of every class (and of the classes missing from the
+#tables) is written next to them.
+
+#Usage: python HydraulicRasters.py terrain.tif land_use.shp soils.shp output_folder [--land-cover-table n.csv]
+
+#*********************************************************************************************
+import argparse
+import csv
+import hashlib
+import json
+import os
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import fiona
+import fiona.transform
+import rasterio
+import rasterio.features
+import rasterio.windows
+import RunManifest
+
+#Manning's n of common land cover classes (open channel values after Chow, 1959)
+LAND_COVER_TABLE = {
+    "Water": {"Manning's n": 0.035},
+    "Wetland": {"Manning's n": 0.07},
+    "Forest": {"Manning's n": 0.12},
+    "Plantation": {"Manning's n": 0.1},
+    "Shrubland": {"Manning's n": 0.05},
+    "Grassland": {"Manning's n": 0.035},
+    "Cultivated": {"Manning's n": 0.04},
+    "Urban": {"Manning's n": 0.15},
+    "Bare": {"Manning's n": 0.025},
+    "Mine": {"Manning's n": 0.03},
+}
+
+#Constant loss rate of the hydrologic soil groups, the middle of the NRCS ranges (A 7.6 to 11.4,
+#B 3.8 to 7.6, C 1.3 to 3.8 and D 0 to 1.3 mm/hr)
+SOIL_TABLE = {
+    "A": {"Potential Percolation Rate (mm/hr)": 9.5},
+    "B": {"Potential Percolation Rate (mm/hr)": 5.7},
+    "C": {"Potential Percolation Rate (mm/hr)": 2.5},
+    "D": {"Potential Percolation Rate (mm/hr)": 0.6},
+}
+
+NODATA = -9999.0
+TILE_SIZE = 2048
+CACHE_FOLDER = RunManifest.data_folder("Hydraulic Raster Cache")
+#Changing the rasterization (or the names of the cached files) changes the cache keys
+RASTER_VERSION = "2"
+#Report of the rasters, '<area name> Hydraulic Rasters.json' outside the cache
+REPORT_NAME = "Hydraulic Rasters.json"
+
+###############################################################################################
+################################## 1. Classification Tables ###################################
+###############################################################################################
+def read_lookup_table(path):
+    #Classification table from a CSV file: the first column is the class, every other column a
+    #parameter, for example 'Class,Manning's n'
+    with open(path, "r", newline="") as file:
+        rows = list(csv.reader(file))
+    header, table = rows[0], {}
+    for row in rows[1:]:
+        if row and row[0].strip():
+            table[row[0].strip()] = {name.strip(): float(value) for name, value in zip(header[1:], row[1:]) if value.strip()}
+    if not table:
+        raise ValueError(f"The classification table {path} has no classes.")
+    return table
+
+def _class_key(value):
+    return str(value).strip().lower()
+
+def class_field(features, table):
+    #Attribute of the features whose values match the most classes of the table
+    classes = {_class_key(name) for name in table}
+    counts = {}
+    for feature in features:
+        for field, value in feature["properties"].items():
+            counts[field] = counts.get(field, 0) + (_class_key(value) in classes)
+    if not counts:
+        raise ValueError("The layer has no attributes to classify it by.")
+    return max(counts, key=counts.get)
+
+###############################################################################################
+########################################## 2. Layers ##########################################
+###############################################################################################
+def read_layer(path, crs, table, field=None):
+    #Polygons of a shapefile in the CRS of the terrain with their class numbers. Returns the
+    #geometries, an (n, 4) array of their bounding boxes, the class number of each polygon and
+    #the class names, in the order of the class numbers.
+    with fiona.open(path) as layer:
+        features = list(layer)
+        layer_crs = layer.crs
+    field = field or class_field(features, table)
+    names, numbers, geometries, classes = [], {}, [], []
+    for feature in features:
+        if feature["geometry"] is None:
+            continue
+        geometry = feature["geometry"]
+        if layer_crs and crs and layer_crs != crs:
+            geometry = fiona.transform.transform_geom(layer_crs, crs, geometry)
+        name = str(feature["properties"][field]).strip()
+        if name not in numbers:
+            numbers[name] = len(names)
+            names.append(name)
+        geometries.append(geometry)
+        classes.append(numbers[name])
+    bounds = np.array([rasterio.features.bounds(geometry) for geometry in geometries], dtype="float64").reshape(-1, 4)
+    return geometries, bounds, np.array(classes, dtype="int32"), names
+
+def parameter_values(names, table, defaults=None):
+    #Value of every parameter of the table for every class number, NODATA for classes missing
+    #from the table (or the default of the parameter). Returns the values and the missing classes.
+    lookup = {_class_key(name): values for name, values in table.items()}
+    parameters = sorted({parameter for values in table.values() for parameter in values})
+    defaults = defaults or {}
+    values = {parameter: np.full(len(names), defaults.get(parameter, NODATA), dtype="float32") for parameter in parameters}
+    missing = []
+    for number, name in enumerate(names):
+        row = lookup.get(_class_key(name))
+        if row is None:
+            missing.append(name)
+            continue
+        for parameter, value in row.items():
+            values[parameter][number] = value
+    return values, missing
+
+###############################################################################################
+#################################### 3. Tiled Rasterizing #####################################
+###############################################################################################
+def tile_windows(width, height, tile_size=TILE_SIZE):
+    for row in range(0, height, tile_size):
+        for column in range(0, width, tile_size):
+            yield rasterio.windows.Window(column, row, min(tile_size, width - column), min(tile_size, height - row))
+
+def burn_tile(window, transform, geometries, bounds, classes):
+    #Class number of every pixel of a tile (-1 outside the polygons), burning only the polygons
+    #whose bounding boxes touch the tile
+    left, bottom, right, top = rasterio.windows.bounds(window, transform)
+    touching = np.flatnonzero((bounds[:, 0] <= right) & (bounds[:, 2] >= left) &
+                              (bounds[:, 1] <= top) & (bounds[:, 3] >= bottom))
+    shape = (int(window.height), int(window.width))
+    if len(touching) == 0:
+        return np.full(shape, -1, dtype="int32")
+    return rasterio.features.rasterize(((geometries[index], int(classes[index])) for index in touching), out_shape=shape,
+                                       transform=rasterio.windows.transform(window, transform), fill=-1, dtype="int32")
+
+def _burnt_tiles(pool, windows, transform, layer, ahead):
+    #Burn at most 'ahead' tiles before the oldest one is collected, so only a few tiles are held
+    #in memory however large the grid is, and the tiles come back in order
+    geometries, bounds, classes, _ = layer
+    pending = deque()
+    for window in windows:
+        pending.append((window, pool.submit(burn_tile, window, transform, geometries, bounds, classes)))
+        if len(pending) >= ahead:
+            window, tile = pending.popleft()
+            yield window, tile.result()
+    while pending:
+        window, tile = pending.popleft()
+        yield window, tile.result()
+
+def rasterize_layer(layer, profile, values, paths, tile_size=TILE_SIZE, max_workers=None):
+    #Write one GeoTIFF per parameter of the layer, tile by tile. Returns the number of pixels of
+    #every class, with the pixels outside the polygons last.
+    names = layer[3]
+    #Class numbers are shifted by one so that 0 (outside the polygons) looks up NODATA
+    lookups = {parameter: np.concatenate([[NODATA], values[parameter]]).astype("float32") for parameter in values}
+    counts = np.zeros(len(names) + 1, dtype="int64")
+    outputs = {parameter: rasterio.open(paths[parameter], "w", **profile) for parameter in values}
+    workers = max_workers or os.cpu_count() or 1
+    try:
+        windows = tile_windows(profile["width"], profile["height"], tile_size)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for window, tile in _burnt_tiles(pool, windows, profile["transform"], layer, 2 * workers):
+                tile += 1
+                counts += np.bincount(tile.ravel(), minlength=len(names) + 1)
+                for parameter, output in outputs.items():
+                    output.write(lookups[parameter][tile], 1, window=window)
+    finally:
+        for output in outputs.values():
+            output.close()
+    return np.roll(counts, -1)
+
+###############################################################################################
+#################################### 4. Rasters and Report ####################################
+###############################################################################################
+def _file_name(parameter):
+    #File name of a parameter raster in the cache, without the characters Windows does not allow;
+    #outside the cache it starts with the area name
+    name = "".join(character for character in parameter if character not in '\\/:*?"<>|')
+    return f"{name}.tif"
+
+def raster_profile(terrain_path, bounds=None):
+    #GeoTIFF profile of the terrain grid, cut to 'bounds' (left, bottom, right, top) when given
+    with rasterio.open(terrain_path) as terrain:
+        window = rasterio.windows.Window(0, 0, terrain.width, terrain.height)
+        if bounds is not None:
+            window = rasterio.windows.from_bounds(*bounds, transform=terrain.transform)
+            window = window.round_offsets().round_lengths().intersection(
+                rasterio.windows.Window(0, 0, terrain.width, terrain.height))
+        return {"driver": "GTiff", "dtype": "float32", "count": 1, "nodata": NODATA, "crs": terrain.crs,
+                "transform": terrain.window_transform(window), "width": int(window.width), "height": int(window.height),
+                "tiled": True, "blockxsize": 256, "blockysize": 256, "compress": "deflate"}
+
+def cache_key(terrain_path, land_use_path, soil_path, land_cover_table, soil_table, default_mannings_n, bounds, fields):
+    #Hash of everything the rasters are made from
+    parts = [RASTER_VERSION, json.dumps([land_cover_table, soil_table, default_mannings_n, bounds, fields], sort_keys=True)]
+    parts += [RunManifest.file_digest(path)["sha256"] for path in (terrain_path, land_use_path, soil_path)]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:32]
+
+def hydraulic_rasters(terrain_path, land_use_path, soil_path, output_folder, area_name, land_cover_table=None,
+                      soil_table=None, default_mannings_n=None, bounds=None, land_use_field=None, soil_field=None,
+                      cache_folder=CACHE_FOLDER, tile_size=TILE_SIZE, max_workers=None):
+    #Write the Manning's n and infiltration rasters of the land use and soil layers on the terrain
+    #grid into output_folder, from the cache when they were made from the same inputs before.
+    #Returns the report: the rasters written, the area of every class and the missing classes.
+    land_cover_table = land_cover_table or LAND_COVER_TABLE
+    soil_table = soil_table or SOIL_TABLE
+    defaults = {"Manning's n": float(default_mannings_n)} if default_mannings_n not in (None, "") else {}
+    key = cache_key(terrain_path, land_use_path, soil_path, land_cover_table, soil_table, defaults, bounds,
+                    [land_use_field, soil_field])
+    entry = os.path.join(cache_folder, key) if cache_folder else None
+    #Files in the cache are named without the area, and renamed when they are copied out
+    prefix = "" if entry else f"{area_name} "
+
+    if entry is None or not os.path.exists(os.path.join(entry, REPORT_NAME)):
+        folder = f"{entry}.{os.getpid()}.tmp" if entry else output_folder
+        os.makedirs(folder, exist_ok=True)
+        profile = raster_profile(terrain_path, bounds)
+        pixel_area = abs(profile["transform"].a * profile["transform"].e)
+        report = {"key": key, "rasters": [], "layers": {}}
+        for layer_name, path, table, field, layer_defaults in (("Land Use", land_use_path, land_cover_table, land_use_field, defaults),
+                                                                ("Soils", soil_path, soil_table, soil_field, {})):
+            layer = read_layer(path, profile["crs"], table, field)
+            values, missing = parameter_values(layer[3], table, layer_defaults)
+            paths = {parameter: os.path.join(folder, prefix + _file_name(parameter)) for parameter in values}
+            counts = rasterize_layer(layer, profile, values, paths, tile_size, max_workers)
+            report["rasters"] += [os.path.basename(path) for path in paths.values()]
+            report["layers"][layer_name] = {
+                "classes": {name: round(float(count) * pixel_area, 1) for name, count in zip(layer[3], counts)},
+                "outside_m2": round(float(counts[-1]) * pixel_area, 1),
+                "missing_classes": missing}
+        with open(os.path.join(folder, prefix + REPORT_NAME), "w") as file:
+            json.dump(report, file, indent=1)
+        if entry:
+            try:
+                os.rename(folder, entry)
+            except OSError:
+                #Another run cached the same rasters first
+                shutil.rmtree(folder, ignore_errors=True)
+    else:
+        print(f"Hydraulic rasters {key[:12]} found in the cache")
+
+    if entry:
+        os.makedirs(output_folder, exist_ok=True)
+        with open(os.path.join(entry, REPORT_NAME), "r") as file:
+            report = json.load(file)
+        for name in report["rasters"]:
+            shutil.copy2(os.path.join(entry, name), os.path.join(output_folder, f"{area_name} {name}"))
+        report["rasters"] = [f"{area_name} {name}" for name in report["rasters"]]
+        with open(os.path.join(output_folder, f"{area_name} {REPORT_NAME}"), "w") as file:
+            json.dump(report, file, indent=1)
+    else:
+        with open(os.path.join(output_folder, prefix + REPORT_NAME), "r") as file:
+            report = json.load(file)
+    for layer_name, layer in report["layers"].items():
+        if layer["missing_classes"]:
+            print(f"{layer_name} classes missing from the classification table: {', '.join(layer['missing_classes'])}")
+    print(f"Hydraulic rasters written to {output_folder}: {', '.join(report['rasters'])}")
+    return report
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Rasterize Manning's n and infiltration grids from land use and soil shapefiles.")
+    parser.add_argument("terrain", help="terrain GeoTIFF whose grid the rasters use")
+    parser.add_argument("land_use", help="land use shapefile")
+    parser.add_argument("soils", help="soil shapefile")
+    parser.add_argument("output_folder")
+    parser.add_argument("--area-name", default="Model", help="name the rasters start with")
+    parser.add_argument("--land-cover-table", help="CSV of the land cover classes and their Manning's n")
+    parser.add_argument("--soil-table", help="CSV of the soil classes and their infiltration parameters")
+    parser.add_argument("--default-mannings-n", type=float, help="Manning's n of land cover classes missing from the table")
+    parser.add_argument("--land-use-field", help="attribute holding the land cover class (found from the table by default)")
+    parser.add_argument("--soil-field", help="attribute holding the soil class (found from the table by default)")
+    parser.add_argument("--no-cache", action="store_true", help="always rasterize, without the cache")
+    options = parser.parse_args(arguments)
+    hydraulic_rasters(options.terrain, options.land_use, options.soils, options.output_folder, options.area_name,
+                      read_lookup_table(options.land_cover_table) if options.land_cover_table else None,
+                      read_lookup_table(options.soil_table) if options.soil_table else None,
+                      options.default_mannings_n, None, options.land_use_field, options.soil_field,
+                      None if options.no_cache else CACHE_FOLDER)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+###############################################################################################
+######################################### Input Store #########################################
+###############################################################################################
+
+#Keeps the input files of the runs (the terrain GeoTIFF, the shapefiles and the rainfall data) in
+#one store folder, once each, keyed by their content hash. A shapefile is stored as one bundle
+#with its .shx, .dbf, .prj and .cpg files. The 'User Input Files' folder of a run holds hard links
+#to the stored files under the run's names, and a manifest of the inputs with the store entry of
+#every one, so a 2 GB DEM used by dozens of storm scenarios takes its space once. Where a hard
+#link cannot be made (the store is on another drive) the input is copied into the run folder, so
+#a run folder always holds its inputs. The store is only used when it is switched on, and inputs
+#no run links to any more are removed with --prune.
+#The key of an input is the SHA-256 the run manifest records for it, with the extension and size
+#of each of its files, so two bundles of different files never share an entry. Stored files are
+#read-only: a hard link is the same file, so a run changing its input would change it for every
+#run sharing it.
+
+#Usage: python InputStore.py "<User Input Files folder>" [--materialize]   (or --list, --prune)
+
+#*********************************************************************************************
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import stat
+
+import OutputArchive
+import RunManifest
+import StageTrace
+
+ENTRY_FILE = "entry.json"
+#Manifest of the inputs of a run, in its 'User Input Files' folder
+INPUTS_FILE = "input_store.json"
+#Hashes of the input files by path, size and modification time, so a DEM of several GB is
+#hashed once and not on every run
+DIGEST_FILE = "digests.json"
+
+#Store folder and whether it is used; set with configure(). The store is used when the
+#RAS_INPUT_STORE variable sets its folder, otherwise the inputs are copied into every run.
+settings = {
+    "folder": os.environ.get("RAS_INPUT_STORE") or RunManifest.data_folder("Input Store"),
+    "enabled": bool(os.environ.get("RAS_INPUT_STORE")),
+}
+
+def configure(folder=None, enabled=None):
+    for key, value in (("folder", folder), ("enabled", enabled)):
+        if value is not None:
+            settings[key] = value
+
+###############################################################################################
+######################################### 1. Bundles ##########################################
+###############################################################################################
+def bundle_parts(path):
+    #Files of an input: the file, and the other files of a shapefile
+    parts = [path]
+    if path.lower().endswith(".shp"):
+        stem = os.path.splitext(path)[0]
+        parts += [stem + extension for extension in RunManifest.SHAPEFILE_PARTS if os.path.exists(stem + extension)]
+    return parts
+
+def input_key(path):
+    #Key of an input from the SHA-256 of all its files, reusing the hash kept in the store while
+    #the files are unchanged
+    digests_path = os.path.join(settings["folder"], DIGEST_FILE)
+    digests = {}
+    if os.path.exists(digests_path):
+        with open(digests_path, "r") as file:
+            digests = json.load(file)
+    key = os.path.abspath(path)
+    digest = RunManifest.file_digest(path, digests.get(key))
+    if digests.get(key) != digest:
+        digests[key] = digest
+        os.makedirs(settings["folder"], exist_ok=True)
+        with open(digests_path + f".{os.getpid()}", "w") as file:
+            json.dump(digests, file)
+        os.replace(digests_path + f".{os.getpid()}", digests_path)
+    parts = [f"{os.path.splitext(part)[1].lower()} {os.path.getsize(part)}" for part in bundle_parts(path)]
+    return hashlib.sha256("\n".join([digest["sha256"]] + parts).encode()).hexdigest()
+
+###############################################################################################
+##################################### 2. Store and Place ######################################
+###############################################################################################
+def protect(entry):
+    #Make the files of a stored input read-only (again, a file made writable to remove one of its
+    #links on Windows is too)
+    for name in os.listdir(entry):
+        path = os.path.join(entry, name)
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+        if mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH):
+            os.chmod(path, mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+def store_input(path):
+    #Add an input to the store unless its content is already there. Returns its key and entry folder.
+    key = input_key(path)
+    entry = os.path.join(settings["folder"], key)
+    if os.path.exists(os.path.join(entry, ENTRY_FILE)):
+        protect(entry)
+        return key, entry
+
+    #Copy to a temporary folder first so other runs never see a half written entry
+    temporary = f"{entry}.{os.getpid()}.tmp"
+    os.makedirs(temporary, exist_ok=True)
+    #Stored as 'input' with the extensions of the files, the input itself first
+    files = ["input" + os.path.splitext(part)[1].lower() for part in bundle_parts(path)]
+    for part, name in zip(bundle_parts(path), files):
+        OutputArchive.copy_verified(part, os.path.join(temporary, name))
+    details = {"name": os.path.basename(path), "source": os.path.abspath(path), "files": files,
+               "bytes": sum(os.path.getsize(part) for part in bundle_parts(path)),
+               "created": datetime.datetime.now().isoformat(timespec="seconds")}
+    with open(os.path.join(temporary, ENTRY_FILE), "w") as file:
+        json.dump(details, file, indent=1)
+    try:
+        os.rename(temporary, entry)
+    except OSError:
+        #Another run stored the same input first
+        shutil.rmtree(temporary, ignore_errors=True)
+        protect(entry)
+        return key, entry
+    protect(entry)
+    print(f"Input {os.path.basename(path)} stored as {key[:12]} ({details['bytes'] / 1e6:.0f} MB)")
+    return key, entry
+
+def entry_targets(entry, destination):
+    #(stored file, destination) of every file of a stored input: the input itself to 'destination'
+    #and the other files of a shapefile renamed like it
+    with open(os.path.join(entry, ENTRY_FILE), "r") as file:
+        files = json.load(file)["files"]
+    stem = os.path.splitext(destination)[0]
+    return [(os.path.join(entry, name), destination if index == 0 else stem + os.path.splitext(name)[1])
+            for index, name in enumerate(files)]
+
+def place_input(entry, destination):
+    #Hard link the files of a stored input to 'destination' (renamed like it). Returns False when
+    #they cannot be linked, for example because the store is on another drive.
+    linked = []
+    try:
+        for stored, target in entry_targets(entry, destination):
+            if os.path.exists(target):
+                if os.path.samefile(stored, target):
+                    continue
+                OutputArchive.remove_file(target)
+            os.link(stored, target)
+            linked.append(target)
+    except OSError:
+        for target in linked:
+            OutputArchive.remove_file(target)
+        protect(entry)
+        return False
+    return True
+
+def store_inputs(pairs, input_files):
+    #Store the inputs of a run ((source, destination) pairs with the destinations in the run's
+    #'User Input Files' folder), link them into the folder (or copy the ones that cannot be linked)
+    #and write its manifest of the inputs. Returns the manifest.
+    inputs = {}
+    for source, destination in pairs:
+        with StageTrace.span(f"Store {os.path.basename(source)}", "file"):
+            key, entry = store_input(source)
+            linked = place_input(entry, destination)
+        inputs[os.path.basename(destination)] = {"key": key, "entry": entry, "source": os.path.abspath(source), "linked": linked}
+    unlinked = [name for name, details in inputs.items() if not details["linked"]]
+    print(f"{len(inputs) - len(unlinked)} input(s) linked from the input store {settings['folder']}")
+    if unlinked:
+        #The store is on another drive: the run folder gets verified copies of these inputs
+        print(f"Copied instead (the store is on another drive): {', '.join(unlinked)}")
+        #From the sources the entries were stored from, so the copies are not read-only
+        with StageTrace.span("Copy unlinked inputs", "file"):
+            OutputArchive.transfer(OutputArchive.shapefile_pairs([(source, destination) for source, destination in pairs
+                                                                  if os.path.basename(destination) in unlinked]))
+        for name in unlinked:
+            inputs[name]["copied"] = True
+    with open(os.path.join(input_files, INPUTS_FILE), "w") as file:
+        json.dump({"store": settings["folder"], "inputs": inputs}, file, indent=1)
+    return inputs
+
+def materialize(input_files):
+    #Copy the inputs a run only points to from the store into its 'User Input Files' folder (runs
+    #stored before unlinked inputs were copied), for example before the run folder is moved to
+    #another machine
+    with open(os.path.join(input_files, INPUTS_FILE), "r") as file:
+        manifest = json.load(file)
+    pairs = [pair for name, details in manifest["inputs"].items() for pair in entry_targets(details["entry"], os.path.join(input_files, name))]
+    OutputArchive.transfer(pairs)
+    for details in manifest["inputs"].values():
+        details["linked"] = True
+    with open(os.path.join(input_files, INPUTS_FILE), "w") as file:
+        json.dump(manifest, file, indent=1)
+
+###############################################################################################
+########################################## 3. Usage ###########################################
+###############################################################################################
+def store_entries():
+    #Stored inputs as (key, name, bytes, hard links to the first file of the input)
+    folder = settings["folder"]
+    entries = []
+    for key in sorted(os.listdir(folder)) if os.path.isdir(folder) else []:
+        entry_file = os.path.join(folder, key, ENTRY_FILE)
+        if os.path.exists(entry_file):
+            with open(entry_file, "r") as file:
+                details = json.load(file)
+            first = os.path.join(folder, key, details["files"][0])
+            entries.append((key, details["name"], details["bytes"], os.stat(first).st_nlink - 1))
+    return entries
+
+def prune():
+    #Remove the stored inputs no run links to any more (their runs were deleted, or copied them).
+    #Returns the bytes freed.
+    freed = 0
+    for key, name, size, links in store_entries():
+        if links == 0:
+            entry = os.path.join(settings["folder"], key)
+            for file_name in os.listdir(entry):
+                OutputArchive.remove_file(os.path.join(entry, file_name))
+            os.rmdir(entry)
+            print(f"Removed {key[:12]} {name}")
+            freed += size
+    return freed
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Inputs of the runs stored once by content.")
+    parser.add_argument("input_files", nargs="?", help="'User Input Files' folder of a run")
+    parser.add_argument("--materialize", action="store_true", help="copy the inputs the run only points to into its folder")
+    parser.add_argument("--list", action="store_true", help="list the stored inputs and the runs linking them")
+    parser.add_argument("--prune", action="store_true", help="remove the stored inputs no run links to")
+    parser.add_argument("--store", help="store folder (default: RAS_INPUT_STORE or 'Input Store' in the data folder of the user)")
+    options = parser.parse_args(arguments)
+    configure(options.store)
+    if options.materialize and options.input_files:
+        materialize(options.input_files)
+    if options.prune:
+        print(f"{prune() / 1e9:.2f} GB freed")
+    if options.list or not options.input_files:
+        entries = store_entries()
+        for key, name, size, links in entries:
+            print(f"{key[:12]}  {size / 1e6:10.0f} MB  {links:3d} run(s)  {name}")
+        total = sum(size for _, _, size, _ in entries)
+        saved = sum(size * max(links - 1, 0) for _, _, size, links in entries)
+        print(f"{len(entries)} inputs, {total / 1e9:.2f} GB stored, {saved / 1e9:.2f} GB saved by sharing")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+###############################################################################################
+######################################### Mesh Check ##########################################
+###############################################################################################
+
+#Builds the computation points of the 2D Flow Area the way RAS Mapper does (a DX by DY grid
+#inside the perimeter, refined along the breaklines with rows at the near spacing that widen to
+#the far spacing) and finds the cells HEC-RAS rejects before the GUI builds the mesh: cells with
+#more than eight faces, computation points too close together and cells crossing the perimeter.
+#The faces of the cells come from the Delaunay triangulation of the points (the dual of the
+#Voronoi cells HEC-RAS builds) and the close points from a grid hash of the points, so large
+#meshes are checked in seconds. The cells are clipped to the perimeter the way HEC-RAS clips
+#them, so concave corners are only a problem where a cell is cut in pieces. The problems are
+#reported with their locations; on its own, the check also removes the problem points in a few
+#passes to show which problems are left after that (the mesh in RAS Mapper is not changed).
+
+#Usage: python MeshCheck.py perimeter.shp breaklines.shp DX DY NEAR REPEATS FAR [--report problems.csv]
+
+#*********************************************************************************************
+import argparse
+import csv
+import numpy as np
+import matplotlib.path
+import matplotlib.tri
+import fiona
+
+#HEC-RAS does not accept cells with more than MAX_FACES faces
+MAX_FACES = 8
+#Points closer than this fraction of the smallest spacing are too close (also to the perimeter)
+MIN_DISTANCE_FACTOR = 0.25
+#Voronoi faces shorter than this fraction of the smallest spacing are not counted as faces
+MIN_FACE_FACTOR = 0.05
+#Passes of removing problem points before the remaining problems are reported
+FIX_PASSES = 5
+#Rows of the transition from the near to the far spacing widen by this factor
+TRANSITION_FACTOR = 1.5
+
+###############################################################################################
+########################################## 1. Inputs ##########################################
+###############################################################################################
+def read_shapes(path):
+    #Outer rings of the polygons, or the lines, of a shapefile as arrays of points x 2
+    shapes = []
+    with fiona.open(path) as layer:
+        for feature in layer:
+            geometry = feature["geometry"]
+            if geometry is None:
+                continue
+            if geometry["type"] == "Polygon":
+                shapes.append(np.asarray(geometry["coordinates"][0], dtype="float64")[:, :2])
+            elif geometry["type"] == "MultiPolygon":
+                shapes += [np.asarray(polygon[0], dtype="float64")[:, :2] for polygon in geometry["coordinates"]]
+            elif geometry["type"] == "LineString":
+                shapes.append(np.asarray(geometry["coordinates"], dtype="float64")[:, :2])
+            elif geometry["type"] == "MultiLineString":
+                shapes += [np.asarray(line, dtype="float64")[:, :2] for line in geometry["coordinates"]]
+    return shapes
+
+def densify(line, spacing):
+    #Points every 'spacing' (or closer) along a polyline, and the unit normal at every point
+    line = np.asarray(line, dtype="float64")
+    distance = np.concatenate([[0.0], np.cumsum(np.hypot(*np.diff(line, axis=0).T))])
+    stations = np.linspace(0.0, distance[-1], max(int(np.ceil(distance[-1] / spacing)), 1) + 1)
+    points = np.column_stack([np.interp(stations, distance, line[:, 0]), np.interp(stations, distance, line[:, 1])])
+    tangent = np.gradient(points, axis=0)
+    normal = np.column_stack([-tangent[:, 1], tangent[:, 0]])
+    return points, normal / np.maximum(np.hypot(normal[:, 0], normal[:, 1]), 1e-12)[:, None]
+
+###############################################################################################
+#################################### 2. Computation Points ####################################
+###############################################################################################
+def grid_points(perimeter, dx, dy):
+    #Computation points at the centres of a DX by DY grid over the perimeter, inside it
+    left, bottom = perimeter.min(axis=0)
+    right, top = perimeter.max(axis=0)
+    x, y = np.meshgrid(np.arange(left + dx / 2, right, dx), np.arange(bottom + dy / 2, top, dy))
+    points = np.column_stack([x.ravel(), y.ravel()])
+    return points[matplotlib.path.Path(perimeter).contains_points(points)]
+
+def breakline_rows(near_spacing, repeats, far_spacing):
+    #Offsets of the rows of points on either side of a breakline and the spacing of each row:
+    #'repeats' rows at the near spacing, then rows widening to the far spacing
+    offsets, spacings = [], []
+    offset, spacing = near_spacing / 2, near_spacing
+    for _ in range(max(int(repeats), 1)):
+        offsets.append(offset)
+        spacings.append(spacing)
+        offset += spacing
+    while far_spacing and spacing < far_spacing:
+        next_spacing = min(spacing * TRANSITION_FACTOR, far_spacing)
+        offset += (next_spacing - spacing) / 2
+        spacing = next_spacing
+        offsets.append(offset)
+        spacings.append(spacing)
+        offset += spacing
+    return offsets, spacings, offset
+
+def generate_points(perimeter, breaklines, dx, dy, near_spacing, repeats, far_spacing):
+    #Computation points of the 2D Flow Area: the grid, cleared around the breaklines and
+    #replaced there by the rows of the breakline refinement
+    points = grid_points(perimeter, dx, dy)
+    offsets, spacings, band = breakline_rows(near_spacing, repeats, far_spacing)
+    area = matplotlib.path.Path(perimeter)
+    for line in breaklines:
+        #Grid points within the refined band are replaced
+        vertices, _ = densify(line, min(near_spacing, dx, dy) / 2)
+        near = np.unique(close_pairs(points, band, vertices)[:, 0])
+        points = np.delete(points, near, axis=0)
+        rows = []
+        for offset, spacing in zip(offsets, spacings):
+            row, normal = densify(line, spacing)
+            rows += [row + normal * offset, row - normal * offset]
+        rows = np.vstack(rows)
+        points = np.vstack([points, rows[area.contains_points(rows)]])
+    return points
+
+###############################################################################################
+###################################### 3. Spatial Index #######################################
+###############################################################################################
+def close_pairs(points, distance, others=None):
+    #Index pairs (i, j) of the points closer than 'distance' to each other (i < j), or to the
+    #points of 'others'. The points are hashed into cells of that size, so only the points of
+    #neighbouring cells are compared.
+    single = others is None
+    others = points if single else np.asarray(others, dtype="float64")
+    if len(points) == 0 or len(others) == 0:
+        return np.empty((0, 2), dtype="int64")
+    origin = np.minimum(points.min(axis=0), others.min(axis=0))
+    cells = np.floor((points - origin) / distance).astype("int64")
+    other_cells = np.floor((others - origin) / distance).astype("int64")
+    width = int(max(cells[:, 0].max(), other_cells[:, 0].max())) + 3
+    keys = (other_cells[:, 1] + 1) * width + other_cells[:, 0] + 1
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+
+    pairs = []
+    for row in (-1, 0, 1):
+        for column in (-1, 0, 1):
+            targets = (cells[:, 1] + 1 + row) * width + cells[:, 0] + 1 + column
+            start = np.searchsorted(sorted_keys, targets, "left")
+            counts = np.searchsorted(sorted_keys, targets, "right") - start
+            i = np.repeat(np.arange(len(points)), counts)
+            positions = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(start, counts)
+            j = order[positions]
+            keep = np.hypot(*(points[i] - others[j]).T) < distance
+            if single:
+                keep &= i < j
+            pairs.append(np.column_stack([i[keep], j[keep]]))
+    return np.vstack(pairs)
+
+###############################################################################################
+########################################## 4. Checks ##########################################
+###############################################################################################
+def voronoi_faces(points, min_face):
+    #Delaunay edges of the points (the pairs of cells sharing a face) and the Voronoi face of every
+    #edge, between the circumcentres of the two triangles of the edge (edges x 2 x 2). Faces
+    #shorter than 'min_face' are left out; the open face of a hull edge runs from the circumcentre
+    #of its triangle away from the third point for the length of the edge.
+    triangulation = matplotlib.tri.Triangulation(points[:, 0], points[:, 1])
+    triangles, neighbours = triangulation.triangles, triangulation.neighbors
+    a, b, c = (points[triangles[:, k]] for k in range(3))
+    d = 2 * (a[:, 0] * (b[:, 1] - c[:, 1]) + b[:, 0] * (c[:, 1] - a[:, 1]) + c[:, 0] * (a[:, 1] - b[:, 1]))
+    d = np.where(np.abs(d) < 1e-12, 1e-12, d)
+    squares = [(p ** 2).sum(axis=1) for p in (a, b, c)]
+    centres = np.column_stack([
+        (squares[0] * (b[:, 1] - c[:, 1]) + squares[1] * (c[:, 1] - a[:, 1]) + squares[2] * (a[:, 1] - b[:, 1])) / d,
+        (squares[0] * (c[:, 0] - b[:, 0]) + squares[1] * (a[:, 0] - c[:, 0]) + squares[2] * (b[:, 0] - a[:, 0])) / d])
+
+    edges, faces = [], []
+    for k in range(3):
+        triangle = np.arange(len(triangles))
+        neighbour = neighbours[:, k]
+        #Every inner edge once (from its lower numbered triangle) and every hull edge
+        own = (neighbour > triangle) | (neighbour < 0)
+        first, second, third = (points[triangles[own, (k + step) % 3]] for step in range(3))
+        start = centres[triangle[own]]
+        #Hull edges: away from the third point of the triangle
+        along = second - first
+        outward = np.column_stack([along[:, 1], -along[:, 0]])
+        outward *= np.where(((third - first) * outward).sum(axis=1) > 0, -1.0, 1.0)[:, None]
+        end = np.where((neighbour[own] >= 0)[:, None], centres[np.maximum(neighbour[own], 0)], start + outward)
+        face = (neighbour[own] < 0) | (np.hypot(*(end - start).T) >= min_face)
+        edges.append(np.column_stack([triangles[own, k], triangles[own, (k + 1) % 3]])[face])
+        faces.append(np.stack([start, end], axis=1)[face])
+    return np.vstack(edges), np.concatenate(faces)
+
+def mesh_problems(points, perimeter, min_distance, min_face):
+    #Points of the cells HEC-RAS rejects, by problem. HEC-RAS clips the cells to the perimeter, so
+    #an edge across the outside of the perimeter (a concave corner or a notch) is only a face when
+    #part of its Voronoi face is left inside; the cell that reaches past the outside to that part
+    #is in pieces (it crosses the perimeter). Points within 'min_face' of the perimeter are
+    #neither inside nor outside it.
+    x, y = perimeter[:, 0], perimeter[:, 1]
+    #Counterclockwise, so a positive radius grows the perimeter (by half of it)
+    area = matplotlib.path.Path(perimeter if (x * np.roll(y, -1) - np.roll(x, -1) * y).sum() > 0 else perimeter[::-1])
+    edges, faces = voronoi_faces(points, min_face)
+    across = np.zeros(len(edges), dtype=bool)
+    for fraction in (0.25, 0.5, 0.75):
+        across |= ~area.contains_points(points[edges[:, 0]] * (1 - fraction) + points[edges[:, 1]] * fraction, radius=min_face)
+    kept, crossing = ~across, []
+    edges_across, faces_across = edges[across], faces[across]
+    for fraction in (0.0, 0.25, 0.5, 0.75, 1.0):
+        #Parts of the faces of the edges across the outside left inside the perimeter
+        sample = faces_across[:, 0] * (1 - fraction) + faces_across[:, 1] * fraction
+        left = area.contains_points(sample, radius=-min_face)
+        kept[np.flatnonzero(across)[left]] = True
+        for end in (0, 1):
+            #The cell whose point only reaches that part across the outside
+            owner = edges_across[left, end]
+            cut = np.zeros(len(owner), dtype=bool)
+            for step in (0.25, 0.5, 0.75):
+                cut |= ~area.contains_points(points[owner] * (1 - step) + sample[left] * step, radius=min_face)
+            crossing.append(owner[cut])
+    faces_per_cell = np.bincount(edges[kept].ravel(), minlength=len(points))
+    ring, _ = densify(np.vstack([perimeter, perimeter[:1]]), min_distance / 2)
+    return {
+        "too many faces": np.flatnonzero(faces_per_cell > MAX_FACES),
+        "points too close": np.unique(close_pairs(points, min_distance)[:, 1]),
+        "too close to the perimeter": np.unique(close_pairs(points, min_distance, ring)[:, 0]),
+        "crossing the perimeter": np.unique(np.concatenate(crossing)).astype("int64"),
+    }
+
+###############################################################################################
+###################################### 5. Fix and Report ######################################
+###############################################################################################
+def check_mesh(perimeters, breaklines, dx, dy, near_spacing, repeats, far_spacing, fix=True):
+    #Generate and check the computation points of every perimeter. Problem points are removed in
+    #up to FIX_PASSES passes when 'fix' is set. Returns the report: points, problems found and
+    #the locations of the problems that remain.
+    dx, dy, near_spacing, far_spacing = (float(value) for value in (dx, dy, near_spacing, far_spacing))
+    spacing = min(dx, dy, near_spacing)
+    min_distance, min_face = spacing * MIN_DISTANCE_FACTOR, spacing * MIN_FACE_FACTOR
+    report = {"points": 0, "found": {}, "fixed": 0, "remaining": []}
+    for number, perimeter in enumerate(perimeters):
+        points = generate_points(perimeter, breaklines, dx, dy, near_spacing, int(float(repeats)), far_spacing)
+        for fix_pass in range(FIX_PASSES if fix else 1):
+            problems = mesh_problems(points, perimeter, min_distance, min_face)
+            if fix_pass == 0:
+                for problem, indexes in problems.items():
+                    report["found"][problem] = report["found"].get(problem, 0) + len(indexes)
+            bad = np.unique(np.concatenate(list(problems.values())))
+            if len(bad) == 0 or not fix:
+                break
+            points = np.delete(points, bad, axis=0)
+            report["fixed"] += len(bad)
+            problems = None
+        if problems is None:
+            problems = mesh_problems(points, perimeter, min_distance, min_face)
+        report["points"] += len(points)
+        report["remaining"] += [(number, problem, *points[index]) for problem, indexes in problems.items() for index in indexes]
+    return report
+
+def format_report(report):
+    found = ", ".join(f"{count} {problem}" for problem, count in report["found"].items() if count) or "no problems"
+    text = f"Mesh check: {report['points']} computation points, {found}"
+    if report["fixed"]:
+        text += f"; {report['fixed']} points removed"
+    return text + f"; {len(report['remaining'])} problem(s) remain"
+
+def write_report(report, path):
+    #Locations of the remaining problems, to find them in RAS Mapper
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Perimeter", "Problem", "X", "Y"])
+        writer.writerows((number + 1, problem, round(x, 2), round(y, 2)) for number, problem, x, y in report["remaining"])
+    return path
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Generate and check the computation points of a 2D Flow Area.")
+    parser.add_argument("perimeter", help="2D Flow Area perimeter shapefile")
+    parser.add_argument("breaklines", help="breaklines shapefile")
+    for name in ("dx", "dy", "near_spacing", "repeats", "far_spacing"):
+        parser.add_argument(name, type=float)
+    parser.add_argument("--no-fix", action="store_true", help="only report the problems")
+    parser.add_argument("--report", help="CSV file of the locations of the remaining problems")
+    options = parser.parse_args(arguments)
+    report = check_mesh(read_shapes(options.perimeter), read_shapes(options.breaklines), options.dx, options.dy,
+                        options.near_spacing, options.repeats, options.far_spacing, not options.no_fix)
+    print(format_report(report))
+    if options.report:
+        write_report(report, options.report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+###############################################################################################
+####################################### Output Archive ########################################
+###############################################################################################
+
+#Copies and moves the files of a run (the input files into the run folder, or a whole run folder
+#to a project share) without losing any. Files on the same volume are moved by renaming them;
+#others are copied in parallel, each hashed while it is read and hashed again once written, and
+#a source is deleted only after its copy matches. A file that is already at the destination with
+#the same content is not copied again. A run folder can also be written to a compressed archive,
+#which is tested before it replaces an older one.
+
+#Usage: python OutputArchive.py "<run folder>" "<destination folder>" [--move] [--zip]
+
+#*********************************************************************************************
+import argparse
+import hashlib
+import os
+import shutil
+import stat
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import RunManifest
+
+CHUNK_SIZE = 8 * 1024 ** 2
+#Files copied at the same time
+WORKERS = 4
+
+#Whether the outputs stage also writes '<run folder>.zip'; set with configure()
+settings = {
+    "zip": False,
+}
+
+def configure(zip_outputs=None):
+    if zip_outputs is not None:
+        settings["zip"] = zip_outputs
+
+###############################################################################################
+######################################## 1. Checksums #########################################
+###############################################################################################
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def same_volume(source, destination):
+    #True when a file can be moved to 'destination' by renaming it
+    folder = os.path.dirname(os.path.abspath(destination))
+    while not os.path.exists(folder):
+        folder = os.path.dirname(folder)
+    return os.stat(source).st_dev == os.stat(folder).st_dev
+
+def remove_file(path):
+    #Remove a file, also a read-only one (the inputs linked from the input store are), which
+    #Windows does not remove. The other hard links of the file share its attributes; the input
+    #store makes its files read-only again when it uses them.
+    try:
+        os.remove(path)
+    except PermissionError:
+        os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
+        os.remove(path)
+
+def copy_verified(source, destination):
+    #Copy a file through a temporary file, hashing the source as it is read, then hash the copy
+    #and only put it in place when both match. Returns the checksum.
+    temporary = destination + ".partial"
+    digest = hashlib.sha256()
+    with open(source, "rb") as reader, open(temporary, "wb") as writer:
+        for chunk in iter(lambda: reader.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            writer.write(chunk)
+    shutil.copystat(source, temporary)
+    if file_sha256(temporary) != digest.hexdigest():
+        remove_file(temporary)
+        raise OSError(f"The copy of {source} does not match the source.")
+    if os.path.exists(destination) and not os.access(destination, os.W_OK):
+        #A read-only file is not replaced on Windows
+        remove_file(destination)
+    os.replace(temporary, destination)
+    return digest.hexdigest()
+
+###############################################################################################
+######################################## 2. Transfers #########################################
+###############################################################################################
+def shapefile_pairs(pairs):
+    #(source, destination) pairs with the .shx, .dbf, .prj and .cpg files of every shapefile added,
+    #renamed like the shapefile
+    expanded = []
+    for source, destination in pairs:
+        expanded.append((source, destination))
+        if source.lower().endswith(".shp"):
+            for extension in RunManifest.SHAPEFILE_PARTS:
+                part = os.path.splitext(source)[0] + extension
+                if os.path.exists(part):
+                    expanded.append((part, os.path.splitext(destination)[0] + extension))
+    return expanded
+
+def _transfer(source, destination, move):
+    #Move or copy one file. Returns what was done and the bytes.
+    size = os.path.getsize(source)
+    os.makedirs(os.path.dirname(os.path.abspath(destination)), exist_ok=True)
+    if os.path.exists(destination) and os.path.getsize(destination) == size and file_sha256(destination) == file_sha256(source):
+        action = "unchanged"
+    elif move and same_volume(source, destination):
+        os.replace(source, destination)
+        return "moved", size
+    else:
+        copy_verified(source, destination)
+        action = "copied"
+    if move:
+        #The destination was checked against the source above
+        remove_file(source)
+    return action, size
+
+def transfer(pairs, move=False, workers=WORKERS):
+    #Copy (or move) every (source, destination) pair, in parallel. A failed file does not stop the
+    #others and its source is kept; the failures are raised together at the end.
+    def run(pair):
+        try:
+            return pair, _transfer(*pair, move), None
+        except OSError as error:
+            return pair, None, error
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(run, pairs))
+    failed = [f"{source}: {error}" for (source, _), _, error in results if error]
+    done = {}
+    for _, result, _ in results:
+        if result:
+            action, size = result
+            count, total = done.get(action, (0, 0))
+            done[action] = (count + 1, total + size)
+    print("Files " + ", ".join(f"{action} {count} ({size / 1e6:.0f} MB)" for action, (count, size) in done.items()))
+    if failed:
+        raise RuntimeError(f"{len(failed)} file(s) could not be {'moved' if move else 'copied'}, their sources are kept:\n" + "\n".join(failed))
+    return done
+
+def transfer_folder(source_folder, destination_folder, move=False, workers=WORKERS):
+    #Copy (or move) all files of a folder, keeping its layout; a moved folder is removed once empty
+    pairs = [(os.path.join(folder, name), os.path.join(destination_folder, os.path.relpath(os.path.join(folder, name), source_folder)))
+             for folder, _, names in os.walk(source_folder) for name in names]
+    done = transfer(pairs, move, workers)
+    if move:
+        for folder, _, _ in sorted(os.walk(source_folder), key=lambda entry: len(entry[0]), reverse=True):
+            if not os.listdir(folder):
+                os.rmdir(folder)
+    return done
+
+###############################################################################################
+######################################### 3. Archives #########################################
+###############################################################################################
+def write_archive(folder, archive_path=None, compression_level=6):
+    #Compressed archive of a folder, tested before it replaces an older archive. Returns its path.
+    archive_path = archive_path or folder.rstrip("\\/") + ".zip"
+    temporary = archive_path + ".partial"
+    with zipfile.ZipFile(temporary, "w", zipfile.ZIP_DEFLATED, compresslevel=compression_level) as archive:
+        for path, _, names in os.walk(folder):
+            for name in sorted(names):
+                file_path = os.path.join(path, name)
+                archive.write(file_path, os.path.relpath(file_path, os.path.dirname(os.path.abspath(folder))))
+    with zipfile.ZipFile(temporary, "r") as archive:
+        broken = archive.testzip()
+    if broken is not None:
+        os.remove(temporary)
+        raise OSError(f"{broken} is damaged in the archive of {folder}.")
+    os.replace(temporary, archive_path)
+    print(f"Archive written: {archive_path} ({os.path.getsize(archive_path) / 1e6:.0f} MB)")
+    return archive_path
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Copy or move a run folder with verified checksums.")
+    parser.add_argument("source", help="run folder")
+    parser.add_argument("destination", help="folder the run folder is copied into")
+    parser.add_argument("--move", action="store_true", help="delete the files of the run folder once their copies are verified")
+    parser.add_argument("--zip", action="store_true", help="also write a compressed archive of the copied run folder")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="files copied at the same time")
+    options = parser.parse_args(arguments)
+    target = os.path.join(options.destination, os.path.basename(os.path.abspath(options.source)))
+    transfer_folder(options.source, target, options.move, options.workers)
+    if options.zip:
+        write_archive(target)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+###############################################################################################
+######################################### Pre-Flight ##########################################
+###############################################################################################
+
+#Checks the inputs of a run against each other before the GUI run starts, so a wrong projection, a
+#2D Flow Area outside the terrain or a bad interval stops the run in a second instead of an hour
+#into it. Only headers and metadata are read: the extent, cell size and projection of the terrain
+#GeoTIFF, the shape type, feature count and extent of every shapefile from its first 100 bytes,
+#the .prj files, and the first records and the last line of the rainfall data. The report lists
+#every check with its status ('error', 'warning', 'ok' or 'skipped').
+
+#Usage: python PreFlight.py run.yaml
+
+#*********************************************************************************************
+import argparse
+import os
+import struct
+import time
+import numpy as np
+import BatchRunner
+import RainfallData
+import RasTextFiles
+
+#Geometry the shapefile of each field must hold
+SHAPE_FIELDS = {"path_to_2d_flow_area": "Polygon", "path_to_breaklines": "PolyLine",
+                "path_to_land_use_layer": "Polygon", "path_to_soil_layer": "Polygon"}
+#Shape types of the shapefile header; the Z (1x) and M (2x) types end in the same digit
+SHAPE_TYPES = {0: "Null", 1: "Point", 3: "PolyLine", 5: "Polygon", 8: "MultiPoint", 31: "MultiPatch"}
+#Rainfall records read to find the time step of the data
+RAINFALL_SAMPLE = 1000
+OUTPUT_INTERVAL_FIELDS = ["hydrograph_output_interval", "mapping_output_interval", "detailed_output_interval"]
+
+###############################################################################################
+######################################### 1. Headers ##########################################
+###############################################################################################
+def shapefile_header(path):
+    #Shape type, extent (xmin, ymin, xmax, ymax) and feature count (from the .shx file, None
+    #without one) of a shapefile, from its 100 byte header
+    with open(path, "rb") as file:
+        header = file.read(100)
+    if len(header) < 100 or struct.unpack(">i", header[:4])[0] != 9994:
+        raise ValueError(f"{path} is not a shapefile.")
+    shape_type = struct.unpack("<i", header[32:36])[0]
+    index = os.path.splitext(path)[0] + ".shx"
+    count = (os.path.getsize(index) - 100) // 8 if os.path.exists(index) else None
+    return {"type": SHAPE_TYPES.get(shape_type if shape_type in (0, 31) else shape_type % 10, str(shape_type)),
+            "bounds": struct.unpack("<4d", header[36:68]), "count": count}
+
+def raster_header(path):
+    #Extent, cell size and projection of a GeoTIFF; only its header is read
+    import rasterio
+    with rasterio.open(path) as raster:
+        return {"bounds": tuple(raster.bounds), "cell_size": max(abs(raster.res[0]), abs(raster.res[1])),
+                "crs": raster.crs, "nodata": raster.nodata}
+
+def read_crs(path):
+    import rasterio.crs
+    with open(path, "r") as file:
+        return rasterio.crs.CRS.from_wkt(file.read())
+
+def same_crs(a, b):
+    #ESRI and EPSG descriptions of one projection do not always compare equal, their codes do
+    return a == b or (a.to_epsg() is not None and a.to_epsg() == b.to_epsg())
+
+def overlap(a, b):
+    #Share of extent 'a' (xmin, ymin, xmax, ymax) inside extent 'b'
+    width = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    height = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    area = (a[2] - a[0]) * (a[3] - a[1])
+    return width * height / area if area > 0 else float(b[0] <= a[0] <= b[2] and b[1] <= a[1] <= b[3])
+
+###############################################################################################
+########################################## 2. Checks ##########################################
+###############################################################################################
+def _check(checks, name, status, message):
+    checks.append({"check": name, "status": status, "message": message})
+
+def check_intervals(values, checks):
+    #The field checks found every interval in the HEC-RAS list the automation picks it from; each
+    #one also needs its code for the HEC-RAS files, and the output intervals must be multiples of
+    #the computation interval
+    fields = list(BatchRunner.INTERVAL_FIELDS) + ["precipitation_data_time_interval"]
+    seconds = {}
+    errors = len(checks)
+    for field in fields:
+        interval = values.get(field)
+        if interval and interval != "Max Profile":
+            try:
+                RasTextFiles.ras_interval(interval)
+                seconds[field] = RasTextFiles.interval_seconds(interval)
+            except (KeyError, ValueError):
+                _check(checks, field, "error", f"'{interval}' has no HEC-RAS file code")
+    computation = seconds.get("computation_interval")
+    for field in OUTPUT_INTERVAL_FIELDS:
+        if computation and field in seconds and round(seconds[field] / computation, 6) % 1:
+            _check(checks, field, "error", f"'{values[field]}' is not a multiple of the computation interval '{values['computation_interval']}'")
+    if len(checks) == errors:
+        _check(checks, "intervals", "ok", f"computation {values['computation_interval']}, outputs "
+                                          + ", ".join(values[field] for field in OUTPUT_INTERVAL_FIELDS))
+
+def check_geodata(values, checks):
+    #Projection, terrain and shapefiles against each other
+    headers = {}
+    for field, shape_type in SHAPE_FIELDS.items():
+        if not os.path.isfile(values.get(field) or ""):
+            continue
+        try:
+            header = headers[field] = shapefile_header(values[field])
+        except (OSError, ValueError) as error:
+            _check(checks, field, "error", str(error))
+            continue
+        if header["type"] != shape_type:
+            _check(checks, field, "error", f"holds {header['type']} shapes, {shape_type} shapes are needed")
+        elif header["count"] == 0:
+            _check(checks, field, "error", "has no features")
+        else:
+            _check(checks, field, "ok", f"{header['count']} {shape_type} feature(s)")
+
+    try:
+        import rasterio
+    except Exception as error:
+        _check(checks, "terrain", "skipped", f"The terrain and projections are not checked: {error}")
+        terrain = None
+    else:
+        terrain = check_terrain(values, headers, checks)
+
+    perimeter = headers.get("path_to_2d_flow_area")
+    if perimeter and terrain:
+        inside = overlap(perimeter["bounds"], terrain["bounds"])
+        if inside == 0:
+            _check(checks, "extent", "error", "The 2D Flow Area is outside the terrain (check the projections)")
+        elif inside < 1:
+            _check(checks, "extent", "warning", f"{1 - inside:.0%} of the extent of the 2D Flow Area is outside the terrain")
+        else:
+            _check(checks, "extent", "ok", "The 2D Flow Area is inside the terrain")
+    if perimeter and "path_to_breaklines" in headers and overlap(headers["path_to_breaklines"]["bounds"], perimeter["bounds"]) == 0:
+        _check(checks, "path_to_breaklines extent", "error", "The breaklines are outside the 2D Flow Area")
+    for field in ("path_to_land_use_layer", "path_to_soil_layer"):
+        if perimeter and field in headers:
+            covered = overlap(perimeter["bounds"], headers[field]["bounds"])
+            if covered == 0:
+                _check(checks, f"{field} extent", "error", "does not overlap the 2D Flow Area")
+            elif covered < 1:
+                _check(checks, f"{field} extent", "warning", f"leaves {1 - covered:.0%} of the extent of the 2D Flow Area uncovered")
+
+def check_terrain(values, headers, checks):
+    #Projection file, terrain GeoTIFF and the .prj files of the shapefiles
+    if not os.path.isfile(values.get("path_to_geometry") or ""):
+        return None
+    try:
+        projection = read_crs(values["projection_file"])
+    except Exception as error:
+        _check(checks, "projection_file", "error", f"cannot be read: {error}")
+        projection = None
+    else:
+        if not projection.is_projected:
+            _check(checks, "projection_file", "error", "is not a projected coordinate system, the spacings are in metres")
+        elif projection.linear_units.lower() not in ("metre", "meter"):
+            _check(checks, "projection_file", "warning", f"is in {projection.linear_units}, the spacings are in metres")
+        else:
+            _check(checks, "projection_file", "ok", projection.to_string()[:80])
+
+    try:
+        terrain = raster_header(values["path_to_geometry"])
+    except Exception as error:
+        _check(checks, "path_to_geometry", "error", f"cannot be read: {error}")
+        return None
+    if terrain["crs"] is None:
+        _check(checks, "path_to_geometry", "warning", "has no projection, the projection file is assumed")
+    elif projection and not same_crs(terrain["crs"], projection):
+        _check(checks, "path_to_geometry", "error", f"is in {terrain['crs'].to_string()[:80]}, not in the projection of the projection file")
+    else:
+        _check(checks, "path_to_geometry", "ok", f"{terrain['cell_size']:g} cells")
+    spacing = min(float(values["point_spacing_dx"]), float(values["point_spacing_dy"]))
+    if spacing < terrain["cell_size"]:
+        _check(checks, "point_spacing", "warning", f"cells of {spacing:g} are smaller than the terrain cells of {terrain['cell_size']:g}")
+
+    for field in headers:
+        prj = os.path.splitext(values[field])[0] + ".prj"
+        if not os.path.exists(prj):
+            _check(checks, f"{field} projection", "warning", "has no .prj file, the projection file is assumed")
+        elif projection:
+            try:
+                if not same_crs(read_crs(prj), projection):
+                    _check(checks, f"{field} projection", "error", "is not in the projection of the projection file")
+            except Exception as error:
+                _check(checks, f"{field} projection", "error", f"the .prj file cannot be read: {error}")
+    return terrain
+
+def check_rainfall(values, checks):
+    #Time step and time window of the rainfall data from its first records and last line
+    path = values["path_to_rainfall_data"]
+    if not values["user_input_precipitation_data"] or not os.path.isfile(path):
+        return
+    try:
+        times, _ = RainfallData.read_rainfall_data(path, nrows=RAINFALL_SAMPLE)
+        interval, _ = RainfallData.infer_time_interval(times[~np.isnat(times)])
+        last = RainfallData.read_last_time(path)
+    except Exception as error:
+        _check(checks, "path_to_rainfall_data", "error", str(error))
+        return
+    typed = values.get("precipitation_data_time_interval")
+    if typed and typed != interval:
+        _check(checks, "precipitation_data_time_interval", "warning", f"'{typed}' does not match the data, '{interval}' is used")
+    first = times[0]
+    if np.isnat(first) or np.isnat(last):
+        _check(checks, "path_to_rainfall_data", "error", "the first or last record cannot be read")
+        return
+    #The plan starts at 'starting_time' on the first day of the data and ends at 'ending_time' on its last day
+    clock = [np.timedelta64(int(values[field][:2]) * 60 + int(values[field][2:]), "m") for field in ("starting_time", "ending_time")]
+    start = first.astype("datetime64[D]") + clock[0]
+    end = last.astype("datetime64[D]") + clock[1]
+    if end <= start:
+        _check(checks, "path_to_rainfall_data", "error", "the simulation would end before it starts")
+    elif start < first or end > last:
+        _check(checks, "path_to_rainfall_data", "warning", f"records from {str(first)[:16]} to {str(last)[:16]} do not cover the simulation")
+    else:
+        _check(checks, "path_to_rainfall_data", "ok", f"{interval} records from {str(first)[:16]} to {str(last)[:16]}")
+
+###############################################################################################
+########################################## 3. Report ##########################################
+###############################################################################################
+def preflight(values):
+    #Report of all checks of the inputs of one run (values of the input form or a manifest row)
+    started = time.perf_counter()
+    checks = []
+    for error in BatchRunner.validate_scenario(values):
+        _check(checks, "fields", "error", error)
+    #Files the field checks found missing are left out of the other checks
+    for check in (check_intervals, check_geodata, check_rainfall):
+        try:
+            check(values, checks)
+        except (KeyError, ValueError, OSError) as error:
+            _check(checks, check.__name__[6:], "error", f"could not be checked: {error}")
+    statuses = [check["status"] for check in checks]
+    return {"area": values.get("area_name"), "checks": checks, "errors": statuses.count("error"),
+            "warnings": statuses.count("warning"), "valid": "error" not in statuses,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+def problems(report):
+    #Errors and warnings of a report as lines of text
+    return [f"{check['status'].capitalize()}: {check['check']}: {check['message']}"
+            for check in report["checks"] if check["status"] in ("error", "warning", "skipped")]
+
+def format_report(report):
+    lines = [f"Pre-flight check of {report['area']}: {report['errors']} error(s), {report['warnings']} warning(s) "
+             f"in {report['seconds']:.2f} s"]
+    return "\n".join(lines + problems(report))
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Check the inputs of a Rain on Grid run against each other.")
+    parser.add_argument("spec", help="JSON or YAML spec of one run, or a CSV or YAML batch manifest")
+    options = parser.parse_args(arguments)
+    for values in BatchRunner.read_scenarios(options.spec):
+        print(format_report(preflight(values)))
+
+if __name__ == "__main__":
+    main()
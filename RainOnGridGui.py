@@ -0,0 +1,318 @@
+###############################################################################################
+################# Rain on Grid 2D Model Automation - Graphical User Interface #################
+###############################################################################################
+
+#Tk input form and stage messages of the Rain on Grid 2D Model Automation. The form collects the
+#inputs of one run and starts it through RainOnGrid2DModelAutomation.run_values; the messages
+#pause the run for the manual steps in HEC-RAS (boundary conditions, meshes and friction slope).
+
+#*********************************************************************************************
+import tkinter as tk
+from tkinter import filedialog, messagebox
+import BatchRunner
+import PreFlight
+import RainOnGrid2DModelAutomation as automation
+
+###############################################################################################
+###################################### 1. Stage Messages ######################################
+###############################################################################################
+def tk_prompt(title, message, value=None, close_only=False):
+    #Show a stage message and wait for the user. Returns the value typed into the entry box (''
+    #without one) when 'Continue' is clicked and None when the message is cancelled or closed.
+    result = {}
+    root = tk.Tk()
+    root.title(title)
+
+    #Set the icon
+    root.iconbitmap('rog_automation.ico')
+
+    label = tk.Label(root, text=message)
+    label.pack(pady=10)
+
+    entry = None
+    if value is not None:
+        entry = tk.Entry(root)
+        entry.insert(0, value)
+        entry.pack(pady=10)
+
+    def continue_clicked():
+        result["value"] = entry.get() if entry is not None else ""
+        root.destroy()
+
+    button_frame = tk.Frame(root)
+    button_frame.pack(pady=10)
+
+    if close_only:
+        close_button = tk.Button(button_frame, text="Close", command=continue_clicked)
+        close_button.pack(side=tk.LEFT, padx=10)
+    else:
+        continue_button = tk.Button(button_frame, text="Continue", command=continue_clicked)
+        continue_button.pack(side=tk.LEFT, padx=10)
+
+        cancel_button = tk.Button(button_frame, text="Cancel", command=root.destroy)
+        cancel_button.pack(side=tk.LEFT, padx=10)
+
+    root.mainloop()
+    return result.get("value")
+
+###############################################################################################
+######################################## 2. Input Form ########################################
+###############################################################################################
+#Helper function to select files
+def browse_file(entry, file_types):
+    file_path = filedialog.askopenfilename(filetypes=file_types)
+    if file_path:
+        entry.delete(0, tk.END)
+        entry.insert(0, file_path)
+
+def browse_directory(entry):
+    folder_path = filedialog.askdirectory()
+    if folder_path:
+        entry.delete(0, tk.END)
+        entry.insert(0, folder_path)
+        
+def validate_inputs(values):
+    missing_inputs = BatchRunner.missing_inputs(values)
+    if missing_inputs:
+        missing_inputs_str = ', '.join(missing_inputs)
+        messagebox.showerror("Input Error", f"Please provide values for the following inputs: {missing_inputs_str}")
+        return False
+    #Check the inputs against each other before anything is started (see PreFlight.py)
+    report = PreFlight.preflight(values)
+    if not report["valid"]:
+        messagebox.showerror("Input Error", PreFlight.format_report(report))
+        return False
+    if report["warnings"]:
+        messagebox.showwarning("Input Warning", PreFlight.format_report(report))
+    return True
+
+def run_estimate(values):
+    #Estimated cells, compute time and output size of the run, calibrated from the past runs in its
+    #output folder (see RunEstimator.py)
+    try:
+        import RunEstimator
+        calibration = RunEstimator.calibrate([values["output_folder_path"]])
+        return RunEstimator.format_estimate(RunEstimator.estimate_scenario(values, calibration))
+    except Exception as error:
+        return f"The run could not be estimated: {error}"
+
+def proceed():
+    values = {
+        "area_name": area_name.get(),
+        "input_folder_path": input_folder.get(),
+        "output_folder_path": output_folder.get(),
+        "projection_file": projection_file.get(),
+        "path_to_geometry": path_to_geometry.get(),
+        "path_to_2d_flow_area": path_to_2d_flow_area.get(),
+        "path_to_breaklines": path_to_breaklines.get(),
+        "path_to_land_use_layer": path_to_land_use_layer.get(),
+        "path_to_soil_layer": path_to_soil_layer.get(),
+        "point_spacing_dx": point_spacing_dx.get(),
+        "point_spacing_dy": point_spacing_dy.get(),
+        "default_mannings_n": default_mannings_n.get(),
+        "near_spacing_m": near_spacing_m.get(),
+        "repeats": repeats.get(),
+        "far_spacing_m": far_spacing_m.get(),
+        "user_input_precipitation_data": user_input_precipitation_data_var.get(),
+        "path_to_rainfall_data": path_to_rainfall_data.get(),
+        "precipitation_data_time_interval": precipitation_data_time_interval.get(),
+        "starting_time": starting_time.get(),
+        "ending_time": ending_time.get(),
+        "computation_interval": computation_interval.get(),
+        "hydrograph_output_interval": hydrograph_output_interval.get(),
+        "mapping_output_interval": mapping_output_interval.get(),
+        "detailed_output_interval": detailed_output_interval.get()
+    }
+    
+    if validate_inputs(values):
+        #The estimate is shown first, so a run that would take far too long can be changed
+        if messagebox.askokcancel("User Input Received", run_estimate(values) + "\n\nThank You for your Input. The HEC-RAS Rain-on-Grid Automation Program will run. PLEASE CLOSE ALL OTHER FILES AND PROGRAMS BEFORE CLICKING 'OK' AND DO NOT USE YOUR MOUSE OR KEYBOARD THERE AFTER."):            
+            automation.run_values(values, tk_prompt)
+
+def toggle_precipitation_inputs():
+    if user_input_precipitation_data_var.get():
+        path_to_rainfall_data.config(state='normal')
+        rainfall_browse.config(state='normal')
+        precipitation_data_time_interval.config(state='normal')
+    else:
+        path_to_rainfall_data.config(state='disabled')
+        rainfall_browse.config(state='disabled')
+        precipitation_data_time_interval.config(state='disabled')
+
+def main():
+    #Build the input form and wait for the user
+    global app, area_name, input_folder, output_folder, projection_file, path_to_geometry, path_to_2d_flow_area, path_to_breaklines, path_to_land_use_layer, path_to_soil_layer, default_mannings_n, point_spacing_dx, point_spacing_dy, near_spacing_m, repeats, far_spacing_m, user_input_precipitation_data_var, path_to_rainfall_data, rainfall_browse, precipitation_data_time_interval, starting_time, ending_time, computation_interval, hydrograph_output_interval, mapping_output_interval, detailed_output_interval
+    app = tk.Tk()
+    app.title("HEC-RAS 2D Rain on Grid Model Automation")
+    app.iconbitmap('rog_automation.ico')
+
+    #Create frames for each group of inputs
+    frame_project = tk.LabelFrame(app, text="Project Information")
+    frame_geometry = tk.LabelFrame(app, text="Geometry Setup")
+    frame_hydraulic = tk.LabelFrame(app, text="Hydraulic Properties")
+    frame_2d_flow = tk.LabelFrame(app, text="2D Flow Area Editor")
+    frame_boundary = tk.LabelFrame(app, text="Breakline Properties")
+    frame_precipitation = tk.LabelFrame(app, text="Precipitation Data")
+    frame_simulation = tk.LabelFrame(app, text="Simulation Time Window")
+    frame_computation = tk.LabelFrame(app, text="Computation Settings")
+
+    frames = [frame_project, frame_geometry, frame_hydraulic, frame_2d_flow, frame_boundary, frame_precipitation, frame_simulation, frame_computation]
+
+    #Positioning frames
+    for i, frame in enumerate(frames):
+        frame.pack(fill="both", expand="yes", padx=20, pady=10)
+
+    #Project Information Inputs
+    tk.Label(frame_project, text="Area Name:").pack(side="left")
+    area_name = tk.Entry(frame_project)
+    area_name.pack(side="left", padx=5)
+
+    tk.Label(frame_project, text="Input Folder:").pack(side="left")
+    input_folder = tk.Entry(frame_project)
+    input_folder.pack(side="left", padx=5)
+    input_folder_browse = tk.Button(frame_project, text="Browse", command=lambda: browse_directory(input_folder))
+    input_folder_browse.pack(side="left")
+
+    tk.Label(frame_project, text="Output/Download Folder:").pack(side="left")
+    output_folder = tk.Entry(frame_project)
+    output_folder.pack(side="left", padx=5)
+    output_folder_browse = tk.Button(frame_project, text="Browse", command=lambda: browse_directory(output_folder))
+    output_folder_browse.pack(side="left")
+
+    tk.Label(frame_project, text="Projection File (.prj):").pack(side="left")
+    projection_file = tk.Entry(frame_project)
+    projection_file.pack(side="left", padx=5)
+    projection_file_browse = tk.Button(frame_project, text="Browse", command=lambda: browse_file(projection_file, [('PRJ files', '*.prj')]))
+    projection_file_browse.pack(side="left")
+
+    #Geometry Setup Inputs
+    tk.Label(frame_geometry, text="Terrain File:").pack(side="left")
+    path_to_geometry = tk.Entry(frame_geometry)
+    path_to_geometry.pack(side="left", fill="x", expand=True, padx=5)
+    geometry_browse = tk.Button(frame_geometry, text="Browse", command=lambda: browse_file(path_to_geometry, [('TIFF files', '*.tif')]))
+    geometry_browse.pack(side="left")
+
+    tk.Label(frame_geometry, text="2D Flow Area Shape File:").pack(side="left")
+    path_to_2d_flow_area = tk.Entry(frame_geometry)
+    path_to_2d_flow_area.pack(side="left", fill="x", expand=True, padx=5)
+    flow_area_browse = tk.Button(frame_geometry, text="Browse", command=lambda: browse_file(path_to_2d_flow_area, [('Shapefiles', '*.shp')]))
+    flow_area_browse.pack(side="left")
+
+    tk.Label(frame_geometry, text="Breaklines Shape File:").pack(side="left")
+    path_to_breaklines = tk.Entry(frame_geometry)
+    path_to_breaklines.pack(side="left", fill="x", expand=True, padx=5)
+    breaklines_browse = tk.Button(frame_geometry, text="Browse", command=lambda: browse_file(path_to_breaklines, [('Shapefiles', '*.shp')]))
+    breaklines_browse.pack(side="left")
+
+    #Hydraulic Properties Inputs
+    tk.Label(frame_hydraulic, text="Land Use Shape File:").pack(side="left")
+    path_to_land_use_layer = tk.Entry(frame_hydraulic)
+    path_to_land_use_layer.pack(side="left", fill="x", expand=True, padx=5)
+    land_use_browse = tk.Button(frame_hydraulic, text="Browse", command=lambda: browse_file(path_to_land_use_layer, [('Shapefiles', '*.shp')]))
+    land_use_browse.pack(side="left")
+
+    tk.Label(frame_hydraulic, text="Soil Layer Shape File:").pack(side="left")
+    path_to_soil_layer = tk.Entry(frame_hydraulic)
+    path_to_soil_layer.pack(side="left", fill="x", expand=True, padx=5)
+    soil_layer_browse = tk.Button(frame_hydraulic, text="Browse", command=lambda: browse_file(path_to_soil_layer, [('Shapefiles', '*.shp')]))
+    soil_layer_browse.pack(side="left")
+
+    tk.Label(frame_hydraulic, text="Default Manning's n:").pack(side="left")
+    default_mannings_n = tk.Entry(frame_hydraulic)
+    default_mannings_n.insert(0, "0.06")
+    default_mannings_n.pack(side="left", padx=5)
+
+    #2D Flow Area Editor
+    tk.Label(frame_2d_flow, text="Points Spacing DX:").pack(side="left")
+    point_spacing_dx = tk.Entry(frame_2d_flow)
+    point_spacing_dx.insert(0, "10")
+    point_spacing_dx.pack(side="left", padx=5)
+    tk.Label(frame_2d_flow, text="Points Spacing DY:").pack(side="left")
+    point_spacing_dy = tk.Entry(frame_2d_flow)
+    point_spacing_dy.insert(0, "10")
+    point_spacing_dy.pack(side="left", padx=5)
+
+    #Breakline Properties
+    tk.Label(frame_boundary, text="Near Spacing (m):").pack(side="left")
+    near_spacing_m = tk.Entry(frame_boundary)
+    near_spacing_m.insert(0, "5")
+    near_spacing_m.pack(side="left", padx=5)
+
+    tk.Label(frame_boundary, text="Repeats:").pack(side="left")
+    repeats = tk.Entry(frame_boundary)
+    repeats.insert(0, "2")
+    repeats.pack(side="left", padx=5)
+
+    tk.Label(frame_boundary, text="Far Spacing (m):").pack(side="left")
+    far_spacing_m = tk.Entry(frame_boundary)
+    far_spacing_m.insert(0, "7.5")
+    far_spacing_m.pack(side="left", padx=5)
+
+    #Precipitation Data
+    tk.Label(frame_precipitation, text="User Input for Precipitation Data:").pack(side="left")
+    user_input_precipitation_data_var = tk.IntVar()
+    user_input_precipitation_data = tk.Checkbutton(frame_precipitation, variable=user_input_precipitation_data_var, command=toggle_precipitation_inputs)
+    user_input_precipitation_data.pack(side="left", padx=5)
+
+    precipitation_description = tk.Label(frame_precipitation, text="If you do not check the box, the program will use SCS Type 3 distribution.", font=('Helvetica', 8, 'italic', 'bold'))
+    precipitation_description.pack(side="left", padx=5, pady=5)
+
+    tk.Label(frame_precipitation, text="Rainfall Data:").pack(side="left")
+    path_to_rainfall_data = tk.Entry(frame_precipitation, state='disabled')
+    path_to_rainfall_data.pack(side="left", expand="yes", fill="x", padx=5)
+    rainfall_browse = tk.Button(frame_precipitation, text="Browse", command=lambda: browse_file(path_to_rainfall_data, [('DAT files', '*.dat')]), state='disabled')
+    rainfall_browse.pack(side="left")
+
+    tk.Label(frame_precipitation, text="Rainfall Data Time Interval (optional):").pack(side="left")
+    precipitation_data_time_interval = tk.Entry(frame_precipitation, state='disabled')
+    precipitation_data_time_interval.pack(side="left", padx=5)
+
+    #Simulation Time Window
+    tk.Label(frame_simulation, text="Starting Time:").pack(side="left")
+    starting_time = tk.Entry(frame_simulation)
+    starting_time.insert(0, "0100")
+    starting_time.pack(side="left", padx=5)
+
+    tk.Label(frame_simulation, text="Ending Time:").pack(side="left")
+    ending_time = tk.Entry(frame_simulation)
+    ending_time.insert(0, "1100")
+    ending_time.pack(side="left", padx=5)
+
+    #Computation Settings
+    computation_settings = {
+        "Computation Interval": "1 Minute",
+        "Hydrograph Output Interval": "1 Hour",
+        "Mapping Output Interval": "1 Hour",
+        "Detailed Output Interval": "1 Hour"
+    }
+
+    for label, default in computation_settings.items():
+        tk.Label(frame_computation, text=label).pack(side="left")
+        options = ["0.1 Second", "0.2 Second", "0.3 Second", "0.4 Second", "0.5 Second",
+                   "1 Second", "2 Second", "3 Second", "4 Second", "5 Second", "6 Second",
+                   "10 Second", "12 Second", "15 Second", "20 Second", "30 Second",
+                   "1 Minute", "2 Minute", "3 Minute", "4 Minute", "5 Minute", "6 Minute",
+                   "10 Minute", "12 Minute", "15 Minute", "20 Minute", "30 Minute",
+                   "1 Hour", "2 Hour", "3 Hour", "4 Hour", "6 Hour", "8 Hour", "12 Hour", "1 Day"]
+        variable = tk.StringVar(app)
+        variable.set(default)
+        dropdown = tk.OptionMenu(frame_computation, variable, *options)
+        dropdown.pack(side="left", padx=5)
+
+        if label == "Computation Interval":
+            computation_interval = variable
+        elif label == "Hydrograph Output Interval":
+            hydrograph_output_interval = variable
+        elif label == "Mapping Output Interval":
+            mapping_output_interval = variable
+        elif label == "Detailed Output Interval":
+            detailed_output_interval = variable
+
+    #Proceed Button
+    proceed_button = tk.Button(app, text="Proceed", command=proceed)
+    proceed_button.pack(side="bottom", pady=15)
+
+    app.mainloop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+###############################################################################################
+##################################### Rainfall Data Files #####################################
+###############################################################################################
+
+#Reader for the tab separated rainfall .dat files (Date, Time, Precipitation (mm)) of the Rain on
+#Grid 2D Model Automation. Files are streamed in chunks, so multi-year continuous records can be
+#read, and the records are checked for a uniform time step, gaps and negative values. The time
+#step of the data is inferred from the records instead of relying on a typed interval.
+
+#*********************************************************************************************
+import numpy as np
+import pandas as pd
+import RasTextFiles
+
+COLUMNS = ['Date', 'Time', 'Precipitation (mm)']
+
+#Number of gaps and negative values listed in a report (all of them are counted)
+REPORT_LIMIT = 20
+
+###############################################################################################
+######################################## 1. Read Data #########################################
+###############################################################################################
+def _has_header(path):
+    #Rainfall files written by the automation have a header line of the COLUMNS, user files
+    #usually do not. A first record with a missing or unreadable value is still a record.
+    with open(path, "r", encoding="utf-8-sig") as file:
+        first_line = file.readline()
+    fields = [field.strip().lower() for field in first_line.rstrip("\r\n").split("\t")]
+    return fields[:len(COLUMNS)] == [column.lower() for column in COLUMNS]
+
+def _parse_times(dates, clock_times):
+    #Combine dates such as '01JAN2024' with times such as '0000', '00:05' or '2400' (HEC-RAS
+    #writes midnight at the end of a day as 2400 of that day)
+    dates = dates.str.strip()
+    parsed_dates = pd.to_datetime(dates, format='%d%b%Y', errors='coerce')
+    unparsed = parsed_dates.isna()
+    if unparsed.any():
+        parsed_dates[unparsed] = pd.to_datetime(dates[unparsed], format='mixed', dayfirst=True, errors='coerce')
+
+    #Times are read as HHMM numbers; only times written as HH:MM need the slower string parsing
+    clock = pd.to_numeric(clock_times, errors='coerce')
+    unparsed = clock.isna()
+    if unparsed.any():
+        clock[unparsed] = pd.to_numeric(clock_times[unparsed].str.strip().str.replace(':', '', regex=False), errors='coerce')
+    minutes = (clock // 100) * 60 + clock % 100
+    return parsed_dates + pd.to_timedelta(minutes, unit='m')
+
+def read_rainfall_data(path, chunksize=500000, nrows=None):
+    #Read a rainfall .dat file in chunks and return contiguous arrays of the record times
+    #(datetime64) and the precipitation (float, mm). Rows that cannot be parsed are returned
+    #as NaT/NaN and reported by check_rainfall_data. Only the first 'nrows' records are read
+    #when it is given.
+    times = []
+    precipitation_mm = []
+
+    reader = pd.read_csv(path, delimiter='\t', header=None, names=COLUMNS, usecols=[0, 1, 2], dtype=str,
+                         skiprows=1 if _has_header(path) else 0, chunksize=chunksize, nrows=nrows)
+    for chunk in reader:
+        times.append(_parse_times(chunk['Date'], chunk['Time']).to_numpy(dtype='datetime64[ns]'))
+        precipitation_mm.append(pd.to_numeric(chunk['Precipitation (mm)'], errors='coerce').to_numpy(dtype=float))
+
+    #A file with only a header line gives one empty chunk
+    if not sum(len(chunk) for chunk in times):
+        raise ValueError(f"The rainfall data file {path} has no records.")
+
+    return np.concatenate(times), np.ascontiguousarray(np.concatenate(precipitation_mm))
+
+def read_first_time(path, nrows=1000):
+    #Time of the first record of a rainfall .dat file that can be read, from the start of the file
+    #only
+    times, _ = read_rainfall_data(path, nrows=nrows)
+    times = times[~np.isnat(times)]
+    if len(times) == 0:
+        raise ValueError(f"The first {nrows} records of the rainfall data file {path} cannot be read.")
+    return times[0]
+
+def read_last_time(path, tail_bytes=4096):
+    #Time of the last record of a rainfall .dat file, read from the end of the file only
+    with open(path, "rb") as file:
+        file.seek(0, 2)
+        file.seek(max(file.tell() - tail_bytes, 0))
+        lines = [line for line in file.read().decode(errors="replace").splitlines() if line.strip()]
+    fields = lines[-1].split("\t") if lines else []
+    if len(fields) < 2:
+        raise ValueError(f"The rainfall data file {path} has no records.")
+    return _parse_times(pd.Series([fields[0]]), pd.Series([fields[1]])).to_numpy(dtype='datetime64[ns]')[0]
+
+###############################################################################################
+###################################### 2. Validate Data #######################################
+###############################################################################################
+def infer_time_interval(times):
+    #The most common time step between records, as one of the HEC-RAS precipitation intervals
+    steps = np.diff(times).astype('timedelta64[ms]').astype(np.int64)
+    steps = steps[steps > 0]
+    if len(steps) == 0:
+        raise ValueError("At least two rainfall records are needed to infer the time interval.")
+    values, counts = np.unique(steps, return_counts=True)
+    step_seconds = values[np.argmax(counts)] / 1000.0
+
+    for interval in RasTextFiles.PRECIPITATION_INTERVALS:
+        if RasTextFiles.interval_seconds(interval) == step_seconds:
+            return interval, step_seconds
+    raise ValueError(f"The rainfall time step of {step_seconds:g} seconds is not a HEC-RAS precipitation interval.")
+
+def check_rainfall_data(times, precipitation_mm):
+    #Check the rainfall records and return a report with the inferred time interval, the start and
+    #end of the record, the gaps (time steps different from the interval) and the invalid and
+    #negative values. 'valid' is False when HEC-RAS cannot use the record as a fixed interval series.
+    invalid = np.flatnonzero(np.isnat(times) | np.isnan(precipitation_mm))
+    valid_times = times[~np.isnat(times)]
+    interval, step_seconds = infer_time_interval(valid_times)
+
+    #Steps next to a row without a time are not gaps, the row is invalid
+    steps = np.diff(times)
+    steps = np.where(np.isnat(steps), np.nan, steps.astype('timedelta64[ms]').astype(np.int64) / 1000.0)
+    gap_rows = np.flatnonzero(steps != step_seconds)
+    gap_rows = gap_rows[~np.isnan(steps[gap_rows])]
+    negative = np.flatnonzero(precipitation_mm < 0)
+
+    #Rows whose time cannot be read are reported as invalid; the record runs from the first to the
+    #last time that can
+    start = pd.Timestamp(valid_times[0])
+    end = pd.Timestamp(valid_times[-1])
+    report = {
+        "interval": interval,
+        "records": len(precipitation_mm),
+        "start_date": start.strftime('%d%b%Y').upper(),
+        "start_time": start.strftime('%H%M'),
+        "end_date": end.strftime('%d%b%Y').upper(),
+        "end_time": end.strftime('%H%M'),
+        "total_mm": float(np.nansum(precipitation_mm)),
+        "gap_count": len(gap_rows),
+        "gaps": [(str(pd.Timestamp(times[row])), steps[row]) for row in gap_rows[:REPORT_LIMIT]],
+        "negative_count": len(negative),
+        "negative_values": [(int(row) + 1, float(precipitation_mm[row])) for row in negative[:REPORT_LIMIT]],
+        "invalid_count": len(invalid),
+        "invalid_rows": [int(row) + 1 for row in invalid[:REPORT_LIMIT]],
+    }
+    report["valid"] = report["gap_count"] == 0 and report["negative_count"] == 0 and report["invalid_count"] == 0
+    return report
+
+def format_report(report):
+    #Text version of a rainfall data report for messages and the console
+    lines = [f"Rainfall records: {report['records']} at {report['interval']} from {report['start_date']} "
+             f"{report['start_time']} to {report['end_date']} {report['end_time']} ({report['total_mm']:.1f} mm)"]
+    if report["gap_count"]:
+        gaps = ', '.join(f"after {time} ({seconds:g} s)" for time, seconds in report["gaps"])
+        lines.append(f"{report['gap_count']} time step(s) differ from {report['interval']}: {gaps}")
+    if report["negative_count"]:
+        values = ', '.join(f"row {row} ({value:g} mm)" for row, value in report["negative_values"])
+        lines.append(f"{report['negative_count']} negative value(s): {values}")
+    if report["invalid_count"]:
+        rows = ', '.join(str(row) for row in report["invalid_rows"])
+        lines.append(f"{report['invalid_count']} row(s) could not be read: {rows}")
+    return "\n".join(lines)
@@ -0,0 +1,232 @@
+###############################################################################################
+#################################### HEC-RAS Plan Results #####################################
+###############################################################################################
+
+#Reads the 2D Flow Area geometry and results of a computed plan straight from the plan HDF file
+#(<file name>.p##.hdf) with h5py, so maps, statistics and reports can be produced without RAS
+#Mapper. Time series are read in blocks of output times sized to a memory budget, so meshes with
+#millions of cells and hundreds of output times are processed with bounded memory.
+
+#*********************************************************************************************
+import os
+import numpy as np
+import pandas as pd
+import h5py
+
+#Default memory budget for one block of a time series read
+MAX_BLOCK_BYTES = 256 * 1024 ** 2
+
+GEOMETRY = "Geometry/2D Flow Areas"
+BC_LINES = "Geometry/Boundary Condition Lines"
+TIME_SERIES = "Results/Unsteady/Output/Output Blocks/Base Output/Unsteady Time Series"
+SUMMARY = "Results/Unsteady/Output/Output Blocks/Base Output/Summary Output/2D Flow Areas"
+
+###############################################################################################
+######################################## 1. Plan Files ########################################
+###############################################################################################
+def plan_hdf_path(project_folder, file_name, plan="p01"):
+    #HEC-RAS writes the results of plan p01 of project 'Area.prj' to 'Area.p01.hdf'
+    return os.path.join(project_folder, f"{file_name}.{plan}.hdf")
+
+def open_plan_results(path):
+    #Open a plan HDF file read only; use it as 'with open_plan_results(path) as hdf:'
+    return h5py.File(path, "r")
+
+def flow_area_names(hdf):
+    #Names of the 2D Flow Areas in the plan
+    attributes = hdf[f"{GEOMETRY}/Attributes"][()]
+    return [_text(name).strip() for name in attributes["Name"]]
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+###############################################################################################
+######################################### 2. Geometry #########################################
+###############################################################################################
+def cell_count(hdf, area):
+    #Number of computational cells of a 2D Flow Area. The cell datasets also hold the ghost cells
+    #outside the perimeter after the real cells, which are left out of all results.
+    attributes = hdf[f"{GEOMETRY}/Attributes"][()]
+    names = [_text(name).strip() for name in attributes["Name"]]
+    if "Cell Count" in attributes.dtype.names:
+        return int(attributes["Cell Count"][names.index(area)])
+    return len(hdf[f"{GEOMETRY}/{area}/Cells Minimum Elevation"])
+
+def cell_centers(hdf, area):
+    #Cell centre coordinates (cells x 2) in the projection of the project
+    return hdf[f"{GEOMETRY}/{area}/Cells Center Coordinate"][:cell_count(hdf, area)]
+
+def cell_min_elevation(hdf, area):
+    #Lowest terrain elevation in every cell
+    return hdf[f"{GEOMETRY}/{area}/Cells Minimum Elevation"][:cell_count(hdf, area)]
+
+def cell_areas(hdf, area):
+    #Plan area of every cell, computed from the face points when the HDF file has no cell areas
+    n = cell_count(hdf, area)
+    group = hdf[f"{GEOMETRY}/{area}"]
+    if "Cells Surface Area" in group:
+        return group["Cells Surface Area"][:n]
+
+    facepoints = group["FacePoints Coordinate"][()]
+    indexes = group["Cells FacePoint Indexes"][:n]
+    valid = indexes >= 0
+    #Close every polygon by repeating its last valid point (shoelace formula)
+    last = np.maximum.accumulate(np.where(valid, np.arange(indexes.shape[1]), 0), axis=1)
+    indexes = np.take_along_axis(indexes, last, axis=1)
+    x = facepoints[indexes, 0]
+    y = facepoints[indexes, 1]
+    x_next = np.roll(x, -1, axis=1)
+    y_next = np.roll(y, -1, axis=1)
+    return 0.5 * np.abs(np.sum(x * y_next - x_next * y, axis=1))
+
+def cell_volume_elevation(hdf, area):
+    #Volume-elevation table of every cell from the geometry preprocessor: the first row and number
+    #of rows of every cell (cells x 2) and the (elevation, volume) rows; None when the HDF file
+    #has no tables
+    group = hdf[f"{GEOMETRY}/{area}"]
+    if "Cells Volume Elevation Info" not in group:
+        return None
+    return group["Cells Volume Elevation Info"][:cell_count(hdf, area)], group["Cells Volume Elevation Values"][()]
+
+def face_cells(hdf, area):
+    #The two cells on either side of every face (faces x 2)
+    return hdf[f"{GEOMETRY}/{area}/Faces Cell Indexes"][()]
+
+def geometry_hdf_path(project_folder, file_name, geometry="g01"):
+    #RAS Mapper saves the 2D Flow Areas, BC Lines and mesh of geometry g01 to 'Area.g01.hdf'; the
+    #geometry functions read it like a plan HDF file
+    return os.path.join(project_folder, f"{file_name}.{geometry}.hdf")
+
+def _feature_points(group, kind):
+    #Points of every feature of a 'Polygon' or 'Polyline' group, from its Info (first point,
+    #point count, ...) and Points datasets
+    info = group[f"{kind} Info"][()]
+    points = group[f"{kind} Points"][()]
+    return [points[start:start + count] for start, count in info[:, :2]]
+
+def flow_area_perimeter(hdf, area):
+    #Perimeter polygon (points x 2) of a 2D Flow Area
+    perimeters = dict(zip(flow_area_names(hdf), _feature_points(hdf[GEOMETRY], "Polygon")))
+    if area not in perimeters:
+        raise ValueError(f"The geometry has no 2D Flow Area '{area}'.")
+    return perimeters[area]
+
+def bc_lines(hdf, area=None):
+    #Boundary condition lines (of one 2D Flow Area) as {name: points x 2}
+    if BC_LINES not in hdf:
+        return {}
+    attributes = hdf[f"{BC_LINES}/Attributes"][()]
+    lines = {}
+    for row, points in zip(attributes, _feature_points(hdf[BC_LINES], "Polyline")):
+        if area is None or _text(row["SA-2D"]).strip() == area:
+            lines[_text(row["Name"]).strip()] = points
+    return lines
+
+###############################################################################################
+####################################### 3. Time Series ########################################
+###############################################################################################
+def _ras_times(stamps):
+    #Times such as '01JAN2024 00:05:00' as datetime64; HEC-RAS writes midnight as 24:00:00 of the
+    #day before
+    stamps = pd.Series([_text(stamp).strip() for stamp in stamps])
+    dates = pd.to_datetime(stamps.str[:9], format="%d%b%Y")
+    clock = pd.to_timedelta(stamps.str[10:])
+    return (dates + clock).to_numpy(dtype="datetime64[ns]")
+
+def output_times(hdf):
+    #Output times of the plan as datetime64
+    return _ras_times(hdf[f"{TIME_SERIES}/Time Date Stamp"][()])
+
+def simulation_window(hdf):
+    #Start and end of the simulation time window of the plan, from the plan information (the first
+    #and last output times when it has none)
+    info = hdf.get("Plan Data/Plan Information")
+    if info is not None and "Simulation Start Time" in info.attrs and "Simulation End Time" in info.attrs:
+        start, end = _ras_times([info.attrs["Simulation Start Time"], info.attrs["Simulation End Time"]])
+        return start, end
+    times = output_times(hdf)
+    return times[0], times[-1]
+
+def iter_time_blocks(dataset, columns=None, max_bytes=MAX_BLOCK_BYTES):
+    #Yield (first time index, block) pairs of a (times x values) dataset, reading as many output
+    #times at once as fit into max_bytes. 'columns' limits the values to the first n columns.
+    times, width = dataset.shape
+    width = width if columns is None else columns
+    rows = max(1, int(max_bytes // max(1, width * dataset.dtype.itemsize)))
+    for start in range(0, times, rows):
+        yield start, dataset[start:start + rows, :width]
+
+def iter_water_surface(hdf, area, max_bytes=MAX_BLOCK_BYTES):
+    #Water surface elevation of every cell, in blocks of output times
+    dataset = hdf[f"{TIME_SERIES}/2D Flow Areas/{area}/Water Surface"]
+    return iter_time_blocks(dataset, cell_count(hdf, area), max_bytes)
+
+def iter_face_velocity(hdf, area, max_bytes=MAX_BLOCK_BYTES):
+    #Velocity normal to every face, in blocks of output times
+    dataset = hdf[f"{TIME_SERIES}/2D Flow Areas/{area}/Face Velocity"]
+    return iter_time_blocks(dataset, None, max_bytes)
+
+def cell_face_lookup(hdf, area):
+    #Order of the faces grouped by cell and the first entry of every cell in that order, so
+    #per-cell values of face results can be reduced with one np.ufunc.reduceat call
+    n = cell_count(hdf, area)
+    cells = face_cells(hdf, area)
+    faces = np.concatenate([np.arange(len(cells)), np.arange(len(cells))])
+    owners = cells.T.ravel()
+    real = (owners >= 0) & (owners < n)
+    faces, owners = faces[real], owners[real]
+    order = np.argsort(owners, kind="stable")
+    starts = np.searchsorted(owners[order], np.arange(n))
+    return faces[order], starts, n
+
+def cell_velocity(face_velocity_block, lookup):
+    #Largest face velocity magnitude around every cell for a block of output times (times x cells)
+    faces, starts, n = lookup
+    speeds = np.abs(face_velocity_block[:, faces])
+    has_faces = np.diff(np.append(starts, len(faces))) > 0
+    result = np.zeros((face_velocity_block.shape[0], n), dtype=speeds.dtype)
+    if len(faces):
+        result[:, has_faces] = np.maximum.reduceat(speeds, starts[has_faces], axis=1)
+    return result
+
+###############################################################################################
+##################################### 4. Derived Results ######################################
+###############################################################################################
+def reduce_over_time(blocks, reduction=np.maximum):
+    #Reduce a stream of (first time index, block) pairs to one value per column, for example the
+    #maximum water surface of every cell, and the output time index where it occurred
+    result = None
+    index = None
+    for start, block in blocks:
+        block = np.asarray(block)
+        block_best = reduction.reduce(block, axis=0)
+        block_index = (np.argmax if reduction is np.maximum else np.argmin)(block, axis=0) + start
+        if result is None:
+            result, index = block_best, block_index
+        else:
+            better = reduction(block_best, result) != result
+            result = np.where(better, block_best, result)
+            index = np.where(better, block_index, index)
+    return result, index
+
+def max_water_surface(hdf, area, max_bytes=MAX_BLOCK_BYTES):
+    #Maximum water surface of every cell, from the summary output when the plan has it (it is
+    #tracked at every computation step) and from the output time series otherwise
+    summary = f"{SUMMARY}/{area}/Maximum Water Surface"
+    if summary in hdf:
+        return hdf[summary][0, :cell_count(hdf, area)]
+    return reduce_over_time(iter_water_surface(hdf, area, max_bytes), np.maximum)[0]
+
+def min_water_surface(hdf, area, max_bytes=MAX_BLOCK_BYTES):
+    #Minimum water surface of every cell over the output times
+    return reduce_over_time(iter_water_surface(hdf, area, max_bytes), np.minimum)[0]
+
+def max_depth(hdf, area, max_bytes=MAX_BLOCK_BYTES):
+    #Maximum water depth of every cell above its lowest terrain point
+    return np.maximum(max_water_surface(hdf, area, max_bytes) - cell_min_elevation(hdf, area), 0.0)
+
+def iter_cell_velocity(hdf, area, max_bytes=MAX_BLOCK_BYTES):
+    #Largest face velocity magnitude around every cell, in blocks of output times
+    lookup = cell_face_lookup(hdf, area)
+    for start, block in iter_face_velocity(hdf, area, max_bytes):
+        yield start, cell_velocity(block, lookup)
@@ -0,0 +1,348 @@
+###############################################################################################
+################## HEC-RAS Project, Plan, Unsteady Flow and RAS Mapper Files ##################
+###############################################################################################
+
+#Readers and writers for the HEC-RAS text files used by the Rain on Grid 2D Model Automation. Writing the
+#files directly replaces typing the same values into the HEC-RAS windows one keystroke at a
+#time, so a hyetograph with thousands of ordinates is written in milliseconds.
+
+#*********************************************************************************************
+import os
+import numpy as np
+
+RAS_PROGRAM_VERSION = "6.31"
+
+###############################################################################################
+###################################### 1. Time Intervals ######################################
+###############################################################################################
+#Time intervals offered by the HEC-RAS 'Unsteady Flow Data' Precipitation Hydrograph window
+PRECIPITATION_INTERVALS = ["1 Second", "2 Second", "3 Second", "4 Second", "5 Second", "6 Second",
+                           "10 Second", "12 Second", "15 Second", "20 Second", "30 Second",
+                           "1 Minute", "2 Minute", "3 Minute", "4 Minute", "5 Minute", "6 Minute",
+                           "10 Minute", "12 Minute", "15 Minute", "20 Minute", "30 Minute",
+                           "1 Hour", "2 Hour", "3 Hour", "4 Hour", "6 Hour", "8 Hour", "12 Hour",
+                           "1 Day", "1 Week", "1 Month", "1 Year"]
+
+#Time intervals offered by the HEC-RAS 'Unsteady Flow Analysis' window
+COMPUTATION_INTERVALS = ["0.1 Second", "0.2 Second", "0.3 Second", "0.4 Second", "0.5 Second",
+                         "1 Second", "2 Second", "3 Second", "4 Second", "5 Second", "6 Second",
+                         "10 Second", "12 Second", "15 Second", "20 Second", "30 Second",
+                         "1 Minute", "2 Minute", "3 Minute", "4 Minute", "5 Minute", "6 Minute",
+                         "10 Minute", "12 Minute", "15 Minute", "20 Minute", "30 Minute",
+                         "1 Hour", "2 Hour", "3 Hour", "4 Hour", "6 Hour", "8 Hour", "12 Hour", "1 Day"]
+
+HYDROGRAPH_OUTPUT_INTERVALS = ["1 Second", "2 Second", "3 Second", "4 Second", "5 Second", "6 Second",
+                               "10 Second", "12 Second", "15 Second", "20 Second", "30 Second",
+                               "1 Minute", "2 Minute", "3 Minute", "4 Minute", "5 Minute", "6 Minute",
+                               "10 Minute", "12 Minute", "15 Minute", "20 Minute", "30 Minute",
+                               "1 Hour", "2 Hour", "3 Hour", "4 Hour", "6 Hour", "8 Hour", "12 Hour",
+                               "1 Day", "1 Week", "1 Month", "1 Year"]
+
+MAPPING_OUTPUT_INTERVALS = ["Max Profile", "0.1 Second", "0.2 Second", "0.3 Second", "0.4 Second", "0.5 Second",
+                            "1 Second", "2 Second", "3 Second", "4 Second", "5 Second", "6 Second",
+                            "10 Second", "12 Second", "15 Second", "20 Second", "30 Second",
+                            "1 Minute", "2 Minute", "3 Minute", "4 Minute", "5 Minute", "6 Minute",
+                            "10 Minute", "12 Minute", "15 Minute", "20 Minute", "30 Minute",
+                            "1 Hour", "2 Hour", "3 Hour", "4 Hour", "6 Hour", "8 Hour", "12 Hour",
+                            "1 Day", "1 Week", "1 Month", "1 Year"]
+
+DETAILED_OUTPUT_INTERVALS = ["Max Profile", "1 Second", "2 Second", "3 Second", "4 Second", "5 Second",
+                             "6 Second",
+                             "10 Second", "12 Second", "15 Second", "20 Second", "30 Second",
+                             "1 Minute", "2 Minute", "3 Minute", "4 Minute", "5 Minute", "6 Minute",
+                             "10 Minute", "12 Minute", "15 Minute", "20 Minute", "30 Minute",
+                             "1 Hour", "2 Hour", "3 Hour", "4 Hour", "6 Hour", "8 Hour", "12 Hour",
+                             "1 Day", "1 Week", "1 Month", "1 Year"]
+
+#Unit names used in the interval strings and their HEC-RAS file abbreviations
+RAS_INTERVAL_UNITS = {"Second": "SEC", "Minute": "MIN", "Hour": "HOUR", "Day": "DAY", "Week": "WEEK",
+                      "Month": "MON", "Year": "YEAR"}
+
+def ras_interval(interval):
+    #Convert an interval such as '5 Minute' to the code HEC-RAS writes in its files ('5MIN')
+    count, unit = interval.split()
+    return count + RAS_INTERVAL_UNITS[unit]
+
+#Length of each interval unit in seconds (months and years as 30 and 365 days)
+INTERVAL_UNIT_SECONDS = {"Second": 1, "Minute": 60, "Hour": 3600, "Day": 86400, "Week": 604800,
+                         "Month": 2592000, "Year": 31536000}
+
+def interval_seconds(interval):
+    #Convert an interval such as '5 Minute' to seconds (300.0)
+    count, unit = interval.split()
+    return float(count) * INTERVAL_UNIT_SECONDS[unit]
+
+###############################################################################################
+#################################### 2. Unsteady Flow File ####################################
+###############################################################################################
+#Keys that HEC-RAS writes inside a boundary condition block of an unsteady flow file
+BOUNDARY_KEYS = ("Interval", "Flow Hydrograph", "Stage Hydrograph", "Precipitation Hydrograph",
+                 "Stage Hydrograph TW Check", "DSS Path", "Use DSS", "Use Fixed Start Time",
+                 "Fixed Start Date/Time", "Is Critical Boundary", "Critical Boundary Flow",
+                 "Friction Slope")
+
+def format_fixed_width(values, width=8, values_per_line=10):
+    #HEC-RAS stores table values in fields of 8 characters, 10 values per line
+    formatted = [_fit_value(value, width) for value in np.asarray(values, dtype=float).tolist()]
+    return ["".join(formatted[i:i + values_per_line]) for i in range(0, len(formatted), values_per_line)]
+
+def _fit_value(value, width):
+    #Keep as many decimals as fit into the field, dropping trailing zeros
+    for decimals in range(width - 2, -1, -1):
+        text = f"{value:.{decimals}f}"
+        if "." in text:
+            text = text.rstrip("0").rstrip(".")
+        if text == "-0":
+            text = "0"
+        if len(text) <= width:
+            return text.rjust(width)
+    raise ValueError(f"The value {value} does not fit into a {width} character field.")
+
+def boundary_location(area_name, bc_line_name=""):
+    #'Boundary Location' line of a boundary condition on a 2D Flow Area (or one of its BC Lines)
+    fields = ["", "", "", "", "", area_name, "", bc_line_name, ""]
+    widths = [16, 16, 8, 8, 16, 16, 16, 32, 32]
+    return "Boundary Location=" + ",".join(field.ljust(width) for field, width in zip(fields, widths))
+
+def precipitation_hydrograph_lines(area_name, start_date, start_time, precipitation_mm, interval):
+    #Precipitation Hydrograph boundary condition block of a 2D Flow Area
+    precipitation_mm = np.asarray(precipitation_mm, dtype=float)
+    lines = [boundary_location(area_name),
+             f"Interval={ras_interval(interval)}",
+             f"Precipitation Hydrograph= {len(precipitation_mm)} "]
+    lines.extend(format_fixed_width(precipitation_mm))
+    lines.extend(["DSS Path=",
+                  "Use DSS=False",
+                  "Use Fixed Start Time=True",
+                  f"Fixed Start Date/Time={start_date},{start_time}",
+                  "Is Critical Boundary=False",
+                  "Critical Boundary Flow="])
+    return lines
+
+def _boundary_blocks(lines):
+    #Find the (start, end) line range of every boundary condition block in an unsteady flow file
+    blocks = []
+    i = 0
+    while i < len(lines):
+        if lines[i].startswith("Boundary Location="):
+            start = i
+            i += 1
+            while i < len(lines) and not lines[i].startswith("Boundary Location="):
+                key = lines[i].split("=", 1)[0]
+                if "=" in lines[i] and key not in BOUNDARY_KEYS:
+                    break
+                i += 1
+            blocks.append((start, i))
+        else:
+            i += 1
+    return blocks
+
+def _location_fields(line):
+    return [field.strip() for field in line.split("=", 1)[1].split(",")]
+
+def write_precipitation_hydrograph(u_file_path, area_name, start_date, start_time, precipitation_mm, interval, flow_title=None):
+    #Write the Precipitation Hydrograph of a 2D Flow Area into an unsteady flow file (.u##).
+    #An existing file (as saved by HEC-RAS) keeps all of its other boundary conditions and only
+    #the boundary block of the 2D Flow Area itself is replaced.
+    block = precipitation_hydrograph_lines(area_name, start_date, start_time, precipitation_mm, interval)
+
+    if os.path.exists(u_file_path):
+        with open(u_file_path, "r") as file:
+            lines = file.read().splitlines()
+    else:
+        if flow_title is None:
+            flow_title = os.path.splitext(os.path.basename(u_file_path))[0]
+        lines = [f"Flow Title={flow_title}",
+                 f"Program Version={RAS_PROGRAM_VERSION}",
+                 "Use Restart= 0 "]
+
+    blocks = _boundary_blocks(lines)
+    #The 2D Flow Area block is the one naming the area without a BC Line
+    area_blocks = [(start, end) for start, end in blocks
+                   if _location_fields(lines[start])[5:6] == [area_name] and not any(_location_fields(lines[start])[6:])]
+
+    if area_blocks:
+        start, end = area_blocks[0]
+        lines[start:end] = block
+    elif blocks:
+        end = blocks[-1][1]
+        lines[end:end] = block
+    else:
+        lines.extend(block)
+
+    with open(u_file_path, "w") as file:
+        file.write("\n".join(lines) + "\n")
+
+    return u_file_path
+
+###############################################################################################
+######################################## 3. Plan File #########################################
+###############################################################################################
+def _checked_interval(interval, intervals, name):
+    if interval not in intervals:
+        raise ValueError(f"'{interval}' is not a valid {name}. Choose one of: {', '.join(intervals)}")
+    return interval
+
+def write_plan_file(p_file_path, plan_title, short_id, starting_date, starting_time, ending_date, ending_time,
+                    computation_interval, hydrograph_output_interval, mapping_output_interval, detailed_output_interval,
+                    geometry_file="g01", unsteady_file="u01", geometry_preprocessor=True, unsteady_simulation=True,
+                    post_processor=True, floodplain_mapping=True):
+    #Write an unsteady flow plan file (.p##) with the Simulation Time Window, the Computation
+    #Settings and the Programs to Run of the 'Unsteady Flow Analysis' window.
+    #'Max Profile' output intervals only keep the maximum profile, so no interval line is written.
+    _checked_interval(computation_interval, COMPUTATION_INTERVALS, "Computation Interval")
+    _checked_interval(hydrograph_output_interval, HYDROGRAPH_OUTPUT_INTERVALS, "Hydrograph Output Interval")
+    _checked_interval(mapping_output_interval, MAPPING_OUTPUT_INTERVALS, "Mapping Output Interval")
+    _checked_interval(detailed_output_interval, DETAILED_OUTPUT_INTERVALS, "Detailed Output Interval")
+
+    lines = [f"Plan Title={plan_title}",
+             f"Program Version={RAS_PROGRAM_VERSION}",
+             f"Short Identifier={short_id}",
+             f"Simulation Date={starting_date},{starting_time},{ending_date},{ending_time}",
+             f"Geom File={geometry_file}",
+             f"Flow File={unsteady_file}",
+             f"Computation Interval={ras_interval(computation_interval)}",
+             f"Output Interval={ras_interval(hydrograph_output_interval)}"]
+    if detailed_output_interval != "Max Profile":
+        lines.append(f"Instantaneous Interval={ras_interval(detailed_output_interval)}")
+    if mapping_output_interval != "Max Profile":
+        lines.append(f"Mapping Interval={ras_interval(mapping_output_interval)}")
+    lines.extend([f"Run HTab= {int(geometry_preprocessor)} ",
+                  f"Run UNet= {int(unsteady_simulation)} ",
+                  "Run Sediment= 0 ",
+                  f"Run PostProcess= {int(post_processor)} ",
+                  "Run WQNet= 0 ",
+                  f"Run RASMapper= {int(floodplain_mapping)} "])
+
+    with open(p_file_path, "w") as file:
+        file.write("\n".join(lines) + "\n")
+
+    return p_file_path
+
+###############################################################################################
+####################################### 4. Project File #######################################
+###############################################################################################
+#Keys of the project file (.prj) that reference the geometry, flow and plan files
+PROJECT_FILE_KEYS = ("Geom File", "Flow File", "Unsteady File", "Plan File")
+
+def register_project_file(prj_path, key, extension, current_plan=False):
+    #Add a file reference such as 'Plan File=p01' to a HEC-RAS project file and optionally make
+    #it the 'Current Plan', so HEC-RAS loads a file written outside of the HEC-RAS windows.
+    with open(prj_path, "r") as file:
+        lines = file.read().splitlines()
+
+    entry = f"{key}={extension}"
+    if entry not in lines:
+        references = [i for i, line in enumerate(lines) if line.split("=", 1)[0] in PROJECT_FILE_KEYS]
+        position = references[-1] + 1 if references else min(len(lines), 1)
+        lines.insert(position, entry)
+
+    if current_plan:
+        current = [i for i, line in enumerate(lines) if line.startswith("Current Plan=")]
+        if current:
+            lines[current[0]] = f"Current Plan={extension}"
+        else:
+            lines.insert(min(len(lines), 1), f"Current Plan={extension}")
+
+    with open(prj_path, "w") as file:
+        file.write("\n".join(lines) + "\n")
+
+    return prj_path
+
+def write_project_file(prj_path, title, description="", si_units=True, geometry_files=(), unsteady_files=(),
+                       plan_files=(), current_plan=None):
+    #Write a HEC-RAS project file (.prj) with the 'Project Title', the description, the unit
+    #system and the references to the geometry (g##), unsteady flow (u##) and plan (p##) files
+    lines = [f"Proj Title={title}",
+             f"Current Plan={current_plan or ''}",
+             "Default Exp/Contr=0.3,0.1",
+             "SI Units" if si_units else "English Units"]
+    lines.extend(f"Geom File={extension}" for extension in geometry_files)
+    lines.extend(f"Unsteady File={extension}" for extension in unsteady_files)
+    lines.extend(f"Plan File={extension}" for extension in plan_files)
+    lines.extend(["Y Axis Title=Elevation",
+                  "X Axis Title(PF)=Main Channel Distance",
+                  "X Axis Title(XS)=Station",
+                  "BEGIN DESCRIPTION:",
+                  description,
+                  "END DESCRIPTION:"])
+
+    with open(prj_path, "w") as file:
+        file.write("\n".join(lines) + "\n")
+
+    return prj_path
+
+def read_project_file(prj_path):
+    #Read the title, description, unit system, current plan and file references of a project file
+    project = {"title": "", "description": "", "units": "English", "current_plan": "",
+               "Geom File": [], "Flow File": [], "Unsteady File": [], "Plan File": []}
+    description = None
+
+    with open(prj_path, "r") as file:
+        for line in file.read().splitlines():
+            if description is not None:
+                if line == "END DESCRIPTION:":
+                    project["description"] = "\n".join(description)
+                    description = None
+                else:
+                    description.append(line)
+            elif line == "BEGIN DESCRIPTION:":
+                description = []
+            elif line == "SI Units":
+                project["units"] = "SI"
+            elif line.startswith("Proj Title="):
+                project["title"] = line.split("=", 1)[1]
+            elif line.startswith("Current Plan="):
+                project["current_plan"] = line.split("=", 1)[1]
+            elif line.split("=", 1)[0] in PROJECT_FILE_KEYS:
+                key, extension = line.split("=", 1)
+                project[key].append(extension)
+
+    return project
+
+def bootstrap_project(project_folder, file_name, title, description):
+    #Create the HEC-RAS project folder and its project file in SI units. Geometry, unsteady flow
+    #and plan files already in the folder (for example when re-running a project) are referenced.
+    os.makedirs(project_folder, exist_ok=True)
+    extensions = sorted(os.path.splitext(name)[1][1:] for name in os.listdir(project_folder)
+                        if os.path.splitext(name)[0] == file_name)
+    geometry_files = [extension for extension in extensions if _is_numbered(extension, "g")]
+    unsteady_files = [extension for extension in extensions if _is_numbered(extension, "u")]
+    plan_files = [extension for extension in extensions if _is_numbered(extension, "p")]
+
+    prj_path = os.path.join(project_folder, file_name + ".prj")
+    write_project_file(prj_path, title, description, si_units=True, geometry_files=geometry_files,
+                       unsteady_files=unsteady_files, plan_files=plan_files,
+                       current_plan=plan_files[0] if plan_files else None)
+    return prj_path
+
+def _is_numbered(extension, letter):
+    #HEC-RAS numbers its files g01..g99, u01..u99 and p01..p99
+    return len(extension) == 3 and extension[0] == letter and extension[1:].isdigit()
+
+###############################################################################################
+##################################### 5. RAS Mapper File ######################################
+###############################################################################################
+def register_rasmap_terrain(rasmap_path, terrain_hdf, layer_name="Terrain"):
+    #Add a Terrain already in the project folder to the RAS Mapper file of the project (the file
+    #is created when RAS Mapper has not written it yet), so RAS Mapper opens with the Terrain
+    #instead of building it. 'terrain_hdf' is relative to the project folder, as RAS Mapper
+    #writes it. Must be called while RAS Mapper is closed, it rewrites the file when it saves.
+    import xml.etree.ElementTree as ET
+    if os.path.exists(rasmap_path):
+        root = ET.parse(rasmap_path).getroot()
+    else:
+        root = ET.Element("RASMapper")
+        ET.SubElement(root, "Version").text = "2.0.0"
+    terrains = root.find("Terrains")
+    if terrains is None:
+        terrains = ET.SubElement(root, "Terrains", Checked="True", Expanded="True")
+    for layer in terrains.findall("Layer"):
+        if layer.get("Name") == layer_name:
+            terrains.remove(layer)
+    layer = ET.SubElement(terrains, "Layer", Name=layer_name, Type="TerrainLayer", Checked="True",
+                          Filename=".\\" + terrain_hdf.replace("/", "\\"))
+    ET.SubElement(layer, "ResampleMethod").text = "near"
+    ET.SubElement(layer, "Surface", On="True")
+    ET.indent(root)
+    ET.ElementTree(root).write(rasmap_path, encoding="utf-8")
@@ -0,0 +1,183 @@
+###############################################################################################
+###################################### Result Animations ######################################
+###############################################################################################
+
+#Renders the Depth, Velocity and WSE animations of a computed plan from the time series in the
+#plan HDF file, instead of screen recording RAS Mapper in real time. Output times are streamed
+#from the HDF file in memory bounded blocks, frames are coloured with a fixed colour ramp by a
+#process pool and handed in order to an encoder: an ffmpeg pipe for MP4 files, or PNG frames.
+
+#*********************************************************************************************
+import os
+import subprocess
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import matplotlib
+from PIL import Image, ImageDraw
+import RasResults
+import ResultMaps
+
+QUANTITIES = ["Depth", "Velocity", "WSE"]
+
+#Frames are smaller than the maps so the animations stay playable
+MAX_FRAME_SIZE = 1920
+FRAMES_PER_SECOND = 10
+
+#Number of frames rendered ahead of the encoder for every worker process
+FRAMES_AHEAD = 2
+
+###############################################################################################
+######################################### 1. Encoders #########################################
+###############################################################################################
+class FfmpegEncoder:
+    #Pipes raw RGB frames to ffmpeg and writes an H.264 MP4 file
+    extension = ".mp4"
+
+    def __init__(self, path, width, height, fps=FRAMES_PER_SECOND, ffmpeg="ffmpeg"):
+        self.process = subprocess.Popen([ffmpeg, "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24",
+                                         "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+                                         "-c:v", "libx264", "-pix_fmt", "yuv420p", path],
+                                        stdin=subprocess.PIPE)
+
+    def write(self, frame):
+        self.process.stdin.write(frame.tobytes())
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed with exit code {self.process.returncode}.")
+
+class PngSequenceEncoder:
+    #Writes every frame as a numbered PNG into a folder named after the animation
+    extension = ""
+
+    def __init__(self, path, width, height, fps=FRAMES_PER_SECOND):
+        self.folder = path
+        self.count = 0
+        os.makedirs(self.folder, exist_ok=True)
+
+    def write(self, frame):
+        Image.fromarray(frame).save(os.path.join(self.folder, f"frame_{self.count:05d}.png"))
+        self.count += 1
+
+    def close(self):
+        pass
+
+#Encoders by name; any class with the same constructor, write and close can be added
+ENCODERS = {"ffmpeg": FfmpegEncoder, "png": PngSequenceEncoder}
+
+###############################################################################################
+##################################### 2. Frame Rendering ######################################
+###############################################################################################
+#Map grid shared by the worker processes, set once per process by _start_worker
+_grid = {}
+
+def _start_worker(index_grid, elevation, background, colour_ramps):
+    _grid.update(index_grid=index_grid, elevation=elevation, background=background, colour_ramps=colour_ramps)
+
+def terrain_background(elevation):
+    #Grey shaded terrain drawn under the dry pixels of every frame
+    low, high = np.nanmin(elevation), np.nanmax(elevation)
+    shade = (elevation - low) / max(high - low, 1e-6)
+    grey = np.nan_to_num(80 + 120 * shade, nan=255).astype("uint8")
+    return np.repeat(grey[:, :, None], 3, axis=2)
+
+def render_frame(quantity, water_surface, values, label):
+    #RGB frame of one output time; water_surface and values are per-cell arrays (values is the
+    #cell velocity for Velocity frames and None otherwise)
+    index_grid, elevation = _grid["index_grid"], _grid["elevation"]
+    colour_map, minimum, maximum = _grid["colour_ramps"][quantity]
+
+    inside = index_grid >= 0
+    cells = index_grid[inside]
+    grid = np.full(index_grid.shape, np.nan, dtype="float32")
+    grid[inside] = water_surface[cells]
+    wet = grid - elevation > 0
+    if quantity == "Depth":
+        grid -= elevation
+    elif quantity == "Velocity":
+        grid[inside] = values[cells]
+
+    norm = (grid - minimum) / max(maximum - minimum, 1e-6)
+    colours = matplotlib.colormaps[colour_map](np.clip(np.nan_to_num(norm), 0, 1), bytes=True)[:, :, :3]
+    frame = np.where(wet[:, :, None], colours, _grid["background"])
+
+    image = Image.fromarray(frame)
+    ImageDraw.Draw(image).text((10, 10), label, fill=(0, 0, 0))
+    return np.asarray(image)
+
+###############################################################################################
+#################################### 3. Render Animations #####################################
+###############################################################################################
+def _frame_inputs(hdf, area, quantity, times, max_bytes):
+    #Stream the per-cell inputs of every frame, one block of output times at a time
+    if quantity != "Velocity":
+        for start, block in RasResults.iter_water_surface(hdf, area, max_bytes):
+            for row, values in enumerate(block):
+                yield quantity, values, None, times[start + row]
+        return
+    #Velocity blocks hold fewer output times (there are more faces than cells), so the water
+    #surface of the same output times is read alongside each of them
+    water_surface = hdf[f"{RasResults.TIME_SERIES}/2D Flow Areas/{area}/Water Surface"]
+    n = RasResults.cell_count(hdf, area)
+    for start, velocity in RasResults.iter_cell_velocity(hdf, area, max_bytes):
+        block = water_surface[start:start + len(velocity), :n]
+        for row in range(len(velocity)):
+            yield quantity, block[row], velocity[row], times[start + row]
+
+def _ordered(executor, inputs, ahead):
+    #Submit at most 'ahead' frames before the oldest one is collected, so memory stays flat and
+    #the frames come back in time order
+    pending = deque()
+    for quantity, water_surface, values, time in inputs:
+        label = f"{quantity}  {pd.Timestamp(time):%d%b%Y %H:%M}".upper()
+        pending.append(executor.submit(render_frame, quantity, water_surface, values, label))
+        if len(pending) >= ahead:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def animation_colour_ramps(hdf, area):
+    #Fixed colour ramps of the animations; the WSE ramp runs from the lowest terrain point to the
+    #highest water surface, so the colours mean the same elevation in every frame
+    ramps = dict(ResultMaps.COLOUR_RAMPS)
+    colour_map = ramps["WSE"][0]
+    ramps["WSE"] = (colour_map, float(np.nanmin(RasResults.cell_min_elevation(hdf, area))),
+                    float(np.nanmax(RasResults.max_water_surface(hdf, area))))
+    return ramps
+
+def render_animations(hdf_path, flow_area, terrain_path, output_folder, area_name, quantities=QUANTITIES,
+                      encoder="ffmpeg", fps=FRAMES_PER_SECOND, max_size=MAX_FRAME_SIZE, processes=None,
+                      max_bytes=RasResults.MAX_BLOCK_BYTES // 4):
+    #Write '<area name> <quantity> Animation.mp4' into output_folder for every quantity and return
+    #the paths written
+    os.makedirs(output_folder, exist_ok=True)
+    encoder_class = ENCODERS[encoder] if isinstance(encoder, str) else encoder
+    processes = processes or os.cpu_count() or 1
+    paths = []
+
+    with RasResults.open_plan_results(hdf_path) as hdf:
+        elevation, transform, crs = ResultMaps.terrain_grid(terrain_path, ResultMaps.flow_area_bounds(hdf, flow_area), max_size)
+        #H.264 needs even frame sizes
+        elevation = elevation[:elevation.shape[0] // 2 * 2, :elevation.shape[1] // 2 * 2]
+        index_grid = ResultMaps.cell_index_grid(hdf, flow_area, elevation.shape, transform)
+        colour_ramps = animation_colour_ramps(hdf, flow_area)
+        times = RasResults.output_times(hdf)
+        height, width = elevation.shape
+
+        with ProcessPoolExecutor(processes, initializer=_start_worker,
+                                 initargs=(index_grid, elevation, terrain_background(elevation), colour_ramps)) as executor:
+            for quantity in quantities:
+                path = os.path.join(output_folder, f"{area_name} {quantity} Animation{encoder_class.extension}")
+                writer = encoder_class(path, width, height, fps)
+                try:
+                    inputs = _frame_inputs(hdf, flow_area, quantity, times, max_bytes)
+                    for frame in _ordered(executor, inputs, processes * FRAMES_AHEAD):
+                        writer.write(frame)
+                finally:
+                    writer.close()
+                print(f"Saved {area_name} {quantity} Animation")
+                paths.append(path)
+    return paths
@@ -0,0 +1,160 @@
+###############################################################################################
+######################################### Result Maps #########################################
+###############################################################################################
+
+#Renders the Min/Max Depth, Velocity and WSE maps of a computed plan straight from the plan HDF
+#file, instead of screenshotting RAS Mapper. The 2D cells are rasterized once onto the terrain
+#grid, the per-cell results are read in one streamed pass and the six maps are then written in
+#parallel as georeferenced PNG (with a .pgw world file) and GeoTIFF files.
+
+#*********************************************************************************************
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import matplotlib.image
+import rasterio
+import rasterio.features
+import rasterio.windows
+from rasterio.enums import Resampling
+import RasResults
+
+#Map products and their colour ramps (colour map, minimum, maximum); the depth and velocity ramps
+#match the 0.00 to 3.00 ramps set in RAS Mapper, the WSE ramp is stretched over the values
+PRODUCTS = ["Min Depth", "Max Depth", "Min Velocity", "Max Velocity", "Min WSE", "Max WSE"]
+COLOUR_RAMPS = {"Depth": ("Blues", 0.0, 3.0), "Velocity": ("jet", 0.0, 3.0), "WSE": ("terrain", None, None)}
+
+#Largest number of pixels along either side of a map; larger terrains are resampled
+MAX_MAP_SIZE = 4000
+NODATA = -9999.0
+
+###############################################################################################
+######################################### 1. Map Grid #########################################
+###############################################################################################
+def terrain_grid(terrain_path, bounds, max_size=MAX_MAP_SIZE):
+    #Terrain elevations covering 'bounds' (left, bottom, right, top), resampled so neither side is
+    #larger than max_size. Returns the elevations (NaN where there is no data), transform and CRS.
+    with rasterio.open(terrain_path) as terrain:
+        window = rasterio.windows.from_bounds(*bounds, transform=terrain.transform)
+        window = window.round_offsets().round_lengths().intersection(
+            rasterio.windows.Window(0, 0, terrain.width, terrain.height))
+        scale = max(1.0, max(window.width, window.height) / max_size)
+        shape = (max(1, int(window.height / scale)), max(1, int(window.width / scale)))
+        elevation = terrain.read(1, window=window, out_shape=shape, masked=True, resampling=Resampling.bilinear)
+        transform = terrain.window_transform(window)
+        transform = transform * transform.scale(window.width / shape[1], window.height / shape[0])
+        return elevation.astype("float32").filled(np.nan), transform, terrain.crs
+
+def cell_polygons(hdf, area):
+    #GeoJSON polygon of every computational cell, paired with the cell index
+    group = hdf[f"{RasResults.GEOMETRY}/{area}"]
+    facepoints = group["FacePoints Coordinate"][()]
+    indexes = group["Cells FacePoint Indexes"][:RasResults.cell_count(hdf, area)]
+    for cell, points in enumerate(indexes):
+        ring = facepoints[points[points >= 0]]
+        if len(ring) >= 3:
+            yield {"type": "Polygon", "coordinates": [np.vstack([ring, ring[:1]]).tolist()]}, cell
+
+def cell_index_grid(hdf, area, shape, transform):
+    #Index of the cell covering every pixel of the map grid, -1 outside the 2D Flow Area
+    return rasterio.features.rasterize(cell_polygons(hdf, area), out_shape=shape, transform=transform,
+                                       fill=-1, dtype="int32")
+
+def flow_area_bounds(hdf, area):
+    #Extent (left, bottom, right, top) of the face points of a 2D Flow Area
+    facepoints = hdf[f"{RasResults.GEOMETRY}/{area}/FacePoints Coordinate"][()]
+    return (*facepoints.min(axis=0), *facepoints.max(axis=0))
+
+###############################################################################################
+####################################### 2. Cell Results #######################################
+###############################################################################################
+def cell_results(hdf, area, max_bytes=RasResults.MAX_BLOCK_BYTES):
+    #Minimum and maximum water surface and velocity of every cell, each time series read once
+    results = {}
+    for name, blocks in (("WSE", RasResults.iter_water_surface(hdf, area, max_bytes)),
+                         ("Velocity", RasResults.iter_cell_velocity(hdf, area, max_bytes))):
+        low = high = None
+        for start, block in blocks:
+            block_low, block_high = np.nanmin(block, axis=0), np.nanmax(block, axis=0)
+            low = block_low if low is None else np.fmin(low, block_low)
+            high = block_high if high is None else np.fmax(high, block_high)
+        results["Min " + name], results["Max " + name] = low, high
+
+    #The summary output tracks the maximum water surface at every computation step
+    results["Max WSE"] = RasResults.max_water_surface(hdf, area, max_bytes)
+    return results
+
+def product_grid(product, results, index_grid, elevation):
+    #Values of one map product on the map grid, NaN where the pixel is dry or outside the area
+    statistic, quantity = product.split()
+    inside = index_grid >= 0
+    cells = index_grid[inside]
+
+    water_surface = np.full(index_grid.shape, np.nan, dtype="float32")
+    water_surface[inside] = results[statistic + " WSE"][cells]
+    depth = water_surface - elevation
+    wet = depth > 0
+
+    if quantity == "Depth":
+        grid = depth
+    elif quantity == "WSE":
+        grid = water_surface
+    else:
+        grid = np.full(index_grid.shape, np.nan, dtype="float32")
+        grid[inside] = results[product][cells]
+    return np.where(wet, grid, np.nan).astype("float32")
+
+###############################################################################################
+######################################## 3. Write Maps ########################################
+###############################################################################################
+def write_world_file(png_path, transform):
+    #World file (.pgw) placing the PNG in the projection of the terrain
+    with open(os.path.splitext(png_path)[0] + ".pgw", "w") as file:
+        file.write("\n".join(f"{value:.10f}" for value in (transform.a, transform.d, transform.b, transform.e,
+                                                           transform.c + transform.a / 2,
+                                                           transform.f + transform.e / 2)) + "\n")
+
+def write_png(grid, png_path, transform, colour_map, minimum=None, maximum=None):
+    #Colour the grid with the ramp and write it as a PNG with transparent dry pixels
+    values = np.ma.masked_invalid(grid)
+    if minimum is None:
+        minimum = float(values.min()) if values.count() else 0.0
+    if maximum is None:
+        maximum = float(values.max()) if values.count() else 1.0
+    matplotlib.image.imsave(png_path, values, cmap=colour_map, vmin=minimum, vmax=maximum)
+    write_world_file(png_path, transform)
+
+def write_geotiff(grid, tif_path, transform, crs):
+    #Single band float GeoTIFF of the grid
+    profile = {"driver": "GTiff", "height": grid.shape[0], "width": grid.shape[1], "count": 1,
+               "dtype": "float32", "crs": crs, "transform": transform, "nodata": NODATA,
+               "compress": "deflate", "tiled": True}
+    with rasterio.open(tif_path, "w", **profile) as raster:
+        raster.write(np.where(np.isnan(grid), NODATA, grid).astype("float32"), 1)
+
+###############################################################################################
+##################################### 4. Render All Maps ######################################
+###############################################################################################
+def render_result_maps(hdf_path, flow_area, terrain_path, output_folder, area_name, products=PRODUCTS,
+                       max_size=MAX_MAP_SIZE, geotiff=True, max_workers=None):
+    #Write '<area name> <product>.png' (and .tif) into output_folder for every product and return
+    #the paths written. The HDF file is read once; the products are rendered in parallel.
+    with RasResults.open_plan_results(hdf_path) as hdf:
+        elevation, transform, crs = terrain_grid(terrain_path, flow_area_bounds(hdf, flow_area), max_size)
+        index_grid = cell_index_grid(hdf, flow_area, elevation.shape, transform)
+        results = cell_results(hdf, flow_area)
+
+    def render(product):
+        grid = product_grid(product, results, index_grid, elevation)
+        colour_map, minimum, maximum = COLOUR_RAMPS[product.split()[1]]
+        png_path = os.path.join(output_folder, f"{area_name} {product}.png")
+        write_png(grid, png_path, transform, colour_map, minimum, maximum)
+        paths = [png_path]
+        if geotiff:
+            paths.append(os.path.join(output_folder, f"{area_name} {product}.tif"))
+            write_geotiff(grid, paths[-1], transform, crs)
+        print(f"Saved {area_name} {product} map")
+        return paths
+
+    os.makedirs(output_folder, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=max_workers or len(products)) as executor:
+        return [path for paths in executor.map(render, products) for path in paths]
@@ -0,0 +1,217 @@
+###############################################################################################
+###################################### Result Statistics ######################################
+###############################################################################################
+
+#Numbers of a computed run straight from the plan HDF file, so nobody has to open RAS Mapper to
+#read them off the maps: the maximum depth and velocity statistics, the inundated area in depth
+#bands (weighted by cell area), the stored volume over time with its peak, and the times of the
+#peaks. The water surfaces are streamed in blocks of output times and every block is handled as
+#one (times x cells) array; the stored volume of every cell comes from its volume-elevation table
+#(the depth times the cell area when the plan has no tables).
+
+#Usage: python ResultStatistics.py Area.p01.hdf [--area "AREA Perimeter"] [--output "<folder>"]
+
+#*********************************************************************************************
+import argparse
+import csv
+import json
+import os
+import numpy as np
+import RasResults
+
+#Cells deeper than this (m) are inundated
+WET_DEPTH = 0.01
+#Edges of the depth bands (m), from WET_DEPTH up; the last band is open ended
+DEPTH_BANDS = [WET_DEPTH, 0.1, 0.3, 0.5, 1.0, 2.0]
+PERCENTILES = [50, 90, 99]
+
+###############################################################################################
+###################################### 1. Stored Volume #######################################
+###############################################################################################
+def volume_table(hdf, area):
+    #Volume-elevation tables of all cells in one array sorted by cell and elevation, so the volume
+    #of every cell at a water surface is found with one np.searchsorted call; None without tables
+    tables = RasResults.cell_volume_elevation(hdf, area)
+    if tables is None:
+        return None
+    info, values = tables
+    starts, counts = info[:, 0].astype("int64"), info[:, 1].astype("int64")
+    rows = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)
+    elevation, volume = values[rows, 0].astype("float64"), values[rows, 1].astype("float64")
+    first = np.cumsum(counts) - counts
+    last = first + np.maximum(counts, 1) - 1
+    #Every cell gets its own range of keys, wider than the elevations of any table
+    span = float(elevation.max() - elevation.min()) + 1.0 if len(elevation) else 1.0
+    keys = elevation + np.repeat(np.arange(len(counts)), counts) * span
+    return {"keys": keys, "volume": volume, "first": first, "last": last, "span": span, "usable": counts >= 2,
+            "low": elevation[first.clip(max=len(elevation) - 1)], "high": elevation[last.clip(max=len(elevation) - 1)]}
+
+def stored_volume(water_surface, table, areas, bottom):
+    #Stored volume of every cell (times x cells) at the water surfaces of a block of output times:
+    #interpolated in the cell's table, and extended with the cell area above its top
+    flat = areas * np.maximum(water_surface - bottom, 0.0)
+    if table is None:
+        return flat
+    level = np.clip(water_surface, table["low"], table["high"])
+    query = level + np.arange(water_surface.shape[1]) * table["span"]
+    upper = np.clip(np.searchsorted(table["keys"], query), table["first"] + 1, table["last"]).clip(0, len(table["keys"]) - 1)
+    lower = (upper - 1).clip(0)
+    run = table["keys"][upper] - table["keys"][lower]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        share = np.where(run > 0, (query - table["keys"][lower]) / run, 0.0)
+    volume = table["volume"][lower] + share * (table["volume"][upper] - table["volume"][lower])
+    volume += areas * np.maximum(water_surface - table["high"], 0.0)
+    return np.where(table["usable"], volume, flat)
+
+###############################################################################################
+########################################## 2. Stream ##########################################
+###############################################################################################
+def stream_results(hdf, area, max_bytes=RasResults.MAX_BLOCK_BYTES):
+    #One pass over the water surfaces: the stored volume and inundated area at every output time,
+    #and the highest water surface of every cell with the output time it occurred at
+    areas = RasResults.cell_areas(hdf, area).astype("float64")
+    bottom = RasResults.cell_min_elevation(hdf, area).astype("float64")
+    table = volume_table(hdf, area)
+    volume, wet_area = [], []
+    highest, peak_time = None, None
+    for start, block in RasResults.iter_water_surface(hdf, area, max_bytes):
+        block = np.asarray(block, dtype="float64")
+        volume.append(stored_volume(block, table, areas, bottom).sum(axis=1))
+        wet_area.append(((block - bottom) > WET_DEPTH) @ areas)
+        block_max, block_time = block.max(axis=0), block.argmax(axis=0) + start
+        if highest is None:
+            highest, peak_time = block_max, block_time
+        else:
+            peak_time = np.where(block_max > highest, block_time, peak_time)
+            highest = np.maximum(highest, block_max)
+    if highest is None:
+        raise ValueError(f"The plan has no water surfaces of '{area}'.")
+    return {"areas": areas, "bottom": bottom, "volume": np.concatenate(volume), "wet_area": np.concatenate(wet_area),
+            "highest": highest, "peak_time": peak_time, "volume_tables": table is not None}
+
+def max_cell_velocity(hdf, area, max_bytes=RasResults.MAX_BLOCK_BYTES):
+    #Largest velocity around every cell over all output times. The largest over time and over the
+    #faces of a cell can be taken in either order, so every face is reduced over time first and
+    #the faces are grouped by cell once instead of at every output time.
+    face_max = None
+    for _, block in RasResults.iter_face_velocity(hdf, area, max_bytes):
+        block_max = np.abs(block).max(axis=0)
+        face_max = block_max if face_max is None else np.maximum(face_max, block_max)
+    return RasResults.cell_velocity(face_max[None, :], RasResults.cell_face_lookup(hdf, area))[0]
+
+###############################################################################################
+######################################## 3. Statistics ########################################
+###############################################################################################
+def weighted_percentiles(values, weights, percentiles):
+    #Percentiles of the values with every value counted by its weight (the cell area)
+    if len(values) == 0:
+        return [0.0 for _ in percentiles]
+    order = np.argsort(values)
+    cumulative = np.cumsum(weights[order])
+    positions = np.searchsorted(cumulative, np.asarray(percentiles) / 100 * cumulative[-1])
+    return [float(values[order][min(position, len(values) - 1)]) for position in positions]
+
+def summarize(values, areas):
+    #Area weighted statistics of the values of the inundated cells
+    total = areas.sum()
+    quantiles = weighted_percentiles(values, areas, PERCENTILES)
+    summary = {"mean": round(float(values @ areas / total), 3) if total > 0 else 0.0,
+               "maximum": round(float(values.max()), 3) if len(values) else 0.0}
+    summary.update({f"p{percentile}": round(value, 3) for percentile, value in zip(PERCENTILES, quantiles)})
+    return summary
+
+def depth_bands(depth, areas):
+    #Inundated area (m2 and share of the inundated area) in every depth band
+    edges = DEPTH_BANDS + [np.inf]
+    band_area = np.bincount(np.digitize(depth, DEPTH_BANDS), weights=areas, minlength=len(edges))[1:]
+    wet = band_area.sum()
+    return [{"band": f"{low:g} - {high:g} m" if np.isfinite(high) else f"> {low:g} m", "from_m": low, "to_m": high if np.isfinite(high) else None,
+             "area_m2": round(float(area), 1), "share": round(float(area / wet), 4) if wet > 0 else 0.0}
+            for low, high, area in zip(edges[:-1], edges[1:], band_area)]
+
+def result_statistics(hdf_path, area, max_bytes=RasResults.MAX_BLOCK_BYTES):
+    #Depth, velocity, inundated area, volume and timing statistics of a 2D Flow Area of a computed plan
+    with RasResults.open_plan_results(hdf_path) as hdf:
+        stream = stream_results(hdf, area, max_bytes)
+        #The summary output tracks the maximum at every computation step, the time series only at
+        #the output times
+        summary = f"{RasResults.SUMMARY}/{area}/Maximum Water Surface"
+        highest = hdf[summary][0, :len(stream["areas"])] if summary in hdf else stream["highest"]
+        depth = np.maximum(highest.astype("float64") - stream["bottom"], 0.0)
+        velocity = max_cell_velocity(hdf, area, max_bytes)
+        centres = RasResults.cell_centers(hdf, area)
+        times = RasResults.output_times(hdf)
+    areas = stream["areas"]
+    wet = depth > WET_DEPTH
+    deepest = int(np.argmax(depth))
+    peak_volume, peak_area = int(np.argmax(stream["volume"])), int(np.argmax(stream["wet_area"]))
+    peak_times = np.sort(times[stream["peak_time"][wet]]) if wet.any() else times[:0]
+    return {"area": area, "cells": len(depth), "inundated_cells": int(wet.sum()),
+            "inundated_area_m2": round(float(areas[wet].sum()), 1),
+            "depth_m": {**summarize(depth[wet], areas[wet]), "x": round(float(centres[deepest, 0]), 2), "y": round(float(centres[deepest, 1]), 2)},
+            "velocity_m_s": summarize(velocity[wet].astype("float64"), areas[wet]),
+            "depth_bands": depth_bands(depth[wet], areas[wet]),
+            "peak_volume_m3": round(float(stream["volume"][peak_volume]), 1), "peak_volume_time": str(times[peak_volume])[:19],
+            "peak_inundated_area_m2": round(float(stream["wet_area"][peak_area]), 1), "peak_inundated_area_time": str(times[peak_area])[:19],
+            "cell_peak_times": {name: str(peak_times[int(share * (len(peak_times) - 1))])[:19]
+                                for name, share in (("first", 0), ("median", 0.5), ("last", 1))} if len(peak_times) else {},
+            "volume_from": "volume-elevation tables" if stream["volume_tables"] else "depth times cell area",
+            "series": {"time": [str(time)[:19] for time in times], "volume_m3": stream["volume"].round(1).tolist(),
+                       "inundated_area_m2": stream["wet_area"].round(1).tolist()}}
+
+###############################################################################################
+########################################## 4. Report ##########################################
+###############################################################################################
+def format_report(report):
+    depth, velocity = report["depth_m"], report["velocity_m_s"]
+    lines = [f"Inundated {report['inundated_area_m2'] / 1e4:.2f} ha ({report['inundated_cells']} of {report['cells']} cells) of {report['area']}",
+             f"Maximum depth: mean {depth['mean']} m, 90% {depth['p90']} m, largest {depth['maximum']} m at ({depth['x']}, {depth['y']})",
+             f"Maximum velocity: mean {velocity['mean']} m/s, 90% {velocity['p90']} m/s, largest {velocity['maximum']} m/s",
+             f"Peak stored volume {report['peak_volume_m3']:,.0f} m3 at {report['peak_volume_time']} ({report['volume_from']})",
+             "Depth bands: " + ", ".join(f"{band['band']} {band['area_m2'] / 1e4:.2f} ha" for band in report["depth_bands"])]
+    return "\n".join(lines)
+
+def write_report(report, path):
+    with open(path, "w") as file:
+        json.dump(report, file, indent=1)
+    return path
+
+def write_depth_bands(report, path):
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=["band", "from_m", "to_m", "area_m2", "share"])
+        writer.writeheader()
+        writer.writerows(report["depth_bands"])
+    return path
+
+def write_volume_series(report, path):
+    #Stored volume and inundated area at every output time
+    series = report["series"]
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["time", "volume_m3", "inundated_area_m2"])
+        writer.writerows(zip(series["time"], series["volume_m3"], series["inundated_area_m2"]))
+    return path
+
+def write_statistics(report, folder, name):
+    #The report (JSON), the depth bands and the volume series (CSV) as '<name> Result Statistics.json' ...
+    return [write_report(report, os.path.join(folder, f"{name} Result Statistics.json")),
+            write_depth_bands(report, os.path.join(folder, f"{name} Depth Bands.csv")),
+            write_volume_series(report, os.path.join(folder, f"{name} Volume Series.csv"))]
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Depth, velocity, inundated area and volume statistics of a computed plan.")
+    parser.add_argument("plan", help="plan HDF file (Area.p01.hdf)")
+    parser.add_argument("--area", help="2D Flow Area (the first one by default)")
+    parser.add_argument("--output", help="folder the statistics are written to (only printed by default)")
+    options = parser.parse_args(arguments)
+    area = options.area
+    if area is None:
+        with RasResults.open_plan_results(options.plan) as hdf:
+            area = RasResults.flow_area_names(hdf)[0]
+    report = result_statistics(options.plan, area)
+    print(format_report(report))
+    if options.output:
+        write_statistics(report, options.output, os.path.basename(options.plan).split(".")[0])
+
+if __name__ == "__main__":
+    main()
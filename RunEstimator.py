@@ -0,0 +1,175 @@
+###############################################################################################
+######################################## Run Estimator ########################################
+###############################################################################################
+
+#Estimates the size and cost of a run from its inputs before it starts: the number of cells of
+#the mesh (from the area of the perimeter, the point spacing and the breakline refinement), the
+#time steps (over the days of the rainfall data), the size of the plan HDF file (from the mapping
+#and detailed output intervals) and the compute time. The compute time is the cells times the
+#time steps times a cost per cell per step, which is calibrated from the past runs in the output
+#folders: their run manifests record how long HEC-RAS computed, and their plan HDF files hold
+#their cells and simulation time window.
+
+#Usage: python RunEstimator.py run.yaml (or a batch manifest) [--past-runs "<output folder>" ...]
+
+#*********************************************************************************************
+import argparse
+import glob
+import json
+import os
+import numpy as np
+import matplotlib.path
+import BatchRunner
+import MeshCheck
+import RainfallData
+import RasResults
+import RasTextFiles
+import RunManifest
+
+#Compute seconds per cell per time step until past runs calibrate it
+DEFAULT_CELL_STEP_SECONDS = 1.0e-6
+#Plan HDF bytes per cell for the geometry, and at every mapping output (the water surface of the
+#cell and the velocities and flows of its faces) and every detailed output
+GEOMETRY_BYTES_PER_CELL = 400
+MAPPING_BYTES_PER_CELL = 28
+DETAILED_BYTES_PER_CELL = 8
+#Newest past runs used for the calibration
+MAX_CALIBRATION_RUNS = 20
+#Runs above these are pointed out before they start
+LARGE_MESH_CELLS = 1000000
+LONG_RUN_HOURS = 12
+
+###############################################################################################
+######################################## 1. Cell Count ########################################
+###############################################################################################
+def polygon_area(ring):
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+def length_inside(line, perimeters, spacing):
+    #Length of a breakline inside the perimeters
+    points, _ = MeshCheck.densify(line, spacing)
+    inside = np.zeros(len(points), dtype=bool)
+    for perimeter in perimeters:
+        inside |= matplotlib.path.Path(perimeter).contains_points(points)
+    return np.hypot(*np.diff(line, axis=0).T).sum() * inside.mean()
+
+def estimate_cells(perimeters, breaklines, dx, dy, near_spacing, repeats, far_spacing):
+    #Cells of the mesh: the DX by DY grid over the perimeters, with the band around every breakline
+    #replaced by its rows of refined cells on either side
+    dx, dy, near_spacing, far_spacing = (float(value) for value in (dx, dy, near_spacing, far_spacing))
+    offsets, spacings, band = MeshCheck.breakline_rows(near_spacing, int(float(repeats)), far_spacing)
+    cells = sum(polygon_area(perimeter) for perimeter in perimeters) / (dx * dy)
+    for line in breaklines:
+        length = length_inside(line, perimeters, min(dx, dy))
+        cells += length * (sum(2 / spacing for spacing in spacings) - 2 * band / (dx * dy))
+    return int(round(max(cells, 0)))
+
+###############################################################################################
+################################## 2. Time Steps and Outputs ##################################
+###############################################################################################
+def simulation_seconds(values):
+    #Length of the simulation time window: the plan runs from the starting time (HHMM) on the first
+    #day of the rainfall data to the ending time on its last day; the design storm is one day
+    minutes = [int(str(values[field])[:2]) * 60 + int(str(values[field])[2:]) for field in ("starting_time", "ending_time")]
+    days = 0
+    if values.get("user_input_precipitation_data"):
+        path = values["path_to_rainfall_data"]
+        first, last = RainfallData.read_first_time(path), RainfallData.read_last_time(path)
+        if np.isnat(last):
+            raise ValueError(f"The last record of the rainfall data file {path} cannot be read.")
+        days = int((last.astype("datetime64[D]") - first.astype("datetime64[D]")) / np.timedelta64(1, "D"))
+    return (days * 1440 + minutes[1] - minutes[0]) * 60.0
+
+def output_count(interval, duration):
+    #Outputs written over the simulation; 'Max Profile' writes only the maximum
+    if interval in ("", None, "Max Profile"):
+        return 1
+    return int(duration // RasTextFiles.interval_seconds(interval)) + 1
+
+def estimate_run(cells, duration, values, calibration=None):
+    #Time steps, plan HDF size and compute time of a mesh of 'cells' cells simulated for 'duration'
+    #seconds with the intervals of a scenario
+    calibration = calibration or {}
+    time_steps = int(np.ceil(duration / RasTextFiles.interval_seconds(values["computation_interval"])))
+    output_bytes = calibration.get("output_scale", 1.0) * cells * (GEOMETRY_BYTES_PER_CELL +
+        output_count(values["mapping_output_interval"], duration) * MAPPING_BYTES_PER_CELL +
+        output_count(values["detailed_output_interval"], duration) * DETAILED_BYTES_PER_CELL)
+    seconds = cells * time_steps * calibration.get("cell_step_seconds", DEFAULT_CELL_STEP_SECONDS)
+    return {"cells": cells, "time_steps": time_steps, "output_bytes": int(output_bytes), "output_gb": round(output_bytes / 1024 ** 3, 2),
+            "compute_hours": round(seconds / 3600, 2), "calibration_runs": calibration.get("runs", 0)}
+
+###############################################################################################
+################################### 3. Past Run Calibration ###################################
+###############################################################################################
+def past_runs(output_folders):
+    #Completed runs in the output folders, newest first: their cells, time steps, outputs, compute
+    #seconds (HEC-RAS computing only, without the stage messages and UI steps of the compute
+    #stage; runs that did not record it are left out) and plan HDF size
+    runs = []
+    paths = [path for folder in output_folders
+             for path in glob.glob(os.path.join(glob.escape(folder), "*", RunManifest.MANIFEST_FILE))]
+    for path in sorted(paths, key=os.path.getmtime, reverse=True):
+        with open(path, "r") as file:
+            manifest = json.load(file)
+        compute, plan = manifest["stages"].get("compute"), manifest["stages"].get("plan")
+        if not compute or not plan or not compute.get("hec_ras_seconds"):
+            continue
+        values = {key: digest.get("value") for key, digest in plan["inputs"].items()}
+        hdf_path = RasResults.plan_hdf_path(os.path.join(os.path.dirname(path), f"{manifest['area_name']} HEC-RAS Project"),
+                                            manifest["area_name"])
+        if not os.path.exists(hdf_path):
+            continue
+        try:
+            with RasResults.open_plan_results(hdf_path) as hdf:
+                cells = sum(RasResults.cell_count(hdf, area) for area in RasResults.flow_area_names(hdf))
+                start, end = RasResults.simulation_window(hdf)
+            estimate = estimate_run(cells, (end - start) / np.timedelta64(1, "s"), values)
+        except (KeyError, ValueError, OSError):
+            continue
+        runs.append({"cells": cells, "time_steps": estimate["time_steps"], "seconds": float(compute["hec_ras_seconds"]),
+                     "output_bytes": os.path.getsize(hdf_path), "estimated_bytes": estimate["output_bytes"]})
+    return runs
+
+def calibrate(output_folders):
+    #Cost per cell per step and scale of the output size model from the newest past runs (the
+    #medians, so one run slowed down by something else does not skew them)
+    runs = [run for run in past_runs(output_folders) if run["cells"] and run["time_steps"]][:MAX_CALIBRATION_RUNS]
+    if not runs:
+        return {"runs": 0}
+    return {"runs": len(runs),
+            "cell_step_seconds": float(np.median([run["seconds"] / (run["cells"] * run["time_steps"]) for run in runs])),
+            "output_scale": float(np.median([run["output_bytes"] / max(run["estimated_bytes"], 1) for run in runs]))}
+
+###############################################################################################
+########################################## 4. Report ##########################################
+###############################################################################################
+def estimate_scenario(values, calibration=None):
+    #Estimate of one scenario (values of the input form or a manifest row)
+    cells = estimate_cells(MeshCheck.read_shapes(values["path_to_2d_flow_area"]), MeshCheck.read_shapes(values["path_to_breaklines"]),
+                           values["point_spacing_dx"], values["point_spacing_dy"], values["near_spacing_m"],
+                           values["repeats"], values["far_spacing_m"])
+    return estimate_run(cells, simulation_seconds(values), values, calibration)
+
+def format_estimate(estimate):
+    source = f"calibrated from {estimate['calibration_runs']} past run(s)" if estimate["calibration_runs"] else "not calibrated yet"
+    text = (f"About {estimate['cells']:,} cells and {estimate['time_steps']:,} time steps: "
+            f"{estimate['compute_hours']} h of compute ({source}) and a {estimate['output_gb']} GB plan HDF file")
+    if estimate["cells"] > LARGE_MESH_CELLS:
+        text += "\nThe mesh is very large, check the point and breakline spacings"
+    if estimate["compute_hours"] > LONG_RUN_HOURS:
+        text += "\nThe run is very long, check the computation interval"
+    return text
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Estimate the cells, compute time and output size of Rain on Grid runs.")
+    parser.add_argument("spec", help="JSON or YAML spec of one run, or a CSV or YAML batch manifest")
+    parser.add_argument("--past-runs", nargs="+", help="output folders of past runs to calibrate from (default: those of the runs)")
+    options = parser.parse_args(arguments)
+    scenarios = BatchRunner.read_scenarios(options.spec)
+    calibration = calibrate(options.past_runs or sorted({values["output_folder_path"] for values in scenarios}))
+    for values in scenarios:
+        print(f"{values['area_name']}: {format_estimate(estimate_scenario(values, calibration))}")
+
+if __name__ == "__main__":
+    main()
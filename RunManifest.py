@@ -0,0 +1,161 @@
+###############################################################################################
+######################################## Run Manifest #########################################
+###############################################################################################
+
+#The automation runs as a fixed list of stages, from writing the project files to copying the
+#inputs into the output folder. The run manifest (run_manifest.json in the run folder) records
+#the stages that completed and the hashes of the inputs each stage used, so a run that stopped
+#part way (for example at the mesh fix or the compute) can be resumed from its first incomplete
+#stage with the files already on disk, instead of building the terrain and layers again. A
+#stage whose inputs changed since it completed is run again, and so is every stage after it.
+
+#*********************************************************************************************
+import contextlib
+import datetime
+import glob
+import hashlib
+import json
+import os
+
+MANIFEST_FILE = "run_manifest.json"
+
+#Stages of a run in order, with the inputs (arguments of run_script) each stage depends on. The
+#friction slope is not one of them, it is confirmed at its stage message.
+STAGES = ["project", "terrain", "geometry", "mesh", "plan", "compute", "results", "outputs"]
+STAGE_INPUTS = {
+    "project": ["area_name"],
+    "terrain": ["projection_file", "path_to_geometry", "path_to_land_use_layer", "path_to_soil_layer"],
+    "geometry": ["path_to_2d_flow_area", "path_to_breaklines"],
+    "mesh": ["point_spacing_dx", "point_spacing_dy", "default_mannings_n", "near_spacing_m", "repeats", "far_spacing_m"],
+    "plan": ["user_input_precipitation_data_var", "path_to_rainfall_data", "precipitation_data_time_interval",
+             "starting_time", "ending_time", "computation_interval", "hydrograph_output_interval",
+             "mapping_output_interval", "detailed_output_interval"],
+    "compute": [],
+    "results": [],
+    "outputs": [],
+}
+
+#Files that belong with a shapefile and are hashed with it
+SHAPEFILE_PARTS = [".shx", ".dbf", ".prj", ".cpg"]
+
+def data_folder(name):
+    #Folder of data kept between runs (the caches, the input store and the delay profiles) in the
+    #data folder of the user, outside the folder of the scripts: %LOCALAPPDATA% on Windows,
+    #$XDG_DATA_HOME or ~/.local/share elsewhere
+    base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "HEC-RAS Rain on Grid Automation", name)
+
+###############################################################################################
+####################################### 1. Input Hashes #######################################
+###############################################################################################
+def file_digest(path, known=None):
+    #SHA-256 of a file (and of the other files of a shapefile) with the size and modification time
+    #it was hashed at. The hash in 'known' is reused when the size and time have not changed.
+    parts = [path]
+    if path.lower().endswith(".shp"):
+        stem = os.path.splitext(path)[0]
+        parts += [stem + extension for extension in SHAPEFILE_PARTS if os.path.exists(stem + extension)]
+    size = sum(os.path.getsize(part) for part in parts)
+    mtime = max(os.path.getmtime(part) for part in parts)
+    if known and known.get("size") == size and known.get("mtime") == mtime:
+        return known
+    digest = hashlib.sha256()
+    for part in parts:
+        with open(part, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                digest.update(chunk)
+    return {"sha256": digest.hexdigest(), "size": size, "mtime": mtime}
+
+def input_digest(value, known=None):
+    #Hash of an input file, or the input itself when it is not a file
+    if isinstance(value, str) and value and os.path.isfile(value):
+        return file_digest(value, known)
+    return {"value": str(value)}
+
+def same_input(a, b):
+    return a.get("sha256", a.get("value")) == b.get("sha256", b.get("value"))
+
+###############################################################################################
+######################################### 2. Manifest #########################################
+###############################################################################################
+class RunManifest:
+    #Completed stages of the run in 'folder' and the inputs they used. 'inputs' are the arguments
+    #of run_script. Unless 'resume' is set the run starts again from the first stage.
+    def __init__(self, folder, inputs, resume=False):
+        self.path = os.path.join(folder, MANIFEST_FILE)
+        self.inputs = inputs
+        if resume and os.path.exists(self.path):
+            with open(self.path, "r") as file:
+                self.data = json.load(file)
+        else:
+            self.data = {"area_name": inputs.get("area_name"), "created": _now(), "stages": {}}
+        self.data.pop("failed", None)
+        self.resume_stage = self.first_pending()
+        self.measured = {}
+
+    def stage_inputs(self, name):
+        known = self.data["stages"].get(name, {}).get("inputs", {})
+        return {key: input_digest(self.inputs.get(key), known.get(key)) for key in STAGE_INPUTS[name]}
+
+    def changed_inputs(self, name):
+        #Inputs of a completed stage that are not the same as when it completed
+        done = self.data["stages"].get(name)
+        if done is None:
+            return None
+        current = self.stage_inputs(name)
+        return [key for key in current if key not in done["inputs"] or not same_input(current[key], done["inputs"][key])]
+
+    def first_pending(self):
+        #First stage that has not completed or whose inputs changed; None when the run is complete
+        for name in STAGES:
+            changed = self.changed_inputs(name)
+            if changed is None:
+                return name
+            if changed:
+                print(f"Stage '{name}' is run again, its inputs changed: {', '.join(changed)}")
+                return name
+        return None
+
+    def pending(self, name):
+        #True when the stage has to run; once one stage runs, every later stage runs too
+        return self.resume_stage is not None and STAGES.index(name) >= STAGES.index(self.resume_stage)
+
+    def resuming_at(self, name):
+        #True when a resumed run starts at this stage (and the UI has to be brought to its start)
+        return name == self.resume_stage and name != STAGES[0]
+
+    def measure(self, key, seconds):
+        #Time of a step of the running stage, kept with the stage when it completes (for example
+        #how long HEC-RAS computed, without the stage messages of the compute stage)
+        self.measured[key] = round(float(seconds), 1)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        #Run a stage and record it as completed, or record where the run stopped
+        for later in STAGES[STAGES.index(name):]:
+            self.data["stages"].pop(later, None)
+        started = _now()
+        self.measured = {}
+        try:
+            yield
+        except BaseException as error:
+            self.data["failed"] = {"stage": name, "error": str(error) or type(error).__name__, "time": _now()}
+            self.save()
+            raise
+        self.data["stages"][name] = {"started": started, "completed": _now(), "inputs": self.stage_inputs(name), **self.measured}
+        self.save()
+
+    def save(self):
+        with open(self.path, "w") as file:
+            json.dump(self.data, file, indent=1)
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+def latest_run_folder(output_folder, area_name):
+    #Newest run folder of the area in the output folder that has a run manifest
+    folders = [folder for folder in glob.glob(os.path.join(glob.escape(output_folder), f"* {glob.escape(area_name)}"))
+               if os.path.exists(os.path.join(folder, MANIFEST_FILE))]
+    if not folders:
+        raise ValueError(f"No run of {area_name} with a {MANIFEST_FILE} in {output_folder} to resume.")
+    return max(folders)
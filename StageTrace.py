@@ -0,0 +1,125 @@
+###############################################################################################
+######################################### Stage Trace #########################################
+###############################################################################################
+
+#Times the numbered stages of a run, the wait loops, the stage messages and the file operations
+#and writes them as a Chrome trace (trace.json) that opens in chrome://tracing or Perfetto. Every
+#stage and span carries counters such as the seconds slept and the polls made inside it. Tracing
+#is off unless enable() is called; while it is off every call returns straight away.
+
+#*********************************************************************************************
+import contextlib
+import json
+import os
+import threading
+import time
+
+#The trace of the current run, None while tracing is off
+_trace = None
+
+#Number of the stage the run is in, kept while tracing is off too (see current_stage)
+_stage = "-"
+
+#Returned by span() while tracing is off
+_NO_SPAN = contextlib.nullcontext()
+
+class _Trace:
+    def __init__(self, path):
+        self.path = path
+        self.start = time.perf_counter()
+        self.events = []
+        #Open stages and spans, innermost last, as [stage number or None, name, counters]
+        self.open = []
+
+    def event(self, phase, name, category, args=None):
+        event = {"name": name, "cat": category, "ph": phase, "ts": round((time.perf_counter() - self.start) * 1e6),
+                 "pid": os.getpid(), "tid": threading.get_ident()}
+        if args:
+            event["args"] = {key: round(value, 3) if isinstance(value, float) else value for key, value in args.items()}
+        self.events.append(event)
+
+    def close_last(self):
+        number, name, counters = self.open.pop()
+        self.event("E", name, "stage" if number else "span", counters)
+
+###############################################################################################
+######################################### 1. Tracing ##########################################
+###############################################################################################
+def enable(path=None):
+    #Start a new trace; it is written to 'path' (or the path set later with set_path) by save()
+    global _trace
+    _trace = _Trace(path)
+
+def set_path(path):
+    if _trace is not None:
+        _trace.path = path
+
+def enabled():
+    return _trace is not None
+
+def save():
+    #Close the open stages, write the trace and turn tracing off. Returns the path written.
+    global _trace
+    if _trace is None or _trace.path is None:
+        return None
+    while _trace.open:
+        _trace.close_last()
+    with open(_trace.path, "w") as file:
+        json.dump({"traceEvents": _trace.events, "displayTimeUnit": "ms"}, file)
+    path, _trace = _trace.path, None
+    print(f"Stage trace saved to {path}")
+    return path
+
+###############################################################################################
+##################################### 2. Stages and Spans #####################################
+###############################################################################################
+def begin(stage):
+    #Start a numbered stage such as '2.1.2 Create New RAS Terrain'. Open stages that are not its
+    #parents (2.1.1, but not 2.1 or 2) end first, so each stage needs only one begin() call.
+    global _stage
+    number = _stage = stage.split()[0]
+    if _trace is None:
+        return
+    while _trace.open and not (_trace.open[-1][0] and number.startswith(_trace.open[-1][0] + ".")):
+        _trace.close_last()
+    _trace.open.append([number, stage, {}])
+    _trace.event("B", stage, "stage")
+
+def current_stage():
+    #Number of the last stage begun, such as '2.1.2'
+    return _stage
+
+def end_stages():
+    #End all open stages, for example when a run pauses outside the numbered stages
+    if _trace is None:
+        return
+    while _trace.open:
+        _trace.close_last()
+
+class _Span:
+    def __init__(self, name, category):
+        self.name, self.category = name, category
+
+    def __enter__(self):
+        _trace.open.append([None, self.name, {}])
+        _trace.event("B", self.name, self.category)
+        return self
+
+    def __exit__(self, *exception):
+        if _trace is not None and _trace.open:
+            counters = _trace.open.pop()[2]
+            _trace.event("E", self.name, self.category, counters)
+        return False
+
+def span(name, category="span"):
+    #Context manager timing a wait, stage message or file operation inside the current stage
+    if _trace is None:
+        return _NO_SPAN
+    return _Span(name, category)
+
+def count(counter, value=1):
+    #Add to a counter (for example 'polls' or 'slept_s') of every open stage and span
+    if _trace is None:
+        return
+    for _, _, counters in _trace.open:
+        counters[counter] = counters.get(counter, 0) + value
@@ -0,0 +1,179 @@
+###############################################################################################
+######################################## Terrain Cache ########################################
+###############################################################################################
+
+#Keeps the RAS Terrains built by RAS Mapper (the HDF, VRT and converted GeoTIFF files of the
+#project 'Terrain' folder) in a cache folder that several runs and machines can share. Terrains
+#are keyed by the content hash of the terrain GeoTIFF and the projection file (and the HEC-RAS
+#version), so a run with the same DEM and projection copies the Terrain into its project instead
+#of building it again. Terrains are copied and never hard linked: RAS Mapper can rewrite the
+#Terrain of a project in place, which would change a linked cache entry for every later run. The
+#least recently used Terrains are removed when the cache grows past its size limit.
+
+#*********************************************************************************************
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import RasTextFiles
+import RunManifest
+import StageTrace
+
+TERRAIN_FOLDER = "Terrain"
+ENTRY_FILE = "entry.json"
+#Hashes of the input files by path, size and modification time, so a DEM of several GB is
+#hashed once and not on every run
+DIGEST_FILE = "digests.json"
+
+#Cache folder, size limit and whether the cache is used; set with configure(). The folder can also be set with the RAS_TERRAIN_CACHE variable.
+settings = {
+    "folder": os.environ.get("RAS_TERRAIN_CACHE") or RunManifest.data_folder("Terrain Cache"),
+    "max_bytes": 50 * 1024 ** 3,
+    "enabled": True,
+}
+
+def configure(folder=None, max_gb=None, enabled=None):
+    for key, value in (("folder", folder), ("enabled", enabled)):
+        if value is not None:
+            settings[key] = value
+    if max_gb is not None:
+        settings["max_bytes"] = int(float(max_gb) * 1024 ** 3)
+
+###############################################################################################
+######################################## 1. Cache Keys ########################################
+###############################################################################################
+def _digest(path):
+    #SHA-256 of a file, reusing the hash kept in the cache while the file is unchanged
+    digests_path = os.path.join(settings["folder"], DIGEST_FILE)
+    digests = {}
+    if os.path.exists(digests_path):
+        with open(digests_path, "r") as file:
+            digests = json.load(file)
+    key = os.path.abspath(path)
+    digest = RunManifest.file_digest(path, digests.get(key))
+    if digests.get(key) != digest:
+        digests[key] = digest
+        os.makedirs(settings["folder"], exist_ok=True)
+        with open(digests_path + f".{os.getpid()}", "w") as file:
+            json.dump(digests, file)
+        os.replace(digests_path + f".{os.getpid()}", digests_path)
+    return digest["sha256"]
+
+def terrain_key(path_to_geometry, projection_file):
+    #Cache key of the Terrain built from a GeoTIFF with a projection
+    parts = [RasTextFiles.RAS_PROGRAM_VERSION, _digest(path_to_geometry), _digest(projection_file)]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:32]
+
+###############################################################################################
+#################################### 2. Restore and Store #####################################
+###############################################################################################
+def restore_terrain(path_to_geometry, projection_file, project_folder, rasmap_path):
+    #Copy the cached Terrain of the GeoTIFF and projection into the project and add it to the RAS
+    #Mapper file. Returns the Terrain HDF (relative to the project folder), or None when it is
+    #not cached and has to be built.
+    if not settings["enabled"]:
+        return None
+    key = terrain_key(path_to_geometry, projection_file)
+    entry = os.path.join(settings["folder"], key)
+    if not os.path.exists(os.path.join(entry, ENTRY_FILE)):
+        print(f"Terrain cache miss {key[:12]}, the Terrain is built")
+        return None
+    with open(os.path.join(entry, ENTRY_FILE), "r") as file:
+        details = json.load(file)
+
+    start = time.monotonic()
+    target = os.path.join(project_folder, TERRAIN_FOLDER)
+    try:
+        with StageTrace.span("Restore cached Terrain", "file"):
+            copied = _copy_folder(os.path.join(entry, TERRAIN_FOLDER), target)
+    except OSError as error:
+        #For example the Terrain was removed from the cache by another run while it was copied
+        print(f"Terrain cache entry {key[:12]} could not be copied ({error}), the Terrain is built")
+        shutil.rmtree(target, ignore_errors=True)
+        return None
+    RasTextFiles.register_rasmap_terrain(rasmap_path, details["terrain"], details["layer"])
+    #Restoring a Terrain makes it the most recently used
+    os.utime(os.path.join(entry, ENTRY_FILE))
+    print(f"Terrain cache hit {key[:12]}: copied {copied / 1e6:.0f} MB "
+          f"in {time.monotonic() - start:.1f} s instead of building the Terrain")
+    return details["terrain"]
+
+def store_terrain(path_to_geometry, projection_file, project_folder):
+    #Add the Terrain RAS Mapper built in the project to the cache, then trim the cache to its limit
+    if not settings["enabled"]:
+        return
+    source = os.path.join(project_folder, TERRAIN_FOLDER)
+    hdf_files = sorted(name for name in os.listdir(source) if name.endswith(".hdf")) if os.path.isdir(source) else []
+    if not hdf_files:
+        print(f"No Terrain in {source} to cache")
+        return
+    key = terrain_key(path_to_geometry, projection_file)
+    entry = os.path.join(settings["folder"], key)
+    if os.path.exists(entry):
+        return
+
+    #Copy to a temporary folder first so other runs never see a half written Terrain
+    temporary = f"{entry}.{os.getpid()}.tmp"
+    with StageTrace.span("Store Terrain in cache", "file"):
+        size = _copy_folder(source, os.path.join(temporary, TERRAIN_FOLDER))
+    details = {"terrain": f"{TERRAIN_FOLDER}/{hdf_files[0]}", "layer": os.path.splitext(hdf_files[0])[0],
+               "source": os.path.abspath(path_to_geometry), "projection": os.path.abspath(projection_file),
+               "bytes": size, "created": datetime.datetime.now().isoformat(timespec="seconds")}
+    with open(os.path.join(temporary, ENTRY_FILE), "w") as file:
+        json.dump(details, file, indent=1)
+    try:
+        os.rename(temporary, entry)
+    except OSError:
+        #Another run stored the same Terrain first
+        shutil.rmtree(temporary, ignore_errors=True)
+        return
+    print(f"Terrain stored in the terrain cache as {key[:12]} ({size / 1e6:.0f} MB)")
+    evict(keep=key)
+
+def _copy_folder(source, target):
+    #Copy the files of a folder. Returns the bytes.
+    size = 0
+    for folder, _, names in os.walk(source):
+        destination = os.path.join(target, os.path.relpath(folder, source))
+        os.makedirs(destination, exist_ok=True)
+        for name in names:
+            source_file, target_file = os.path.join(folder, name), os.path.join(destination, name)
+            if os.path.exists(target_file):
+                os.remove(target_file)
+            shutil.copy2(source_file, target_file)
+            size += os.path.getsize(target_file)
+    return size
+
+###############################################################################################
+######################################### 3. Eviction #########################################
+###############################################################################################
+def cache_entries():
+    #Cached Terrains as (key, bytes, last used time), least recently used first
+    folder = settings["folder"]
+    entries = []
+    for key in os.listdir(folder) if os.path.isdir(folder) else []:
+        entry_file = os.path.join(folder, key, ENTRY_FILE)
+        if os.path.exists(entry_file):
+            size = sum(os.path.getsize(os.path.join(path, name))
+                       for path, _, names in os.walk(os.path.join(folder, key)) for name in names)
+            entries.append((key, size, os.path.getmtime(entry_file)))
+    return sorted(entries, key=lambda entry: entry[2])
+
+def evict(max_bytes=None, keep=None):
+    #Remove the least recently used Terrains until the cache is within its size limit. The
+    #Terrain 'keep' (the one just stored) is never removed.
+    max_bytes = settings["max_bytes"] if max_bytes is None else max_bytes
+    entries = cache_entries()
+    total = sum(size for _, size, _ in entries)
+    for key, size, _ in entries:
+        if total <= max_bytes:
+            break
+        if key == keep:
+            continue
+        shutil.rmtree(os.path.join(settings["folder"], key), ignore_errors=True)
+        total -= size
+        print(f"Terrain {key[:12]} removed from the terrain cache ({size / 1e6:.0f} MB)")
+    return total
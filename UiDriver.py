@@ -0,0 +1,251 @@
+###############################################################################################
+########################################## UI Driver ##########################################
+###############################################################################################
+
+#Every mouse, keyboard, clipboard, window, COM and wait action of the automation goes through a
+#UI driver, so the same pipeline can run on the real desktop, be recorded, or be replayed
+#without Windows or HEC-RAS. The pyautogui driver is the real desktop; the recording driver
+#wraps it and logs every action with its time and result to a JSON lines file; the replay
+#driver plays a recording back instantly (checking that the pipeline repeats the same actions)
+#and adds up the sleep time on a virtual clock, so runs can be benchmarked and regression
+#tested on Linux.
+
+#*********************************************************************************************
+import json
+import time
+
+import StageTrace
+
+RAS_CONTROLLER = "RAS631.HECRASController"
+
+###############################################################################################
+###################################### 1. Desktop Driver ######################################
+###############################################################################################
+class PyAutoGuiDriver:
+    #The Windows desktop, through pyautogui, pyperclip, win32gui and win32com
+    simulated = False
+
+    def __init__(self):
+        #Imported here so the other drivers work on machines without these modules
+        import pyautogui
+        import pyperclip
+        import win32com.client
+        import win32gui
+        import win32con
+        self.pyautogui, self.pyperclip, self.win32com = pyautogui, pyperclip, win32com
+        self.win32gui, self.win32con = win32gui, win32con
+
+    def click(self, x, y, button='left'):
+        self.pyautogui.click(x=x, y=y, button=button)
+
+    def move_to(self, x, y):
+        self.pyautogui.moveTo(x, y)
+
+    def drag_to(self, x, y, button='left', duration=0.0):
+        self.pyautogui.dragTo(x, y, button=button, duration=duration)
+
+    def write(self, text):
+        #Text, or a list of key names such as ['backspace'] * 50
+        self.pyautogui.write(text)
+
+    def press(self, key):
+        self.pyautogui.press(key)
+
+    def hotkey(self, *keys):
+        self.pyautogui.hotkey(*keys)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+        StageTrace.count("slept_s", seconds)
+
+    def paste(self):
+        return self.pyperclip.paste()
+
+    def is_foreground_maximized(self):
+        #True when the foreground window is maximized
+        placement = self.win32gui.GetWindowPlacement(self.win32gui.GetForegroundWindow())
+        return placement[1] == self.win32con.SW_MAXIMIZE
+
+    def dispatch(self, prog_id=RAS_CONTROLLER):
+        #COM object such as the HEC-RAS Controller
+        return self.win32com.client.Dispatch(prog_id)
+
+    def screen_signature(self):
+        #Small greyscale copy of the screen, to tell when the UI has stopped changing
+        return self.pyautogui.screenshot().convert("L").resize((160, 90)).tobytes()
+
+    def wait(self, name, function, *args, **kwargs):
+        #Wait for something outside the UI, for example WaitEngine.wait_for_layer
+        return function(*args, **kwargs)
+
+    def close(self):
+        pass
+
+###############################################################################################
+##################################### 2. Recording Driver #####################################
+###############################################################################################
+class RecordingDriver:
+    #Runs every action on another driver and logs it to a JSON lines file as
+    #{"time": seconds since the start, "action": name, "args": [...], "result": ...}
+    def __init__(self, driver, path):
+        self.driver = driver
+        self.simulated = driver.simulated
+        self.file = open(path, "w")
+        self.start = time.monotonic()
+
+    def _record(self, action, args, result=None):
+        entry = {"time": round(time.monotonic() - self.start, 3), "action": action, "args": list(args)}
+        if result is not None:
+            entry["result"] = result
+        self.file.write(json.dumps(entry, default=str) + "\n")
+        self.file.flush()
+        return result
+
+    def click(self, x, y, button='left'):
+        self.driver.click(x, y, button)
+        self._record("click", (x, y, button))
+
+    def move_to(self, x, y):
+        self.driver.move_to(x, y)
+        self._record("move_to", (x, y))
+
+    def drag_to(self, x, y, button='left', duration=0.0):
+        self.driver.drag_to(x, y, button, duration)
+        self._record("drag_to", (x, y, button, duration))
+
+    def write(self, text):
+        self.driver.write(text)
+        self._record("write", (text,))
+
+    def press(self, key):
+        self.driver.press(key)
+        self._record("press", (key,))
+
+    def hotkey(self, *keys):
+        self.driver.hotkey(*keys)
+        self._record("hotkey", keys)
+
+    def sleep(self, seconds):
+        self.driver.sleep(seconds)
+        self._record("sleep", (seconds,))
+
+    def paste(self):
+        return self._record("paste", (), self.driver.paste())
+
+    def is_foreground_maximized(self):
+        return self._record("is_foreground_maximized", (), self.driver.is_foreground_maximized())
+
+    def dispatch(self, prog_id=RAS_CONTROLLER):
+        self._record("dispatch", (prog_id,))
+        return _ComProxy(self, self.driver.dispatch(prog_id))
+
+    def wait(self, name, function, *args, **kwargs):
+        started = time.monotonic()
+        self.driver.wait(name, function, *args, **kwargs)
+        return self._record("wait", (name,), {"elapsed": round(time.monotonic() - started, 3)})
+
+    def close(self):
+        self.file.close()
+        self.driver.close()
+
+class _ComProxy:
+    #Records the method calls made on a COM object, such as RASController.Project_Open(...)
+    def __init__(self, driver, target):
+        self._driver, self._target = driver, target
+
+    def __getattr__(self, name):
+        def method(*args):
+            result = getattr(self._target, name)(*args) if self._target is not None else None
+            if isinstance(self._driver, ReplayDriver):
+                return self._driver._next("com." + name, args)
+            return self._driver._record("com." + name, args, result if isinstance(result, (str, int, float, bool)) else None)
+        return method
+
+###############################################################################################
+###################################### 3. Replay Driver #######################################
+###############################################################################################
+class ReplayDriver:
+    #Replays a recording instantly. Every action is checked against the next recorded action and
+    #the recorded clipboard, window and COM results are returned; a different action raises a
+    #ValueError naming the step. Without a recording any action is accepted and the clipboard
+    #holds 'clipboard'. Sleeps only advance the virtual clock.
+    simulated = True
+
+    def __init__(self, path=None, clipboard="Finished Unsteady Flow Simulation"):
+        self.actions = []
+        if path is not None:
+            with open(path, "r") as file:
+                self.actions = [json.loads(line) for line in file if line.strip()]
+        self.strict = path is not None
+        self.clipboard = clipboard
+        self.step = 0
+        self.clock = 0.0
+        self.counts = {}
+        self.slept = 0.0
+
+    def _next(self, action, args):
+        self.counts[action] = self.counts.get(action, 0) + 1
+        if not self.strict:
+            self.step += 1
+            return None
+        if self.step >= len(self.actions):
+            raise ValueError(f"Step {self.step + 1}: {action}{tuple(args)} is not in the recording.")
+        expected = self.actions[self.step]
+        if expected["action"] != action or expected["args"] != json.loads(json.dumps(list(args), default=str)):
+            raise ValueError(f"Step {self.step + 1}: expected {expected['action']}{tuple(expected['args'])}, "
+                             f"got {action}{tuple(args)}.")
+        self.step += 1
+        return expected.get("result")
+
+    def click(self, x, y, button='left'):
+        self._next("click", (x, y, button))
+
+    def move_to(self, x, y):
+        self._next("move_to", (x, y))
+
+    def drag_to(self, x, y, button='left', duration=0.0):
+        self._next("drag_to", (x, y, button, duration))
+        self.clock += duration
+
+    def write(self, text):
+        self._next("write", (text,))
+
+    def press(self, key):
+        self._next("press", (key,))
+
+    def hotkey(self, *keys):
+        self._next("hotkey", keys)
+
+    def sleep(self, seconds):
+        self._next("sleep", (seconds,))
+        self.clock += seconds
+        self.slept += seconds
+        StageTrace.count("slept_s", seconds)
+
+    def paste(self):
+        result = self._next("paste", ())
+        return self.clipboard if result is None else result
+
+    def is_foreground_maximized(self):
+        result = self._next("is_foreground_maximized", ())
+        return True if result is None else result
+
+    def dispatch(self, prog_id=RAS_CONTROLLER):
+        self._next("dispatch", (prog_id,))
+        return _ComProxy(self, None)
+
+    def wait(self, name, function, *args, **kwargs):
+        #The waited-for task took as long as it did in the recording
+        result = self._next("wait", (name,))
+        self.clock += (result or {}).get("elapsed", 0.0)
+        StageTrace.count("waited_s", (result or {}).get("elapsed", 0.0))
+        return result
+
+    def summary(self):
+        #Number of actions of each kind, the virtual duration of the run and the time spent sleeping
+        if self.strict and self.step != len(self.actions):
+            print(f"Replay stopped after {self.step} of {len(self.actions)} recorded actions")
+        return {"actions": dict(self.counts), "virtual_seconds": round(self.clock, 1), "sleep_seconds": round(self.slept, 1)}
+
+    def close(self):
+        pass
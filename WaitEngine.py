@@ -0,0 +1,97 @@
+###############################################################################################
+######################################### Wait Engine #########################################
+###############################################################################################
+
+#Waits for HEC-RAS and RAS Mapper to finish long running tasks by watching the files they
+#write, instead of copying the text of their progress windows to the clipboard. Polling backs
+#off from a short first delay to a maximum delay and every wait has a hard timeout, so finished
+#tasks are detected within a second or two and a stuck task stops the run instead of hanging it.
+
+#*********************************************************************************************
+import glob
+import os
+import time
+
+import StageTrace
+
+###############################################################################################
+###################################### 1. Generic Waits #######################################
+###############################################################################################
+def wait_until(condition, timeout, name="task", initial_delay=0.5, max_delay=10.0, backoff=1.5,
+               sleep=time.sleep, clock=time.monotonic):
+    #Call 'condition' until it returns True, sleeping initial_delay, then backoff times longer
+    #each poll up to max_delay. Returns how long the wait took, how often the condition was
+    #polled and how long was spent sleeping. Raises TimeoutError after 'timeout' seconds. The wait
+    #and its polls are added to the stage trace when tracing is on.
+    start = clock()
+    delay = initial_delay
+    polls = 0
+    slept = 0.0
+
+    with StageTrace.span(f"Wait for {name}", "wait"):
+        while True:
+            polls += 1
+            StageTrace.count("polls")
+            if condition():
+                elapsed = clock() - start
+                print(f"{name} complete after {elapsed:.1f} s ({polls} polls)")
+                return {"name": name, "elapsed": elapsed, "polls": polls, "slept": slept}
+
+            remaining = timeout - (clock() - start)
+            if remaining <= 0:
+                raise TimeoutError(f"{name} did not complete within {timeout:g} s ({polls} polls).")
+            delay = min(delay, max_delay, remaining)
+            sleep(delay)
+            slept += delay
+            StageTrace.count("slept_s", delay)
+            delay *= backoff
+
+###############################################################################################
+######################################## 2. File Waits ########################################
+###############################################################################################
+def files_settled(patterns, settle_time=3.0, newer_than=None, clock=time.monotonic):
+    #Condition that is True once every glob pattern matches at least one file (modified after
+    #'newer_than' when given) and the size of the matched files has not changed for settle_time
+    #seconds, that is the files exist and are no longer being written.
+    state = {"sizes": None, "since": None}
+
+    def condition():
+        sizes = {}
+        for pattern in patterns:
+            matches = [path for path in glob.glob(pattern)
+                       if newer_than is None or os.path.getmtime(path) >= newer_than]
+            if not matches:
+                state["sizes"] = None
+                return False
+            for path in matches:
+                sizes[path] = os.path.getsize(path)
+
+        now = clock()
+        if sizes != state["sizes"]:
+            state["sizes"] = sizes
+            state["since"] = now
+            return False
+        return now - state["since"] >= settle_time
+
+    return condition
+
+def wait_for_files(patterns, timeout, name="task", settle_time=3.0, newer_than=None, initial_delay=0.5,
+                   max_delay=10.0, backoff=1.5, sleep=time.sleep, clock=time.monotonic):
+    #Wait until the files matching the glob patterns exist and their size has settled
+    condition = files_settled(patterns, settle_time, newer_than, clock)
+    return wait_until(condition, timeout, name, initial_delay, max_delay, backoff, sleep, clock)
+
+###############################################################################################
+#################################### 3. RAS Mapper Layers #####################################
+###############################################################################################
+#Files RAS Mapper writes into the project folder when a layer is built
+RAS_MAPPER_LAYER_FILES = {
+    "Terrain": [os.path.join("Terrain", "*.hdf"), os.path.join("Terrain", "*.vrt")],
+    "Land Cover Layer": [os.path.join("Land Classification", "*.hdf")],
+    "Soils Layer": [os.path.join("Soils", "*.hdf")],
+}
+
+def wait_for_layer(project_folder, layer, timeout=3600, settle_time=5.0, newer_than=None):
+    #Wait until RAS Mapper has finished writing a Terrain, Land Cover Layer or Soils Layer
+    patterns = [os.path.join(project_folder, pattern) for pattern in RAS_MAPPER_LAYER_FILES[layer]]
+    return wait_for_files(patterns, timeout, layer, settle_time, newer_than)
@@ -0,0 +1,77 @@
+###############################################################################################
+###################################### Batch Runner Tests #####################################
+###############################################################################################
+
+#Manifests are read like the input form: every value is text, whether the manifest cell held a
+#number or not, so the checks report bad values instead of failing on them.
+
+#Usage: python -m pytest tests
+
+#*********************************************************************************************
+import json
+import BatchRunner
+
+def write_inputs(folder):
+    #Empty input files for the file fields of a scenario
+    for field in BatchRunner.FILE_FIELDS:
+        (folder / f"{field}.shp").write_text("")
+    return {field: str(folder / f"{field}.shp") for field in BatchRunner.FILE_FIELDS}
+
+def yaml_run(inputs, folder, **values):
+    lines = [f"  - area_name: {values.pop('area_name', 'Area')}",
+             f"    input_folder_path: '{folder}'", f"    output_folder_path: '{folder}'"]
+    lines += [f"    {field}: '{path}'" for field, path in inputs.items()]
+    lines += [f"    {field}: {value}" for field, value in values.items()]
+    return lines
+
+def test_yaml_numbers_are_read_as_text(tmp_path):
+    inputs = write_inputs(tmp_path)
+    manifest = tmp_path / "manifest.yaml"
+    manifest.write_text("\n".join(["runs:"] + yaml_run(inputs, tmp_path, point_spacing_dx=10, point_spacing_dy=12.5,
+                                                       repeats=3, default_mannings_n=0.04, starting_time="'0100'",
+                                                       ending_time=1100, user_input_precipitation_data="no")))
+
+    values = BatchRunner.read_manifest(str(manifest))[0]
+    assert values["point_spacing_dx"] == "10"
+    assert values["point_spacing_dy"] == "12.5"
+    assert values["repeats"] == "3"
+    assert values["default_mannings_n"] == "0.04"
+    assert values["ending_time"] == "1100"
+    assert values["user_input_precipitation_data"] == 0
+    assert BatchRunner.validate_scenario(values) == []
+
+def test_unquoted_yaml_time_is_a_field_error(tmp_path):
+    #YAML reads an unquoted 0100 as the octal number 64
+    inputs = write_inputs(tmp_path)
+    manifest = tmp_path / "manifest.yaml"
+    manifest.write_text("\n".join(["runs:"] + yaml_run(inputs, tmp_path, starting_time="0100", repeats=2.5)))
+
+    errors = BatchRunner.validate_scenario(BatchRunner.read_manifest(str(manifest))[0])
+    assert "starting_time and ending_time must be HHMM times: 64, 1100" in errors
+    assert "repeats is not a whole number: 2.5" in errors
+
+def test_csv_numbers_are_stripped(tmp_path):
+    inputs = write_inputs(tmp_path)
+    header = ["area_name", "input_folder_path", "output_folder_path"] + list(inputs) + \
+             ["point_spacing_dx", "repeats", "starting_time", "ending_time", "user_input_precipitation_data"]
+    row = ["Area", str(tmp_path), str(tmp_path)] + list(inputs.values()) + [" 20 ", "4", "0030", " 0600", "0"]
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text(",".join(header) + "\n" + ",".join(row) + "\n")
+
+    values = BatchRunner.read_manifest(str(manifest))[0]
+    assert values["point_spacing_dx"] == "20"
+    assert values["ending_time"] == "0600"
+    assert values["user_input_precipitation_data"] == 0
+    assert BatchRunner.validate_scenario(values) == []
+
+def test_json_spec_numbers_are_read_as_text(tmp_path):
+    inputs = write_inputs(tmp_path)
+    spec = tmp_path / "run.json"
+    spec.write_text(json.dumps({"area_name": "Area", "input_folder_path": str(tmp_path),
+                                "output_folder_path": str(tmp_path), **inputs, "far_spacing_m": 7.5,
+                                "repeats": 2, "user_input_precipitation_data": True}))
+
+    values = BatchRunner.read_scenario(str(spec))
+    assert values["far_spacing_m"] == "7.5"
+    assert values["repeats"] == "2"
+    assert values["user_input_precipitation_data"] == 1
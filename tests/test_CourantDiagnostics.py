@@ -0,0 +1,38 @@
+###############################################################################################
+################################## Courant Diagnostics Tests ##################################
+###############################################################################################
+
+#The percentiles of the Courant numbers are read from their histogram; they have to be close to
+#the percentiles of the numbers themselves and never more than the largest one.
+
+#Usage: python -m pytest tests
+
+#*********************************************************************************************
+import numpy as np
+import pytest
+import CourantDiagnostics
+
+def histogram(values):
+    return np.bincount(np.searchsorted(CourantDiagnostics.BINS, values), minlength=len(CourantDiagnostics.BINS) + 1)
+
+@pytest.mark.parametrize("values", [np.random.default_rng(1).uniform(0.5, 11.999, 100000),
+                                    np.random.default_rng(2).lognormal(0.0, 1.0, 100000),
+                                    np.random.default_rng(3).uniform(900.0, 5000.0, 1000)])
+@pytest.mark.parametrize("percentile", [50, 90, 99, 99.9])
+def test_percentile_within_its_bin(values, percentile):
+    estimate = CourantDiagnostics.histogram_percentile(histogram(values), percentile, values.max())
+    assert estimate <= values.max()
+    #The bins are 5 % wide, values above the last bin only need to be in range
+    if values.max() < CourantDiagnostics.BINS[-1]:
+        assert estimate == pytest.approx(np.percentile(values, percentile), rel=0.06)
+    else:
+        assert estimate >= CourantDiagnostics.BINS[-1]
+
+def test_percentile_of_one_value_is_the_value():
+    #The bin of the maximum ends at it
+    values = np.full(500, 2.0)
+    assert CourantDiagnostics.histogram_percentile(histogram(values), 99, 2.0) == pytest.approx(2.0, rel=1e-3)
+    assert CourantDiagnostics.histogram_percentile(histogram(values), 100, 2.0) == 2.0
+
+def test_percentile_of_no_values():
+    assert CourantDiagnostics.histogram_percentile(histogram(np.array([])), 90, 0.0) == 0.0
@@ -0,0 +1,67 @@
+###############################################################################################
+##################################### Design Storm Tests ######################################
+###############################################################################################
+
+#The hyetographs of every storm type hold the whole design depth, whatever the duration and
+#time step, and are written with the columns of the rainfall .dat files.
+
+#Usage: python -m pytest tests
+
+#*********************************************************************************************
+import datetime
+import numpy as np
+import pytest
+import DesignStorms
+
+STORM_TYPES = ["SCS I", "SCS IA", "SCS II", "SCS III", "Huff 1", "Huff 2", "Huff 3", "Huff 4"]
+
+@pytest.mark.parametrize("storm_type", STORM_TYPES)
+@pytest.mark.parametrize("duration_h, time_step_min", [(24, 5), (6, 15), (1, 1), (24, 7)])
+def test_design_storm_sums_to_depth(storm_type, duration_h, time_step_min):
+    storm = DesignStorms.design_storm(120.0, duration_h, time_step_min, storm_type)
+    assert len(storm) == int(np.ceil(duration_h * 60 / time_step_min))
+    assert storm.sum() == pytest.approx(120.0)
+    assert (storm >= 0).all()
+
+def test_design_storm_matrix_sums_to_depths():
+    depths = [[50.0, 80.0, 100.0], [70.0, 110.0, 140.0]]
+    storms = DesignStorms.design_storm_matrix(depths, [1, 6, 24], 10, "SCS II")
+    assert storms.shape == (2, 3, 144)
+    np.testing.assert_allclose(storms.sum(axis=2), depths)
+    #Shorter storms are padded with zeros
+    assert (storms[:, 0, 6:] == 0).all()
+    assert (storms[:, 1, 36:] == 0).all()
+
+def test_scs_curves_keep_their_shape_when_stretched():
+    #Half of an SCS Type II storm has fallen by 12 of 24 hours, and by 3 of 6 hours
+    day = DesignStorms.design_storm(100.0, 24, 60, "SCS II")
+    short = DesignStorms.design_storm(100.0, 6, 15, "SCS II")
+    assert day[:12].sum() == pytest.approx(66.3)
+    assert short[:12].sum() == pytest.approx(66.3)
+
+def test_alternating_block_sums_to_idf_depth():
+    a, b, c = [1000.0, 1500.0], 10.0, 0.8
+    storms = DesignStorms.alternating_block_matrix(a, b, c, [1, 3], 5)
+    for row, a_value in enumerate(a):
+        for column, duration_h in enumerate([1, 3]):
+            expected = DesignStorms.idf_depth(a_value, b, c, duration_h * 60)
+            assert storms[row, column].sum() == pytest.approx(expected)
+
+def test_alternating_block_peak_position():
+    storm = DesignStorms.alternating_block_matrix(1000.0, 10.0, 0.8, [2], 10, peak_position=0.25)[0, 0]
+    assert np.argmax(storm) == 3
+    #The blocks fall away on both sides of the peak
+    assert (np.diff(storm[3:]) <= 0).all()
+    assert (np.diff(storm[:4]) >= 0).all()
+
+@pytest.mark.parametrize("storm_type", ["SCS IV", "Huff 5", "Huff", "Chicago"])
+def test_unknown_storm_type(storm_type):
+    with pytest.raises(ValueError, match="Unknown storm type"):
+        DesignStorms.design_storm(100.0, 24, 5, storm_type)
+
+def test_storm_dataframe_columns():
+    frame = DesignStorms.storm_dataframe([1.0, 2.5, 0.0], 30, start=datetime.datetime(2024, 1, 31, 23, 0))
+    assert list(frame.columns) == ["Date", "Time", "Precipitation (mm)"]
+    assert list(frame["Date"]) == ["31JAN2024", "31JAN2024", "01FEB2024"]
+    assert list(frame["Time"]) == ["2300", "2330", "0000"]
+    assert DesignStorms.storm_file_name("Area", "SCS III", 120.0) == "Area SA SCS T3 (120mm).dat"
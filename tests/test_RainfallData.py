@@ -0,0 +1,100 @@
+###############################################################################################
+##################################### Rainfall Data Tests #####################################
+###############################################################################################
+
+#Rainfall .dat files are read with and without a header line and with HHMM or HH:MM times, and
+#the checks find the gaps, the negative values and the rows that cannot be read.
+
+#Usage: python -m pytest tests
+
+#*********************************************************************************************
+import numpy as np
+import pandas as pd
+import pytest
+import RainfallData
+
+HEADER = "Date\tTime\tPrecipitation (mm)"
+
+def write_records(path, rows, header=False):
+    lines = ([HEADER] if header else []) + ["\t".join(row) for row in rows]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+def records(times, values):
+    return [(date, time, value) for (date, time), value in zip(times, values)]
+
+FIVE_MINUTES = [("01JAN2024", "0000"), ("01JAN2024", "0005"), ("01JAN2024", "0010"), ("01JAN2024", "0015")]
+
+@pytest.mark.parametrize("header", [False, True])
+def test_read_with_and_without_header(tmp_path, header):
+    path = write_records(tmp_path / "rain.dat", records(FIVE_MINUTES, ["0", "1.5", "2", "0.5"]), header)
+    times, precipitation = RainfallData.read_rainfall_data(path, chunksize=2)
+    assert len(times) == 4
+    assert times[1] == np.datetime64("2024-01-01T00:05")
+    np.testing.assert_allclose(precipitation, [0, 1.5, 2, 0.5])
+
+    report = RainfallData.check_rainfall_data(times, precipitation)
+    assert report["valid"]
+    assert report["interval"] == "5 Minute"
+    assert (report["start_date"], report["start_time"]) == ("01JAN2024", "0000")
+    assert (report["end_date"], report["end_time"]) == ("01JAN2024", "0015")
+    assert report["total_mm"] == pytest.approx(4.0)
+
+def test_header_with_byte_order_mark(tmp_path):
+    path = tmp_path / "rain.dat"
+    path.write_bytes(("﻿" + HEADER + "\n01JAN2024\t0000\t1\n01JAN2024\t0100\t2\n").encode("utf-8"))
+    times, precipitation = RainfallData.read_rainfall_data(str(path))
+    np.testing.assert_allclose(precipitation, [1, 2])
+
+def test_first_record_with_unreadable_value_is_not_a_header(tmp_path):
+    path = write_records(tmp_path / "rain.dat", [("01JAN2024", "0000", "n/a"), ("01JAN2024", "0100", "2"),
+                                                  ("01JAN2024", "0200", "3")])
+    times, precipitation = RainfallData.read_rainfall_data(path)
+    assert len(times) == 3
+    report = RainfallData.check_rainfall_data(times, precipitation)
+    assert report["invalid_rows"] == [1]
+
+def test_clock_times_and_midnight_as_2400(tmp_path):
+    rows = [("31DEC2023", "22:00", "1"), ("31DEC2023", "23:00", "1"), ("31DEC2023", "2400", "1"),
+            ("01JAN2024", "01:00", "1")]
+    times, _ = RainfallData.read_rainfall_data(write_records(tmp_path / "rain.dat", rows))
+    assert list(times) == list(pd.date_range("2023-12-31 22:00", periods=4, freq="h").to_numpy())
+    assert RainfallData.check_rainfall_data(times, np.ones(4))["interval"] == "1 Hour"
+
+def test_gaps_negative_values_and_unreadable_rows(tmp_path):
+    rows = [("01JAN2024", "0000", "0"), ("01JAN2024", "0005", "-1"), ("01JAN2024", "0010", "2"),
+            ("01JAN2024", "0030", "1"), ("01JAN2024", "0035", "1"), ("not a date", "0040", "1"),
+            ("01JAN2024", "0045", "x"), ("01JAN2024", "0050", "1")]
+    times, precipitation = RainfallData.read_rainfall_data(write_records(tmp_path / "rain.dat", rows))
+    report = RainfallData.check_rainfall_data(times, precipitation)
+
+    assert not report["valid"]
+    assert report["interval"] == "5 Minute"
+    assert report["gap_count"] == 1
+    assert report["gaps"] == [("2024-01-01 00:10:00", 1200.0)]
+    assert report["negative_values"] == [(2, -1.0)]
+    assert report["invalid_rows"] == [6, 7]
+    #The record runs between the readable times
+    assert (report["end_date"], report["end_time"]) == ("01JAN2024", "0050")
+
+    text = RainfallData.format_report(report)
+    assert "1 time step(s) differ from 5 Minute" in text
+    assert "1 negative value(s): row 2 (-1 mm)" in text
+    assert "2 row(s) could not be read: 6, 7" in text
+
+def test_interval_that_is_not_a_hec_ras_interval():
+    times = np.array(["2024-01-01T00:00", "2024-01-01T00:07", "2024-01-01T00:14"], dtype="datetime64[ns]")
+    with pytest.raises(ValueError, match="not a HEC-RAS precipitation interval"):
+        RainfallData.infer_time_interval(times)
+
+def test_first_and_last_time(tmp_path):
+    rows = [("bad", "bad", "0")] + records(FIVE_MINUTES, ["1"] * 4)
+    path = write_records(tmp_path / "rain.dat", rows, header=True)
+    assert RainfallData.read_first_time(path) == np.datetime64("2024-01-01T00:00")
+    assert RainfallData.read_last_time(path) == np.datetime64("2024-01-01T00:15")
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "rain.dat"
+    path.write_text(HEADER + "\n")
+    with pytest.raises(ValueError, match="has no records"):
+        RainfallData.read_rainfall_data(str(path))
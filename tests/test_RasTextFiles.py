@@ -0,0 +1,117 @@
+###############################################################################################
+################################### HEC-RAS Text File Tests ###################################
+###############################################################################################
+
+#The unsteady flow, plan and project files written by RasTextFiles are compared byte for byte
+#with golden files in the layout HEC-RAS writes, so a change to a writer that HEC-RAS would read
+#differently shows up here instead of in a failed run. The golden files use the line endings of
+#the platform the writers run on.
+
+#Usage: python -m pytest tests
+
+#*********************************************************************************************
+import os
+import shutil
+import pytest
+import RasTextFiles
+
+GOLDEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+
+def golden_bytes(name):
+    #The writers write text files, so the golden lines end with the line ending of the platform
+    with open(os.path.join(GOLDEN, name), "rb") as file:
+        return file.read().replace(b"\n", os.linesep.encode())
+
+def written_bytes(path):
+    with open(path, "rb") as file:
+        return file.read()
+
+###############################################################################################
+#################################### 1. Fixed Width Values ####################################
+###############################################################################################
+def test_fixed_width_lines_hold_ten_values_of_eight_characters():
+    lines = RasTextFiles.format_fixed_width(range(12))
+    assert lines == ["       0       1       2       3       4       5       6       7       8       9",
+                     "      10      11"]
+
+@pytest.mark.parametrize("value, text", [
+    (0, "       0"),
+    (-0.0, "       0"),
+    (0.1, "     0.1"),
+    (1.5, "     1.5"),
+    (12.345678, "12.34568"),
+    (0.000012, "0.000012"),
+    (0.333333333, "0.333333"),
+    (123.456789, "123.4568"),
+    (1234567.8, " 1234568"),
+    (-2.5, "    -2.5"),
+])
+def test_fixed_width_keeps_the_decimals_that_fit(value, text):
+    assert RasTextFiles.format_fixed_width([value]) == [text]
+
+def test_fixed_width_rejects_values_wider_than_the_field():
+    with pytest.raises(ValueError):
+        RasTextFiles.format_fixed_width([123456789.0])
+
+###############################################################################################
+#################################### 2. Unsteady Flow File ####################################
+###############################################################################################
+def test_precipitation_hydrograph_of_a_new_file(tmp_path):
+    path = tmp_path / "Area.u01"
+    values = [0, 0.1, 0.25, 1.5, 12.345678, 0.000012, 123.456789, 1234567.8, 2, 0.333333333, 5.5, 0]
+    RasTextFiles.write_precipitation_hydrograph(str(path), "AREA", "01JAN2024", "0000", values, "5 Minute")
+    assert written_bytes(path) == golden_bytes("Area.u01")
+
+def test_precipitation_hydrograph_replaces_only_the_block_of_the_area(tmp_path):
+    #A file saved by HEC-RAS keeps its BC Line and the lines after the boundary conditions
+    path = tmp_path / "Area.u01"
+    shutil.copy(os.path.join(GOLDEN, "Saved.u01"), path)
+    RasTextFiles.write_precipitation_hydrograph(str(path), "AREA", "02FEB2024", "0600", [4, 3.5, 0.25], "15 Minute")
+    assert written_bytes(path) == golden_bytes("Merged.u01")
+
+def test_precipitation_hydrograph_is_written_the_same_twice(tmp_path):
+    path = tmp_path / "Area.u01"
+    shutil.copy(os.path.join(GOLDEN, "Saved.u01"), path)
+    for _ in range(2):
+        RasTextFiles.write_precipitation_hydrograph(str(path), "AREA", "02FEB2024", "0600", [4, 3.5, 0.25], "15 Minute")
+    assert written_bytes(path) == golden_bytes("Merged.u01")
+
+###############################################################################################
+######################################## 3. Plan File #########################################
+###############################################################################################
+def test_plan_file(tmp_path):
+    path = tmp_path / "Area.p01"
+    RasTextFiles.write_plan_file(str(path), "Rain on Grid", "RoG", "01JAN2024", "0000", "02JAN2024", "2400",
+                                 "10 Second", "5 Minute", "1 Hour", "Max Profile")
+    assert written_bytes(path) == golden_bytes("Area.p01")
+
+def test_plan_file_rejects_intervals_hec_ras_does_not_offer(tmp_path):
+    with pytest.raises(ValueError):
+        RasTextFiles.write_plan_file(str(tmp_path / "Area.p01"), "Rain on Grid", "RoG", "01JAN2024", "0000",
+                                     "02JAN2024", "2400", "7 Second", "5 Minute", "1 Hour", "Max Profile")
+
+###############################################################################################
+####################################### 4. Project File #######################################
+###############################################################################################
+def test_project_file(tmp_path):
+    path = tmp_path / "Area.prj"
+    RasTextFiles.write_project_file(str(path), "Rain on Grid", "Catchment north of the river", True,
+                                    ["g01"], ["u01"], ["p01"], "p01")
+    assert written_bytes(path) == golden_bytes("Area.prj")
+
+def test_register_project_file(tmp_path):
+    #A new plan is added after the last file reference and becomes the current plan; a file
+    #already referenced is not added again
+    path = tmp_path / "Area.prj"
+    shutil.copy(os.path.join(GOLDEN, "Area.prj"), path)
+    RasTextFiles.register_project_file(str(path), "Plan File", "p02", current_plan=True)
+    RasTextFiles.register_project_file(str(path), "Unsteady File", "u01")
+    assert written_bytes(path) == golden_bytes("Registered.prj")
+
+def test_read_project_file_reads_what_was_written():
+    project = RasTextFiles.read_project_file(os.path.join(GOLDEN, "Registered.prj"))
+    assert project["title"] == "Rain on Grid"
+    assert project["description"] == "Catchment north of the river"
+    assert project["units"] == "SI"
+    assert project["current_plan"] == "p02"
+    assert project["Plan File"] == ["p01", "p02"]
@@ -0,0 +1,124 @@
+###############################################################################################
+####################################### UI Driver Tests #######################################
+###############################################################################################
+
+#A stage of the automation is recorded on a fake desktop (which answers the clipboard and the
+#HEC-RAS Controller like HEC-RAS would) and replayed without it: the replay has to make the same
+#calls, return the recorded answers and stop at the first call that differs.
+
+#Usage: python -m pytest tests
+
+#*********************************************************************************************
+import json
+import pytest
+import RainOnGrid2DModelAutomation as automation
+import UiDriver
+
+class FakeController:
+    #HEC-RAS Controller answering every method with the name of the method
+    def __getattr__(self, name):
+        return lambda *args: name
+
+class FakeDesktop:
+    #Driver that keeps the calls made to it; the clipboard gives 'clipboard' one text at a time
+    simulated = False
+
+    def __init__(self, clipboard=()):
+        self.calls = []
+        self.clipboard = list(clipboard)
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name,) + args)
+
+    def paste(self):
+        self.calls.append(("paste",))
+        return self.clipboard.pop(0)
+
+    def is_foreground_maximized(self):
+        return False
+
+    def dispatch(self, prog_id):
+        self.calls.append(("dispatch", prog_id))
+        return FakeController()
+
+    def wait(self, name, function, *args, **kwargs):
+        self.calls.append(("wait", name))
+        return function(*args, **kwargs)
+
+    def close(self):
+        pass
+
+def record(path, stage, desktop):
+    automation.ui = UiDriver.RecordingDriver(desktop, str(path))
+    try:
+        return stage()
+    finally:
+        automation.ui.close()
+        automation.ui = None
+
+def replay(path, stage):
+    automation.ui = UiDriver.ReplayDriver(str(path))
+    try:
+        return stage(), automation.ui
+    finally:
+        automation.ui = None
+
+def test_replay_follows_the_recorded_clipboard(tmp_path):
+    #The compute is polled through the clipboard until HEC-RAS has finished
+    desktop = FakeDesktop(["Computing", "Computing", "Finished Unsteady Flow Simulation"])
+    record(tmp_path / "run.jsonl", automation.continue_after_computational_settings_message, desktop)
+    assert desktop.calls.count(("paste",)) == 3
+    assert desktop.calls[:2] == [("sleep", 2), ("click", 614, 265, "left")]
+
+    with open(tmp_path / "run.jsonl", "r") as file:
+        actions = [json.loads(line) for line in file]
+    assert len(actions) == len(desktop.calls)
+    assert [action["result"] for action in actions if action["action"] == "paste"] == \
+        ["Computing", "Computing", "Finished Unsteady Flow Simulation"]
+
+    _, driver = replay(tmp_path / "run.jsonl", automation.continue_after_computational_settings_message)
+    summary = driver.summary()
+    assert driver.step == len(actions)
+    assert summary["actions"]["paste"] == 3
+    assert summary["actions"]["click"] == sum(1 for call in desktop.calls if call[0] == "click")
+    #Sleeps only move the virtual clock
+    assert summary["sleep_seconds"] == pytest.approx(sum(call[1] for call in desktop.calls if call[0] == "sleep"))
+
+def test_replay_returns_recorded_results(tmp_path):
+    desktop = FakeDesktop(["text"])
+
+    def stage():
+        ui = automation.ui
+        controller = ui.dispatch()
+        version = controller.HECRASVersion()
+        controller.Project_Open("C:/Area.prj")
+        ui.write("Area")
+        ui.press("enter")
+        waited = ui.wait("Land Cover", lambda: "built")
+        return version, ui.paste(), ui.is_foreground_maximized(), waited
+
+    recorded = record(tmp_path / "run.jsonl", stage, desktop)
+    assert recorded == ("HECRASVersion", "text", False, {"elapsed": pytest.approx(0, abs=0.1)})
+    assert ("dispatch", UiDriver.RAS_CONTROLLER) in desktop.calls
+    assert ("write", "Area") in desktop.calls
+
+    replayed, driver = replay(tmp_path / "run.jsonl", stage)
+    assert replayed[:3] == ("HECRASVersion", "text", False)
+    assert driver.counts["com.Project_Open"] == 1
+
+def test_replay_stops_at_a_different_action(tmp_path):
+    record(tmp_path / "run.jsonl", automation.open_ras_mapper, FakeDesktop())
+
+    def changed_stage():
+        automation.ui.sleep(1)
+        automation.ui.click(469, 72)
+
+    with pytest.raises(ValueError, match=r"Step 2: expected click\(469, 71, 'left'\), got click\(469, 72, 'left'\)"):
+        replay(tmp_path / "run.jsonl", changed_stage)
+
+    def longer_stage():
+        automation.open_ras_mapper()
+        automation.ui.press("enter")
+
+    with pytest.raises(ValueError, match=r"Step 5: press\('enter',\) is not in the recording"):
+        replay(tmp_path / "run.jsonl", longer_stage)
@@ -0,0 +1,109 @@
+###############################################################################################
+###################################### Wait Engine Tests ######################################
+###############################################################################################
+
+#The file waits are run against a fake producer that writes a file a chunk at a time, the way
+#HEC-RAS and RAS Mapper write their outputs. The producer and the clock are driven by the sleep
+#function of the wait, so the tests run without real waiting and always poll the same way.
+
+#Usage: python -m pytest tests
+
+#*********************************************************************************************
+import os
+import time
+import pytest
+import WaitEngine
+
+class FileProducer:
+    #Writes 'chunks' chunks to a file, one at each poll after 'start_after' polls, then stops.
+    #Used as the sleep and clock of a wait: sleeping moves the fake clock on.
+    def __init__(self, path, chunks, start_after=0, chunk=b"x" * 1024):
+        self.path, self.chunks, self.start_after, self.chunk = path, chunks, start_after, chunk
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+        if len(self.sleeps) > self.start_after and self.chunks:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "ab") as file:
+                file.write(self.chunk)
+            self.chunks -= 1
+
+    def finished_at(self):
+        #Fake time of the last chunk
+        return sum(self.sleeps[:self.start_after + self.written()])
+
+    def written(self):
+        return os.path.getsize(self.path) // len(self.chunk) if os.path.exists(self.path) else 0
+
+###############################################################################################
+###################################### 1. Generic Waits #######################################
+###############################################################################################
+def test_polls_back_off_to_the_maximum_delay():
+    producer = FileProducer("unused", 0)
+    polls = iter([False] * 7 + [True])
+    result = WaitEngine.wait_until(lambda: next(polls), 1000, "task", initial_delay=1.0, max_delay=4.0, backoff=2.0,
+                                   sleep=producer.sleep, clock=producer.clock)
+    assert producer.sleeps == [1.0, 2.0, 4.0, 4.0, 4.0, 4.0, 4.0]
+    assert result["polls"] == 8
+    assert result["slept"] == pytest.approx(23.0)
+
+def test_a_stuck_task_times_out():
+    producer = FileProducer("unused", 0)
+    with pytest.raises(TimeoutError):
+        WaitEngine.wait_until(lambda: False, 30, "task", sleep=producer.sleep, clock=producer.clock)
+    #The last sleep is cut to the time left, so the wait stops at the timeout
+    assert producer.now == pytest.approx(30.0)
+
+###############################################################################################
+######################################## 2. File Waits ########################################
+###############################################################################################
+def test_waits_until_the_file_stops_growing(tmp_path):
+    path = str(tmp_path / "Area.p01.hdf")
+    producer = FileProducer(path, chunks=6, start_after=2)
+    result = WaitEngine.wait_for_files([path], 600, "compute", settle_time=3.0, max_delay=2.0,
+                                       sleep=producer.sleep, clock=producer.clock)
+    assert producer.written() == 6
+    #Done once the size has not changed for the settle time, and not long after that
+    assert producer.now - producer.finished_at() >= 3.0
+    assert producer.now - producer.finished_at() <= 3.0 + 2 * 2.0
+    assert result["elapsed"] == pytest.approx(producer.now)
+
+def test_a_file_that_keeps_growing_times_out(tmp_path):
+    path = str(tmp_path / "Area.p01.hdf")
+    producer = FileProducer(path, chunks=10 ** 6)
+    with pytest.raises(TimeoutError):
+        WaitEngine.wait_for_files([path], 120, "compute", settle_time=3.0, max_delay=2.0,
+                                  sleep=producer.sleep, clock=producer.clock)
+
+def test_files_older_than_the_task_are_ignored(tmp_path):
+    #A terrain left from an earlier run must not end the wait for the new one
+    path = str(tmp_path / "Terrain" / "Terrain.hdf")
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as file:
+        file.write(b"old")
+    started = time.time()
+    os.utime(path, (started - 3600, started - 3600))
+    producer = FileProducer(path, chunks=3, start_after=4)
+    WaitEngine.wait_for_files([path], 600, "Terrain", settle_time=3.0, newer_than=started - 1,
+                              sleep=producer.sleep, clock=producer.clock)
+    assert os.path.getsize(path) == 3 + 3 * 1024
+    assert producer.now - producer.finished_at() >= 3.0
+
+def test_every_pattern_needs_a_file(tmp_path):
+    #RAS Mapper writes a Terrain as an .hdf and a .vrt file
+    folder = str(tmp_path)
+    producer = FileProducer(os.path.join(folder, "Terrain", "Terrain.hdf"), chunks=2)
+    patterns = [os.path.join(folder, pattern) for pattern in WaitEngine.RAS_MAPPER_LAYER_FILES["Terrain"]]
+    with pytest.raises(TimeoutError):
+        WaitEngine.wait_for_files(patterns, 60, "Terrain", settle_time=3.0, sleep=producer.sleep, clock=producer.clock)
+    with open(os.path.join(folder, "Terrain", "Terrain.vrt"), "w") as file:
+        file.write("<VRTDataset/>")
+    producer.now = 0.0
+    result = WaitEngine.wait_for_files(patterns, 60, "Terrain", settle_time=3.0, sleep=producer.sleep, clock=producer.clock)
+    assert result["elapsed"] >= 3.0